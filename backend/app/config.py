@@ -1,9 +1,10 @@
 """Configuration settings and environment variables for the ZebraFetch \
 application."""
 
+from functools import lru_cache
 from pydantic_settings import BaseSettings
 from pydantic import Field
-from typing import List
+from typing import List, Literal
 
 
 class CORSSettings(BaseSettings):
@@ -20,13 +21,59 @@ class Settings(BaseSettings):
     host: str = "0.0.0.0"
     port: int = 8000
     max_pdf_mb: int = 100
+    upload_dir: str = ""
+    batch_max_files: int = 500
+    batch_max_mb: int = 200
     max_req_per_min: int = 0
     sync_timeout_sec: int = 60
     job_retention_hours: int = 24
     worker_pool_size: int = 2
+    job_concurrency: int = 2
+    prewarm_workers: bool = True
+    job_queue_size: int = 100
+    job_wait_max_sec: int = 60
+    job_timeout_sec: int = 0
+    job_max_pages: int = 0
+    job_backend: str = "sqlite"
+    job_queue: Literal["local", "shared"] = "local"
+    run_job_workers: bool = True
+    job_lease_sec: float = 30.0
+    job_heartbeat_sec: float = 5.0
+    job_poll_sec: float = 0.5
+    job_max_attempts: int = 3
+    webhook_concurrency: int = 8
+    webhook_timeout_sec: float = 10.0
+    webhook_max_attempts: int = 8
+    webhook_backoff_sec: float = 2.0
+    webhook_backoff_max_sec: float = 600.0
+    webhook_allowed_hosts: List[str] = Field(default_factory=list)
+    scan_dpi: int = 300
+    adaptive_dpi: bool = False
+    preview_dpi: int = 72
+    page_image_format: str = "png"
+    page_image_quality: int = 80
+    page_image_max_px: int = 0
+    tile_max_px: int = 24_000_000
+    tile_overlap_pt: float = 144.0
+    tile_threads: int = 2
+    native_images: bool = True
+    vector_barcodes: bool = False
+    artifact_dir: str = "./artifacts"
+    result_cache_enabled: bool = True
+    result_cache_max_entries: int = 256
+    result_cache_max_mb: int = 64
+    result_cache_ttl_sec: int = 3600
+    result_cache_disk: bool = False
+    result_cache_disk_max_mb: int = 512
+    page_cache_enabled: bool = True
+    page_cache_max_entries: int = 100000
+    page_cache_max_mb: int = 32
     auth_enabled: bool = False
     api_keys: List[str] = Field(default_factory=list)
     sqlite_url: str = "sqlite:///./jobs.db"
+    sqlite_pool_size: int = 8
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_write_batch: int = 256
     log_level: str = "INFO"
     log_json: bool = False
     metrics_enabled: bool = True
@@ -44,7 +91,18 @@ class Settings(BaseSettings):
         """Convert maximum PDF size from megabytes to bytes."""
         return self.max_pdf_mb * 1024 * 1024
 
+    @property
+    def batch_max_bytes(self) -> int:
+        """Convert the maximum batch upload size from megabytes to bytes."""
+        return self.batch_max_mb * 1024 * 1024
+
 
+@lru_cache(maxsize=None)
 def get_settings() -> Settings:
-    """Get an instance of the application settings."""
+    """Get the application settings, read from the environment once.
+
+    Every request, auth check and database call asks for the settings, so
+    they are built on first use and shared afterwards. Call
+    ``get_settings.cache_clear()`` to pick up a changed environment.
+    """
     return Settings()
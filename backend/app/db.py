@@ -2,27 +2,302 @@
 
 import sqlite3
 import json
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, Iterator
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
 from contextlib import contextmanager
 import asyncio
 from functools import partial
 import os
 
-from app.config import get_settings
+from app.config import Settings, get_settings
+from app.metrics import DB_WRITE_SECONDS
+from app.services.artifacts import remove_artifacts
+
+T = TypeVar("T")
+
+# A parameterized SQL statement
+Statement = Tuple[str, Sequence[Any]]
+
+# Columns added to ``jobs`` after its first release, with their definitions
+_ADDED_JOB_COLUMNS = {
+    "params_json": "TEXT",
+    "priority": "INTEGER NOT NULL DEFAULT 0",
+    "owner": "TEXT NOT NULL DEFAULT ''",
+    "lease_owner": "TEXT",
+    "lease_expires_at": "REAL",
+    "attempts": "INTEGER NOT NULL DEFAULT 0",
+    "cancel_requested": "INTEGER NOT NULL DEFAULT 0",
+    "progress_json": "TEXT",
+}
+
+# Jobs a worker may claim: queued ones, and running ones whose worker's
+# lease ran out; takes the current time as its parameter
+_CLAIMABLE = """
+    (status = 'pending' OR (status = 'running'
+        AND (lease_expires_at IS NULL OR lease_expires_at < ?)))
+"""
+
+
+def _connect(db_path: str, busy_timeout_ms: int) -> sqlite3.Connection:
+    """Open a connection in WAL mode with pragmas tuned for the job store.
+
+    WAL lets readers run alongside the single writer, ``synchronous=NORMAL``
+    is durable across application crashes in WAL mode, and the busy timeout
+    makes contending connections wait instead of failing with ``database is
+    locked``. Connections are long-lived, so sqlite3's per-connection
+    statement cache keeps frequently used queries prepared.
+    """
+    conn = sqlite3.connect(
+        db_path, timeout=busy_timeout_ms / 1000, check_same_thread=False
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-4000")
+    return conn
+
+
+class ConnectionPool:
+    """Bounded pool of persistent SQLite connections.
+
+    At most ``size`` connections are open at once; callers beyond that wait
+    for one to be returned. Connections are opened lazily and reused until
+    the pool is closed.
+    """
+
+    def __init__(self, db_path: str, size: int, busy_timeout_ms: int) -> None:
+        """Create an empty pool for the database at ``db_path``."""
+        self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Check out a connection, returning it to the pool afterwards.
+
+        Any transaction left open by the caller is rolled back first.
+        """
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = _connect(self.db_path, self.busy_timeout_ms)
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class BatchWriter:
+    """Single writer thread that commits queued statements in batches.
+
+    Job inserts and status updates from many concurrent requests are grouped
+    into one transaction, up to ``max_batch`` statements, so a burst of
+    writes costs one commit instead of one per request and writers never
+    contend for SQLite's write lock with each other. A failing statement
+    only fails its own caller.
+    """
+
+    def __init__(self, db_path: str, busy_timeout_ms: int, max_batch: int) -> None:
+        """Start the writer thread for the database at ``db_path``."""
+        self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Optional[Tuple[List[Statement], Future[None]]]]" = (
+            queue.Queue()
+        )
+        self._thread = threading.Thread(
+            target=self._run, name="zebrafetch-db-writer", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, sql: str, params: Sequence[Any]) -> "Future[None]":
+        """Queue a statement, returning a future resolved once it is committed."""
+        return self.submit_all([(sql, params)])
+
+    def submit_all(self, statements: Sequence[Statement]) -> "Future[None]":
+        """Queue statements that must be committed together or not at all.
+
+        The time until they are committed, batching included, is recorded as
+        the ``db_write`` stage.
+        """
+        future: "Future[None]" = Future()
+        start = time.perf_counter()
+        future.add_done_callback(
+            lambda _: DB_WRITE_SECONDS.observe(time.perf_counter() - start)
+        )
+        self._queue.put((list(statements), future))
+        return future
+
+    def execute(self, sql: str, params: Sequence[Any]) -> None:
+        """Queue a statement and wait until it is committed."""
+        self.submit(sql, params).result()
+
+    def close(self) -> None:
+        """Commit outstanding statements and stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        """Drain the queue, executing and committing one batch at a time."""
+        conn = _connect(self.db_path, self.busy_timeout_ms)
+        conn.isolation_level = None
+        try:
+            stopping = False
+            while not stopping:
+                item = self._queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                while len(batch) < self.max_batch:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+                self._commit(conn, batch)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _commit(
+        conn: sqlite3.Connection,
+        batch: List[Tuple[List[Statement], "Future[None]"]],
+    ) -> None:
+        """Execute a batch in one transaction and resolve its futures."""
+        errors: Dict[int, BaseException] = {}
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for index, (statements, _) in enumerate(batch):
+                conn.execute("SAVEPOINT statement")
+                try:
+                    for sql, params in statements:
+                        conn.execute(sql, params)
+                except sqlite3.Error as e:
+                    conn.execute("ROLLBACK TO statement")
+                    errors[index] = e
+                conn.execute("RELEASE statement")
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for index, (_, future) in enumerate(batch):
+            if index in errors:
+                future.set_exception(errors[index])
+            else:
+                future.set_result(None)
+
+
+_pool: Optional[ConnectionPool] = None
+_writer: Optional[BatchWriter] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_db_lock = threading.Lock()
+
+
+def _open_db(settings: Settings) -> None:
+    """Open the connection pool, writer and executor from ``settings``."""
+    global _pool, _writer, _executor
+    db_path = settings.sqlite_url.replace("sqlite:///", "")
+    _pool = ConnectionPool(
+        db_path, settings.sqlite_pool_size, settings.sqlite_busy_timeout_ms
+    )
+    _writer = BatchWriter(
+        db_path, settings.sqlite_busy_timeout_ms, settings.sqlite_write_batch
+    )
+    _executor = ThreadPoolExecutor(
+        max_workers=settings.sqlite_pool_size, thread_name_prefix="zebrafetch-db"
+    )
+
+
+def _get_pool() -> ConnectionPool:
+    """Get the connection pool, opening the database on first use."""
+    with _db_lock:
+        if _pool is None:
+            _open_db(get_settings())
+        assert _pool is not None
+        return _pool
+
+
+def _get_writer() -> BatchWriter:
+    """Get the batching writer, opening the database on first use."""
+    with _db_lock:
+        if _writer is None:
+            _open_db(get_settings())
+        assert _writer is not None
+        return _writer
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Get the executor that runs blocking reads off the event loop."""
+    with _db_lock:
+        if _executor is None:
+            _open_db(get_settings())
+        assert _executor is not None
+        return _executor
+
+
+def close_db() -> None:
+    """Flush pending writes and close all database connections."""
+    global _pool, _writer, _executor
+    with _db_lock:
+        pool, writer, executor = _pool, _writer, _executor
+        _pool = _writer = _executor = None
+    # Close outside the lock: queued reads may still need a pooled connection
+    if executor is not None:
+        executor.shutdown(wait=True)
+    if writer is not None:
+        writer.close()
+    if pool is not None:
+        pool.close()
+
+
+async def _run_in_db_executor(func: Callable[..., T], *args: Any) -> T:
+    """Run a blocking database call on the dedicated executor."""
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(_get_executor(), partial(func, *args))
 
 
 @contextmanager
 def get_db_connection() -> Iterator[sqlite3.Connection]:
-    """Get a SQLite database connection."""
-    settings = get_settings()
-    db_path = settings.sqlite_url.replace("sqlite:///", "")
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    try:
+    """Get a pooled SQLite database connection."""
+    with _get_pool().connection() as conn:
         yield conn
-    finally:
-        conn.close()
 
 
 async def init_db() -> None:
@@ -32,51 +307,176 @@ async def init_db() -> None:
 
 
 def _init_db_sync() -> None:
-    """Initialize the database schema synchronously."""
+    """Initialize the database schema synchronously.
+
+    Connections are (re)opened from the current settings first.
+    """
+    close_db()
+    with _db_lock:
+        _open_db(get_settings())
     with get_db_connection() as conn:
         schema_path = os.path.join(
             os.path.dirname(os.path.dirname(__file__)), "schemas", "jobs.sql"
         )
         with open(schema_path, "r") as f:
             conn.executescript(f.read())
+        # Bring job tables created by older releases up to date
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for column, definition in _ADDED_JOB_COLUMNS.items():
+            if column not in columns:
+                try:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+                except sqlite3.OperationalError as e:
+                    # Another process sharing the database added it first
+                    if "duplicate column" not in str(e):
+                        raise
         conn.commit()
 
 
-async def create_job(job_id: str, input_path: str) -> None:
-    """Create a new job record in the database."""
+async def create_job(
+    job_id: str,
+    input_path: str,
+    params: Optional[Dict[str, Any]] = None,
+    priority: int = 0,
+    owner: str = "",
+) -> None:
+    """Create a new job record in the database.
+
+    ``params`` holds the scan options, so the job can be re-queued if the
+    application restarts before it finishes.
+    """
     settings = get_settings()
     expires_at = datetime.utcnow() + timedelta(hours=settings.job_retention_hours)
+    await asyncio.wrap_future(
+        _get_writer().submit(
+            *_create_job_statement(
+                job_id, input_path, expires_at, params, priority, owner
+            )
+        )
+    )
 
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(
-        None, partial(_create_job_sync, job_id, input_path, expires_at)
+
+def _create_job_statement(
+    job_id: str,
+    input_path: str,
+    expires_at: datetime,
+    params: Optional[Dict[str, Any]] = None,
+    priority: int = 0,
+    owner: str = "",
+) -> Statement:
+    """Build the statement inserting a new pending job."""
+    return (
+        """
+        INSERT INTO jobs
+            (id, status, input_path, expires_at, params_json, priority, owner)
+        VALUES (?, 'pending', ?, ?, ?, ?, ?)
+        """,
+        (
+            job_id,
+            input_path,
+            expires_at.isoformat(),
+            json.dumps(params) if params is not None else None,
+            priority,
+            owner,
+        ),
     )
 
 
-def _create_job_sync(job_id: str, input_path: str, expires_at: datetime) -> None:
+def _create_job_sync(
+    job_id: str,
+    input_path: str,
+    expires_at: datetime,
+    params: Optional[Dict[str, Any]] = None,
+    priority: int = 0,
+    owner: str = "",
+) -> None:
     """Create a new job record synchronously."""
+    _get_writer().execute(
+        *_create_job_statement(job_id, input_path, expires_at, params, priority, owner)
+    )
+
+
+async def update_job_status(
+    job_id: str,
+    status: str,
+    result: Optional[Dict[str, Any]] = None,
+    artifact_paths: Optional[list] = None,
+    callback_url: Optional[str] = None,
+    worker: Optional[str] = None,
+) -> bool:
+    """Update job status and optionally set result and artifact paths.
+
+    With ``callback_url``, a webhook notifying it of the new status and
+    result is queued in the outbox in the same transaction, so a finished
+    job can never lose its callback. The update is queued on the batching
+    writer; it is committed when this returns. With ``worker``, the job is
+    only updated while it is running under that worker's lease. Returns
+    whether the job was updated.
+    """
+    statements = [_update_job_statement(job_id, status, result, artifact_paths)]
+    if callback_url:
+        payload = {
+            "event": f"job.{status}",
+            "job_id": job_id,
+            "status": status,
+            "result": result,
+        }
+        statements.append(_enqueue_callback_statement(job_id, callback_url, payload))
+    if worker is not None:
+        return await _run_in_db_executor(
+            _update_leased_job_sync, job_id, worker, statements
+        )
+    await asyncio.wrap_future(_get_writer().submit_all(statements))
+    return True
+
+
+def _update_leased_job_sync(
+    job_id: str, worker: str, statements: List[Statement]
+) -> bool:
+    """Run a job's update statements if ``worker`` holds its lease.
+
+    The lease check and the update are one write transaction, so a worker
+    reclaiming the job in between cannot be overwritten.
+    """
     with get_db_connection() as conn:
-        conn.execute(
+        conn.execute("BEGIN IMMEDIATE")
+        leased = conn.execute(
             """
-            INSERT INTO jobs (id, status, input_path, expires_at)
-            VALUES (?, 'pending', ?, ?)
+            SELECT 1 FROM jobs
+            WHERE id = ? AND status = 'running' AND lease_owner = ?
             """,
-            (job_id, input_path, expires_at.isoformat()),
-        )
+            (job_id, worker),
+        ).fetchone()
+        if leased is None:
+            conn.rollback()
+            return False
+        for sql, params in statements:
+            conn.execute(sql, params)
         conn.commit()
+    return True
 
 
-async def update_job_status(
+def _update_job_statement(
     job_id: str,
     status: str,
     result: Optional[Dict[str, Any]] = None,
     artifact_paths: Optional[list] = None,
-) -> None:
-    """Update job status and optionally set result and artifact paths."""
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(
-        None, partial(_update_job_sync, job_id, status, result, artifact_paths)
-    )
+) -> Statement:
+    """Build the statement updating a job's status, result and artifacts."""
+    updates = ["status = ?", "updated_at = CURRENT_TIMESTAMP"]
+    params = [status]
+
+    if result is not None:
+        updates.append("result_json = ?")
+        params.append(json.dumps(result))
+
+    if artifact_paths is not None:
+        updates.append("artifact_paths = ?")
+        params.append(json.dumps(artifact_paths))
+
+    query = "UPDATE jobs " f"SET {', '.join(updates)} " "WHERE id = ?"
+    params.append(job_id)
+    return query, params
 
 
 def _update_job_sync(
@@ -86,29 +486,14 @@ def _update_job_sync(
     artifact_paths: Optional[list] = None,
 ) -> None:
     """Update job status synchronously with optional result and artifacts."""
-    with get_db_connection() as conn:
-        updates = ["status = ?", "updated_at = CURRENT_TIMESTAMP"]
-        params = [status]
-
-        if result is not None:
-            updates.append("result_json = ?")
-            params.append(json.dumps(result))
-
-        if artifact_paths is not None:
-            updates.append("artifact_paths = ?")
-            params.append(json.dumps(artifact_paths))
-
-        query = "UPDATE jobs " f"SET {', '.join(updates)} " "WHERE id = ?"
-        params.append(job_id)
-
-        conn.execute(query, params)
-        conn.commit()
+    _get_writer().execute(
+        *_update_job_statement(job_id, status, result, artifact_paths)
+    )
 
 
 async def get_job(job_id: str) -> Optional[Dict[str, Any]]:
     """Retrieve job details by ID."""
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, partial(_get_job_sync, job_id))
+    return await _run_in_db_executor(_get_job_sync, job_id)
 
 
 def _get_job_sync(job_id: str) -> Optional[Dict[str, Any]]:
@@ -124,13 +509,330 @@ def _get_job_sync(job_id: str) -> Optional[Dict[str, Any]]:
             job["result_json"] = json.loads(job["result_json"])
         if job.get("artifact_paths"):
             job["artifact_paths"] = json.loads(job["artifact_paths"])
+        if job.get("params_json"):
+            job["params_json"] = json.loads(job["params_json"])
+        if job.get("progress_json"):
+            job["progress_json"] = json.loads(job["progress_json"])
         return job
 
 
+async def get_unfinished_jobs() -> List[Dict[str, Any]]:
+    """List jobs left ``pending`` or ``running``, oldest first."""
+    return await _run_in_db_executor(_get_unfinished_jobs_sync)
+
+
+def _get_unfinished_jobs_sync() -> List[Dict[str, Any]]:
+    """List unfinished jobs synchronously."""
+    with get_db_connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT id, status, input_path, params_json, priority, owner
+            FROM jobs
+            WHERE status IN ('pending', 'running')
+            ORDER BY created_at, rowid
+            """
+        ).fetchall()
+    jobs = []
+    for row in rows:
+        job = dict(row)
+        job["params_json"] = (
+            json.loads(job["params_json"]) if job["params_json"] else None
+        )
+        jobs.append(job)
+    return jobs
+
+
+async def count_queued_jobs() -> int:
+    """Count the jobs waiting for a worker."""
+    return await _run_in_db_executor(_count_queued_jobs_sync)
+
+
+def _count_queued_jobs_sync() -> int:
+    """Count queued jobs synchronously."""
+    with get_db_connection() as conn:
+        row = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'pending'")
+        return int(row.fetchone()[0])
+
+
+async def claim_job(
+    job_id: Optional[str], worker: str, lease_sec: float
+) -> Optional[Dict[str, Any]]:
+    """Claim a job for ``worker`` and return it, or ``None`` if none is free.
+
+    Claims ``job_id``, or without one the next job in queue order: highest
+    priority first, then owners with the fewest running jobs, then oldest.
+    The job becomes ``running`` under a lease that expires ``lease_sec``
+    from now unless renewed with ``renew_job_lease``.
+    """
+    return await _run_in_db_executor(_claim_job_sync, job_id, worker, lease_sec)
+
+
+def _claim_job_sync(
+    job_id: Optional[str], worker: str, lease_sec: float
+) -> Optional[Dict[str, Any]]:
+    """Claim a job synchronously.
+
+    The claim is one write transaction, so concurrent claims from any
+    number of processes sharing the database never take the same job.
+    """
+    now = time.time()
+    with get_db_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if job_id is None:
+            row = conn.execute(
+                f"""
+                SELECT id FROM jobs AS queued
+                WHERE {_CLAIMABLE}
+                ORDER BY priority DESC,
+                    (SELECT COUNT(*) FROM jobs
+                     WHERE owner = queued.owner AND status = 'running'),
+                    created_at, rowid
+                LIMIT 1
+                """,
+                (now,),
+            ).fetchone()
+        else:
+            row = conn.execute(
+                f"SELECT id FROM jobs WHERE id = ? AND {_CLAIMABLE}", (job_id, now)
+            ).fetchone()
+        if row is None:
+            return None
+        conn.execute(
+            """
+            UPDATE jobs
+            SET status = 'running', lease_owner = ?, lease_expires_at = ?,
+                attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+            """,
+            (worker, now + lease_sec, row["id"]),
+        )
+        job = dict(
+            conn.execute(
+                """
+                SELECT id, input_path, params_json, priority, owner, attempts
+                FROM jobs WHERE id = ?
+                """,
+                (row["id"],),
+            ).fetchone()
+        )
+        conn.commit()
+    job["params_json"] = json.loads(job["params_json"]) if job["params_json"] else None
+    return job
+
+
+async def renew_job_lease(
+    job_id: str,
+    worker: str,
+    lease_sec: float,
+    progress: Optional[Dict[str, Any]] = None,
+) -> Optional[bool]:
+    """Extend ``worker``'s lease on a running job and store its progress.
+
+    Returns whether the job's cancellation was requested, or ``None`` if
+    the worker no longer holds the lease.
+    """
+    return await _run_in_db_executor(
+        _renew_job_lease_sync, job_id, worker, lease_sec, progress
+    )
+
+
+def _renew_job_lease_sync(
+    job_id: str,
+    worker: str,
+    lease_sec: float,
+    progress: Optional[Dict[str, Any]] = None,
+) -> Optional[bool]:
+    """Extend a job lease synchronously."""
+    with get_db_connection() as conn:
+        cursor = conn.execute(
+            """
+            UPDATE jobs
+            SET lease_expires_at = ?, progress_json = COALESCE(?, progress_json)
+            WHERE id = ? AND status = 'running' AND lease_owner = ?
+            """,
+            (
+                time.time() + lease_sec,
+                json.dumps(progress) if progress is not None else None,
+                job_id,
+                worker,
+            ),
+        )
+        if cursor.rowcount == 0:
+            return None
+        row = conn.execute(
+            "SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        conn.commit()
+    return bool(row["cancel_requested"])
+
+
+async def release_job(job_id: str, worker: str) -> None:
+    """Put a job ``worker`` is running back in the queue for another worker."""
+    await asyncio.wrap_future(
+        _get_writer().submit(
+            """
+            UPDATE jobs
+            SET status = 'pending', lease_owner = NULL, lease_expires_at = NULL,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = 'running' AND lease_owner = ?
+            """,
+            (job_id, worker),
+        )
+    )
+
+
+async def request_job_cancel(job_id: str) -> None:
+    """Ask the worker running a job to cancel it at its next heartbeat."""
+    await asyncio.wrap_future(
+        _get_writer().submit(
+            "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'",
+            (job_id,),
+        )
+    )
+
+
+def _enqueue_callback_statement(
+    job_id: str, url: str, payload: Dict[str, Any]
+) -> Statement:
+    """Build the statement adding a webhook delivery to the outbox."""
+    return (
+        """
+        INSERT INTO webhook_outbox (job_id, url, payload_json, next_attempt_at)
+        VALUES (?, ?, ?, ?)
+        """,
+        (job_id, url, json.dumps(payload), time.time()),
+    )
+
+
+async def claim_due_callbacks(
+    now: float, limit: int, lease_sec: float
+) -> List[Dict[str, Any]]:
+    """Claim pending webhook deliveries due at ``now``, oldest first.
+
+    Claimed deliveries are not due again for ``lease_sec`` seconds, so
+    dispatchers in other processes skip them unless this one dies before
+    recording their outcome.
+    """
+    return await _run_in_db_executor(_claim_due_callbacks_sync, now, limit, lease_sec)
+
+
+def _claim_due_callbacks_sync(
+    now: float, limit: int, lease_sec: float
+) -> List[Dict[str, Any]]:
+    """Claim due webhook deliveries synchronously."""
+    with get_db_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        rows = conn.execute(
+            """
+            SELECT id, job_id, url, payload_json, attempts
+            FROM webhook_outbox
+            WHERE status = 'pending' AND next_attempt_at <= ?
+            ORDER BY next_attempt_at, id
+            LIMIT ?
+            """,
+            (now, limit),
+        ).fetchall()
+        conn.executemany(
+            "UPDATE webhook_outbox SET next_attempt_at = ? WHERE id = ?",
+            [(now + lease_sec, row["id"]) for row in rows],
+        )
+        conn.commit()
+    return [dict(row) for row in rows]
+
+
+async def get_next_callback_due() -> Optional[float]:
+    """Return when the earliest pending webhook delivery is due, if any."""
+    return await _run_in_db_executor(_get_next_callback_due_sync)
+
+
+def _get_next_callback_due_sync() -> Optional[float]:
+    """Return the earliest pending delivery time synchronously."""
+    with get_db_connection() as conn:
+        row = conn.execute(
+            "SELECT MIN(next_attempt_at) FROM webhook_outbox WHERE status = 'pending'"
+        ).fetchone()
+    return float(row[0]) if row[0] is not None else None
+
+
+async def update_callback(
+    callback_id: int,
+    status: str,
+    attempts: int,
+    next_attempt_at: float = 0.0,
+    error: Optional[str] = None,
+) -> None:
+    """Record the outcome of a webhook delivery attempt."""
+    await asyncio.wrap_future(
+        _get_writer().submit(
+            """
+            UPDATE webhook_outbox
+            SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+            """,
+            (status, attempts, next_attempt_at, error, callback_id),
+        )
+    )
+
+
+async def save_template(name: str, regions: List[Dict[str, Any]]) -> None:
+    """Create or replace a named set of scan regions."""
+    await asyncio.wrap_future(
+        _get_writer().submit(
+            """
+            INSERT INTO scan_templates (name, regions_json) VALUES (?, ?)
+            ON CONFLICT(name) DO UPDATE
+            SET regions_json = excluded.regions_json,
+                updated_at = CURRENT_TIMESTAMP
+            """,
+            (name, json.dumps(regions)),
+        )
+    )
+
+
+async def get_template(name: str) -> Optional[Dict[str, Any]]:
+    """Retrieve a scan template by name."""
+    return await _run_in_db_executor(_get_template_sync, name)
+
+
+def _get_template_sync(name: str) -> Optional[Dict[str, Any]]:
+    """Retrieve a scan template synchronously by name."""
+    with get_db_connection() as conn:
+        row = conn.execute(
+            "SELECT * FROM scan_templates WHERE name = ?", (name,)
+        ).fetchone()
+    return _template_from_row(row) if row else None
+
+
+async def list_templates() -> List[Dict[str, Any]]:
+    """List all scan templates by name."""
+    return await _run_in_db_executor(_list_templates_sync)
+
+
+def _list_templates_sync() -> List[Dict[str, Any]]:
+    """List scan templates synchronously."""
+    with get_db_connection() as conn:
+        rows = conn.execute("SELECT * FROM scan_templates ORDER BY name").fetchall()
+    return [_template_from_row(row) for row in rows]
+
+
+def _template_from_row(row: sqlite3.Row) -> Dict[str, Any]:
+    """Convert a ``scan_templates`` row to its API form."""
+    template = dict(row)
+    template["regions"] = json.loads(template.pop("regions_json"))
+    return template
+
+
+async def delete_template(name: str) -> None:
+    """Delete a scan template if it exists."""
+    await asyncio.wrap_future(
+        _get_writer().submit("DELETE FROM scan_templates WHERE name = ?", (name,))
+    )
+
+
 async def cleanup_expired_jobs() -> None:
     """Remove expired jobs and their associated artifacts."""
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, _cleanup_expired_jobs_sync)
+    await _run_in_db_executor(_cleanup_expired_jobs_sync)
 
 
 def _cleanup_expired_jobs_sync() -> None:
@@ -146,16 +848,17 @@ def _cleanup_expired_jobs_sync() -> None:
         )
         expired_jobs = cursor.fetchall()
 
-        # Delete expired jobs
+        # Delete expired jobs and their webhook deliveries
+        conn.execute(
+            """
+            DELETE FROM webhook_outbox WHERE job_id IN
+                (SELECT id FROM jobs WHERE expires_at < CURRENT_TIMESTAMP)
+            """
+        )
         conn.execute("DELETE FROM jobs WHERE expires_at < CURRENT_TIMESTAMP")
         conn.commit()
 
         # Clean up artifacts
         for job in expired_jobs:
             if job["artifact_paths"]:
-                artifact_paths = json.loads(job["artifact_paths"])
-                for path in artifact_paths:
-                    try:
-                        os.remove(path)
-                    except OSError:
-                        pass  # Ignore errors during cleanup
+                remove_artifacts(json.loads(job["artifact_paths"]))
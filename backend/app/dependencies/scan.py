@@ -0,0 +1,129 @@
+"""Shared request parsing and scanner setup for the scan routes."""
+
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException, status
+
+from app.config import Settings
+from app.db import get_template
+from app.services.cache import get_page_cache
+from app.services.cancel import CancelToken
+from app.services.matching import compile_match
+from app.services.regions import Region, parse_regions
+from app.services.scanner import Scanner
+from app.services.symbology import resolve_symbologies
+
+
+def parse_page_range(pages: Optional[str]) -> Optional[List[int]]:
+    """Convert a 1-based ``"2-5"`` or ``"1,3"`` page spec to 0-based indices."""
+    if not pages:
+        return None
+    try:
+        if "-" in pages:
+            start, end = map(int, pages.split("-"))
+            return list(range(start - 1, end))  # Convert to 0-based
+        return [int(p) - 1 for p in pages.split(",")]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid page range format",
+        )
+
+
+def parse_symbologies(types: Optional[str]) -> Optional[List[str]]:
+    """Validate a comma-separated ``types`` filter against the registry.
+
+    Unknown names are rejected with a 400 before any scanning starts.
+    """
+    if not types:
+        return None
+    return resolve_symbologies(types.split(","))
+
+
+async def resolve_regions(
+    regions: Optional[str], template: Optional[str]
+) -> Optional[List[Region]]:
+    """Parse a ``regions`` spec or load the regions of a saved ``template``.
+
+    Malformed specs and requests naming both are rejected with a 400, unknown
+    templates with a 404.
+    """
+    if regions and template:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Pass either regions or template, not both",
+        )
+    if template:
+        saved = await get_template(template)
+        if saved is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Template not found: {template}",
+            )
+        regions_list: List[Region] = saved["regions"]
+        return regions_list
+    if not regions:
+        return None
+    try:
+        return parse_regions(regions)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid regions: {e}",
+        )
+
+
+def parse_limits(
+    stop_after: int, first_match_per_page: bool, match: Optional[str]
+) -> Optional[Dict[str, Any]]:
+    """Validate early-exit options into the form ``build_scanner`` takes.
+
+    Returns ``None`` when none is set. An invalid ``match`` pattern is
+    rejected with a 400.
+    """
+    if not (stop_after or first_match_per_page or match):
+        return None
+    try:
+        compile_match(match)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid match pattern: {e}",
+        )
+    return {
+        "stop_after": stop_after,
+        "first_match_per_page": first_match_per_page,
+        "match": match or None,
+    }
+
+
+def build_scanner(
+    settings: Settings,
+    regions: Optional[List[Region]] = None,
+    limits: Optional[Dict[str, Any]] = None,
+    cancel: Optional[CancelToken] = None,
+) -> Scanner:
+    """Create a scanner configured from the application settings.
+
+    ``regions`` restricts decoding to crop boxes, ``limits``, from
+    ``parse_limits``, lets the scan stop early and ``cancel`` stops it from
+    outside; see ``Scanner``.
+    """
+    return Scanner(
+        dpi=settings.scan_dpi,
+        workers=settings.worker_pool_size,
+        adaptive=settings.adaptive_dpi,
+        preview_dpi=settings.preview_dpi,
+        page_cache=get_page_cache(settings),
+        image_format=settings.page_image_format,
+        image_quality=settings.page_image_quality,
+        image_max_px=settings.page_image_max_px,
+        regions=regions,
+        tile_max_px=settings.tile_max_px,
+        tile_overlap_pt=settings.tile_overlap_pt,
+        tile_threads=settings.tile_threads,
+        native_images=settings.native_images,
+        vector_barcodes=settings.vector_barcodes,
+        **(limits or {}),
+        cancel=cancel,
+    )
@@ -0,0 +1,448 @@
+"""Spooling of uploaded PDFs to disk for the scan routes."""
+
+import hashlib
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+import zipfile
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import multipart
+from fastapi import HTTPException, Request, status
+from multipart.multipart import parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+from app.config import Settings
+from app.metrics import UPLOAD_SECONDS
+
+# Copy size when spooling a PDF from an archive member
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# An uploaded file part: its file name, content type and spool file
+UploadedPart = Tuple[str, Optional[str], "SpooledUpload"]
+
+
+def _upload_body(field: str, many: bool = False) -> Dict[str, Any]:
+    """Describe a multipart upload in ``field`` for a route's OpenAPI schema."""
+    schema: Dict[str, Any] = {"type": "string", "format": "binary"}
+    if many:
+        schema = {"type": "array", "items": schema}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": [field],
+                        "properties": {field: schema},
+                    }
+                }
+            },
+        }
+    }
+
+
+# OpenAPI request bodies of the routes that read their upload themselves
+PDF_UPLOAD_BODY = _upload_body("file")
+BATCH_UPLOAD_BODY = _upload_body("files", many=True)
+
+
+class SpooledUpload:
+    """An uploaded PDF saved to a spool file."""
+
+    def __init__(self, path: str, size: int, sha256: str) -> None:
+        """Describe the spool file, its size and its content hash."""
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+
+    def remove(self) -> None:
+        """Delete the spool file, ignoring errors."""
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+def _too_large(settings: Settings) -> HTTPException:
+    """Build the error returned for uploads over the size limit."""
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"PDF must be smaller than {settings.max_pdf_mb}MB",
+    )
+
+
+class _SpoolWriter:
+    """A spool file written in chunks, hashed and size-checked as it grows.
+
+    The file is created in ``directory``, by default the upload directory,
+    and may hold at most ``max_bytes``, by default the PDF size limit.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        directory: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+    ) -> None:
+        """Create an empty spool file."""
+        self.settings = settings
+        self.max_bytes = settings.max_pdf_bytes if max_bytes is None else max_bytes
+        fd, self.path = tempfile.mkstemp(
+            suffix=".pdf", dir=directory or settings.upload_dir or None
+        )
+        self.file = os.fdopen(fd, "wb")
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, chunk: bytes) -> None:
+        """Append a chunk, raising ``413`` once the file outgrows its limit."""
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise _too_large(self.settings)
+        self.digest.update(chunk)
+        self.file.write(chunk)
+
+    def finish(self) -> SpooledUpload:
+        """Close the spool file and describe it."""
+        self.file.close()
+        return SpooledUpload(self.path, self.size, self.digest.hexdigest())
+
+    def discard(self) -> None:
+        """Close and delete the spool file."""
+        self.file.close()
+        SpooledUpload(self.path, self.size, "").remove()
+
+
+def _copy_to_spool(
+    source: IO[bytes],
+    settings: Settings,
+    directory: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+) -> SpooledUpload:
+    """Copy a stream into a new spool file in chunks, hashing it on the way."""
+    writer = _SpoolWriter(settings, directory, max_bytes)
+    try:
+        while True:
+            chunk = source.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            writer.write(chunk)
+    except BaseException:
+        writer.discard()
+        raise
+    return writer.finish()
+
+
+def _decode(value: bytes) -> str:
+    """Decode a multipart header value, falling back to Latin-1."""
+    try:
+        return value.decode("utf-8")
+    except UnicodeDecodeError:
+        return value.decode("latin-1")
+
+
+class _FormSpooler:
+    """Multipart parser that writes the files of one form field to disk.
+
+    Each file part of ``field`` is written to the spool file ``open_file``
+    returns for its file name and content type as the part arrives, so an
+    upload is stored once and hashed in the same pass. Other parts are
+    skipped.
+    """
+
+    def __init__(
+        self,
+        boundary: bytes,
+        field: str,
+        open_file: Callable[[str, Optional[str]], _SpoolWriter],
+    ) -> None:
+        """Parse a body with ``boundary`` whose first chunk is still to come."""
+        self.field = field
+        self.open_file = open_file
+        self.parts: List[UploadedPart] = []
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_name = b""
+        self._header_value = b""
+        self._part: Optional[Tuple[str, Optional[str]]] = None
+        self._writer: Optional[_SpoolWriter] = None
+        self._parser = multipart.MultipartParser(
+            boundary,
+            {
+                "on_part_begin": self._on_part_begin,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+            },
+        )
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(
+            self._headers.get(b"content-disposition", b"")
+        )
+        if _decode(options.get(b"name", b"")) != self.field:
+            return
+        if b"filename" not in options:
+            return
+        name = _decode(options[b"filename"])
+        content_type = _decode(self._headers.get(b"content-type", b"")) or None
+        self._part = (name, content_type)
+        self._writer = self.open_file(name, content_type)
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._writer is not None:
+            self._writer.write(data[start:end])
+
+    def _on_part_end(self) -> None:
+        if self._writer is not None and self._part is not None:
+            name, content_type = self._part
+            self.parts.append((name, content_type, self._writer.finish()))
+        self._part = None
+        self._writer = None
+
+    def write(self, chunk: bytes) -> None:
+        """Parse the next chunk of the body."""
+        self._parser.write(chunk)
+
+    def finish(self) -> List[UploadedPart]:
+        """End the body and return its file parts."""
+        self._parser.finalize()
+        if self._writer is not None:
+            raise ValueError("Multipart body ended inside a part")
+        return self.parts
+
+    def discard(self) -> None:
+        """Delete every spool file written so far."""
+        if self._writer is not None:
+            self._writer.discard()
+            self._writer = None
+        for _, _, upload in self.parts:
+            upload.remove()
+
+
+async def _spool_form(
+    request: Request,
+    field: str,
+    open_file: Callable[[str, Optional[str]], _SpoolWriter],
+) -> List[UploadedPart]:
+    """Stream a multipart body, spooling the files of ``field`` as they arrive.
+
+    Chunks are parsed in the thread pool, so writing and hashing them never
+    blocks the event loop. A malformed body is answered with ``400``.
+    """
+    content_type, options = parse_options_header(
+        request.headers.get("content-type", "")
+    )
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Files must be uploaded as multipart/form-data",
+        )
+    spooler = _FormSpooler(options[b"boundary"], field, open_file)
+    try:
+        async for chunk in request.stream():
+            if chunk:
+                await run_in_threadpool(spooler.write, chunk)
+        return spooler.finish()
+    except ValueError:
+        spooler.discard()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Malformed multipart body",
+        ) from None
+    except BaseException:
+        spooler.discard()
+        raise
+
+
+async def spool_upload(request: Request, settings: Settings) -> SpooledUpload:
+    """Stream the PDF uploaded as the ``file`` form field to a spool file.
+
+    The request body is parsed as it arrives and the PDF written straight
+    to the spool file, so it is neither held in memory nor copied from a
+    temporary file. The SHA-256 computed on the way is the document hash
+    used by the result and page caches. Uploads that are not a PDF, or not
+    exactly one file, are rejected with ``400`` and those larger than
+    ``max_pdf_mb`` with ``413`` as soon as the limit is crossed.
+    """
+    start = time.perf_counter()
+    names: List[str] = []
+
+    def open_file(name: str, content_type: Optional[str]) -> _SpoolWriter:
+        if content_type != "application/pdf":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="File must be a PDF"
+            )
+        if names:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Upload a single PDF",
+            )
+        names.append(name)
+        return _SpoolWriter(settings)
+
+    parts = await _spool_form(request, "file", open_file)
+    if not parts:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="No file uploaded"
+        )
+    UPLOAD_SECONDS.observe(time.perf_counter() - start)
+    return parts[0][2]
+
+
+class SpooledBatch:
+    """The PDFs of a batch upload, spooled into one directory by file name."""
+
+    def __init__(self, directory: str, settings: Settings) -> None:
+        """Create an empty batch that spools into ``directory``."""
+        self.directory = directory
+        self.settings = settings
+        self.files: Dict[str, SpooledUpload] = {}
+        self.size = 0
+
+    def add(self, name: str, source: IO[bytes]) -> None:
+        """Spool one PDF of the batch under ``name``.
+
+        Raises ``400`` for duplicate names or too many files and ``413`` once
+        the batch outgrows ``batch_max_mb``.
+        """
+        self._check(name)
+        self.add_spooled(name, _copy_to_spool(source, self.settings, self.directory))
+
+    def add_spooled(self, name: str, upload: SpooledUpload) -> None:
+        """Add a PDF already spooled into the batch directory under ``name``."""
+        settings = self.settings
+        self._check(name)
+        self.files[name] = upload
+        self.size += upload.size
+        if self.size > settings.batch_max_bytes:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Batch must be smaller than {settings.batch_max_mb}MB",
+            )
+
+    def _check(self, name: str) -> None:
+        """Refuse a duplicate name or a file over the batch's file limit."""
+        settings = self.settings
+        if name in self.files:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Duplicate file name in batch: {name}",
+            )
+        if len(self.files) >= settings.batch_max_files:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"A batch may hold at most {settings.batch_max_files} files",
+            )
+
+    def remove(self) -> None:
+        """Delete the spool directory and every file in it."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def _is_pdf_name(name: str) -> bool:
+    """Tell whether an archive member looks like a PDF worth scanning."""
+    base = os.path.basename(name)
+    return (
+        name.lower().endswith(".pdf")
+        and not base.startswith(".")
+        and not name.startswith("__MACOSX/")
+    )
+
+
+def _archive_members(path: str) -> Iterator[Tuple[str, IO[bytes]]]:
+    """Yield ``(name, stream)`` for the PDFs in a zip or tar archive.
+
+    Members are streamed straight from the archive; nothing is extracted to
+    paths chosen by the archive, so member names cannot escape the spool
+    directory. Other members, such as directories or READMEs, are skipped.
+    """
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and _is_pdf_name(info.filename):
+                    with archive.open(info) as member:
+                        yield info.filename, member
+        return
+    if tarfile.is_tarfile(path):
+        with tarfile.open(path) as tar:
+            for entry in tar:
+                if entry.isfile() and _is_pdf_name(entry.name):
+                    stream = tar.extractfile(entry)
+                    if stream is not None:
+                        with stream:
+                            yield entry.name, stream
+        return
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Batch files must be PDFs or zip/tar archives of PDFs",
+    )
+
+
+def _is_pdf_part(name: str, content_type: Optional[str]) -> bool:
+    """Tell whether an uploaded batch part is a PDF rather than an archive."""
+    return content_type == "application/pdf" or name.lower().endswith(".pdf")
+
+
+def _spool_batch(parts: List[UploadedPart], batch: SpooledBatch) -> None:
+    """Add uploaded PDFs to a batch and spool the PDFs of uploaded archives."""
+    for name, content_type, upload in parts:
+        if _is_pdf_part(name, content_type):
+            batch.add_spooled(name, upload)
+            continue
+        # Anything else must be an archive, opened from its spool file
+        try:
+            for member_name, member in _archive_members(upload.path):
+                batch.add(member_name, member)
+        finally:
+            upload.remove()
+
+
+async def spool_batch(request: Request, settings: Settings) -> SpooledBatch:
+    """Stream the PDFs of a batch upload into a spool directory.
+
+    Each ``files`` part is either a PDF, stored under its file name, or a
+    zip or tar archive (optionally compressed), whose PDFs are stored under
+    their path inside the archive. Parts are written to the directory as
+    they arrive; only archive members are copied out afterwards.
+    """
+    directory = tempfile.mkdtemp(prefix="batch-", dir=settings.upload_dir or None)
+    batch = SpooledBatch(directory, settings)
+
+    def open_file(name: str, content_type: Optional[str]) -> _SpoolWriter:
+        if _is_pdf_part(name, content_type):
+            return _SpoolWriter(settings, directory)
+        return _SpoolWriter(settings, directory, max_bytes=settings.batch_max_bytes)
+
+    start = time.perf_counter()
+    try:
+        parts = await _spool_form(request, "files", open_file)
+        if not parts:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="No files uploaded"
+            )
+        await run_in_threadpool(_spool_batch, parts, batch)
+    except BaseException:
+        batch.remove()
+        raise
+    UPLOAD_SECONDS.observe(time.perf_counter() - start)
+    return batch
@@ -4,7 +4,7 @@ from fastapi import Request, status
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
-from typing import Optional
+from typing import List, Optional
 
 
 async def validation_exception_handler(
@@ -21,7 +21,11 @@ async def http_exception_handler(
     request: Request, exc: StarletteHTTPException
 ) -> JSONResponse:
     """Handle HTTP exceptions."""
-    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers=getattr(exc, "headers", None),
+    )
 
 
 async def payload_too_large_handler(request: Request, exc: Exception) -> JSONResponse:
@@ -33,7 +37,17 @@ async def payload_too_large_handler(request: Request, exc: Exception) -> JSONRes
 
 
 async def rate_limit_exceeded_handler(request: Request, exc: Exception) -> JSONResponse:
-    """Handle rate limit exceeded errors."""
+    """Handle rate limit exceeded errors.
+
+    Application errors such as a full job queue keep their own detail and
+    headers (e.g. ``Retry-After``).
+    """
+    if isinstance(exc, ZebraFetchException):
+        return JSONResponse(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            content={"detail": exc.detail},
+            headers=exc.headers,
+        )
     return JSONResponse(
         status_code=status.HTTP_429_TOO_MANY_REQUESTS,
         content={"detail": "Rate limit exceeded"},
@@ -58,6 +72,21 @@ class PDFProcessingError(ZebraFetchException):
         super().__init__(status_code=400, detail=f"PDF processing error: {detail}")
 
 
+class UnsupportedSymbologyError(ZebraFetchException):
+    """Exception raised when a request names unknown barcode symbologies."""
+
+    def __init__(self, names: List[str], supported: List[str]) -> None:
+        """Initialize with a 400 Bad Request status code."""
+        super().__init__(
+            status_code=400,
+            detail=(
+                f"Unsupported barcode types: {', '.join(names)}. "
+                f"Supported types: {', '.join(supported)}"
+            ),
+        )
+        self.names = names
+
+
 class JobNotFoundError(ZebraFetchException):
     """Exception raised when a requested job is not found."""
 
@@ -93,3 +122,15 @@ class RateLimitError(ZebraFetchException):
     def __init__(self, detail: str = "Rate limit exceeded") -> None:
         """Initialize with a 429 Too Many Requests status code."""
         super().__init__(status_code=429, detail=detail)
+
+
+class QueueFullError(ZebraFetchException):
+    """Exception raised when the job queue cannot accept more jobs."""
+
+    def __init__(self, retry_after: int) -> None:
+        """Initialize with a 429 Too Many Requests status code."""
+        super().__init__(
+            status_code=429,
+            detail="Job queue is full, retry later",
+            headers={"Retry-After": str(retry_after)},
+        )
@@ -8,11 +8,18 @@ from fastapi.responses import JSONResponse
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from starlette.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
-from prometheus_client import Counter, make_asgi_app
+from prometheus_client import make_asgi_app
 from fastapi.exceptions import RequestValidationError
 
-from .config import get_settings
-from .db import init_db, cleanup_expired_jobs
+from .config import Settings, get_settings
+from .middleware import (
+    MULTIPART_OVERHEAD,
+    RequestMetricsMiddleware,
+    UploadLimitMiddleware,
+)
+from .db import init_db, cleanup_expired_jobs, close_db
+from .services.parallel import prewarm_process_pool, shutdown_process_pool
+from .services.scanner import warm_up
 from .exceptions import (
     validation_exception_handler as old_validation_handler,
     http_exception_handler as old_http_handler,
@@ -20,7 +27,7 @@ from .exceptions import (
     rate_limit_exceeded_handler,
     ZebraFetchException,
 )
-from .routes import jobs, scan
+from .routes import jobs, scan, templates
 
 settings = get_settings()
 
@@ -48,25 +55,32 @@ app.add_middleware(
     allow_headers=settings.cors.allow_headers,
 )
 
+# Reject oversized uploads while they stream in
+app.add_middleware(
+    UploadLimitMiddleware,
+    max_bytes=settings.max_pdf_bytes + MULTIPART_OVERHEAD,
+    path_limits={
+        path: settings.batch_max_bytes + MULTIPART_OVERHEAD
+        for path in ("/v1/scan/batch", "/v1/jobs/batch")
+    },
+)
+
 # Add exception handlers
 app.add_exception_handler(RequestValidationError, old_validation_handler)  # type: ignore
 app.add_exception_handler(StarletteHTTPException, old_http_handler)  # type: ignore
 app.add_exception_handler(413, payload_too_large_handler)  # type: ignore
 app.add_exception_handler(429, rate_limit_exceeded_handler)  # type: ignore
 
-# Metrics
-REQUEST_COUNT = Counter(
-    "http_requests_total", "Total HTTP Requests", ["method", "endpoint", "status"]
-)
-
 # Setup Prometheus metrics if enabled
 if settings.metrics_enabled:
+    app.add_middleware(RequestMetricsMiddleware)
     metrics_app = make_asgi_app()
     app.mount("/metrics", metrics_app)
 
 # Include routers
 app.include_router(scan.router)
 app.include_router(jobs.router)
+app.include_router(templates.router)
 
 
 @app.get("/health")  # type: ignore
@@ -89,16 +103,38 @@ async def root() -> Dict[str, str]:
 async def startup_event() -> None:
     """Initialize application on startup."""
     await init_db()
+    await prewarm_scanners(get_settings())
+    await jobs.start_scheduler(get_settings())
+    jobs.start_webhooks(get_settings())
     asyncio.create_task(periodic_cleanup())
 
 
+@app.on_event("shutdown")  # type: ignore
+async def shutdown_event() -> None:
+    """Stop job workers and release scan processes and database connections."""
+    await jobs.stop_scheduler()
+    await jobs.webhooks.stop()
+    shutdown_process_pool()
+    close_db()
+
+
+async def prewarm_scanners(settings: Settings) -> None:
+    """Load scanning libraries and start the scan workers before serving."""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, warm_up)
+    if settings.prewarm_workers and settings.worker_pool_size > 1:
+        await loop.run_in_executor(
+            None, prewarm_process_pool, settings.worker_pool_size
+        )
+
+
 async def periodic_cleanup() -> None:
     """Periodically clean up expired jobs."""
     while True:
         try:
             await cleanup_expired_jobs()
         except Exception as e:
-            logger.error(f"Error in periodic cleanup: {e}")
+            logger.error("Error in periodic cleanup: %s", e)
         await asyncio.sleep(settings.cleanup_interval)
 
 
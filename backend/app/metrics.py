@@ -0,0 +1,87 @@
+"""Prometheus metrics shared across the ZebraFetch application."""
+
+from typing import Any, Dict, Iterable
+
+from prometheus_client import Counter, Gauge, Histogram
+
+REQUEST_COUNT = Counter(
+    "http_requests_total", "Total HTTP Requests", ["method", "endpoint", "status"]
+)
+SCAN_CACHE_HITS = Counter("scan_cache_hits_total", "Scan result cache hits", ["tier"])
+SCAN_CACHE_MISSES = Counter("scan_cache_misses_total", "Scan result cache misses")
+PAGE_CACHE_HITS = Counter("scan_page_cache_hits_total", "Page decode cache hits")
+PAGE_CACHE_MISSES = Counter("scan_page_cache_misses_total", "Page decode cache misses")
+JOB_QUEUE_DEPTH = Gauge("job_queue_depth", "Jobs waiting for a scheduler worker")
+JOB_QUEUE_WAIT = Histogram(
+    "job_queue_wait_seconds",
+    "Time jobs spend queued before a worker starts them",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+JOB_QUEUE_REJECTED = Counter(
+    "job_queue_rejected_total", "Jobs rejected because the queue was full"
+)
+ACTIVE_JOBS = Gauge("active_jobs", "Jobs a scheduler worker is running")
+JOB_DURATION = Histogram(
+    "job_duration_seconds",
+    "Time taken to process jobs, from start to stored result",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800),
+)
+WEBHOOK_DELIVERIES = Counter(
+    "webhook_deliveries_total", "Webhook delivery attempts by outcome", ["outcome"]
+)
+SCAN_STAGE_SECONDS = Histogram(
+    "scan_stage_seconds",
+    "Time spent per stage: upload and open per document, render, decode and "
+    "encode per page, db_write per statement",
+    ["stage"],
+    buckets=(
+        0.0005,
+        0.001,
+        0.0025,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1,
+        2.5,
+        5,
+        10,
+        30,
+    ),
+)
+SCAN_PAGES = Counter(
+    "scan_pages_total", "Pages scanned, by how they were decoded", ["mode"]
+)
+SCAN_BARCODES = Counter("scan_barcodes_total", "Barcodes decoded")
+SCANS_CANCELLED = Counter(
+    "scans_cancelled_total",
+    "Scans stopped before their last page, on request or out of budget",
+    ["reason"],
+)
+
+# Children bound once, so observing a stage skips the label lookup
+UPLOAD_SECONDS = SCAN_STAGE_SECONDS.labels("upload")
+OPEN_SECONDS = SCAN_STAGE_SECONDS.labels("open")
+RENDER_SECONDS = SCAN_STAGE_SECONDS.labels("render")
+DECODE_SECONDS = SCAN_STAGE_SECONDS.labels("decode")
+ENCODE_SECONDS = SCAN_STAGE_SECONDS.labels("encode")
+DB_WRITE_SECONDS = SCAN_STAGE_SECONDS.labels("db_write")
+
+
+def observe_pages(page_stats: Iterable[Dict[str, Any]]) -> None:
+    """Record the timings and counts of scanned pages.
+
+    Pages are scanned in pool worker processes, whose metrics are never
+    exported, so this runs in the serving process on the ``page_stats`` the
+    workers send back.
+    """
+    for stats in page_stats:
+        RENDER_SECONDS.observe(stats["render_ms"] / 1000)
+        DECODE_SECONDS.observe(stats["decode_ms"] / 1000)
+        if stats["encode_ms"]:
+            ENCODE_SECONDS.observe(stats["encode_ms"] / 1000)
+        SCAN_PAGES.labels(stats["mode"]).inc()
+        SCAN_BARCODES.inc(stats["barcodes"])
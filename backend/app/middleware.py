@@ -0,0 +1,114 @@
+"""ASGI middleware for the ZebraFetch application."""
+
+from typing import Any, Awaitable, Callable, Dict, MutableMapping, Optional
+
+from fastapi import HTTPException, status
+from starlette.responses import JSONResponse
+
+from app.metrics import REQUEST_COUNT
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+# Allowance for multipart boundaries and form fields around an uploaded PDF
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadLimitMiddleware:
+    """Reject request bodies over ``max_bytes`` while they are still arriving.
+
+    Requests announcing a larger ``Content-Length`` are refused before any of
+    the body is read, and ones whose ``Content-Length`` is not a plain
+    non-negative number get ``400``. Chunked uploads are counted as they stream in and
+    aborted with ``413`` as soon as they cross the limit, so an oversized PDF
+    is never spooled in full. ``path_limits`` sets a different limit for
+    specific paths, such as batch uploads.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_bytes: int,
+        path_limits: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """Wrap ``app`` with a body size limit of ``max_bytes``."""
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_limits = path_limits or {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Enforce the limit on HTTP requests that carry a body."""
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT"):
+            await self.app(scope, receive, send)
+            return
+
+        max_bytes = self.path_limits.get(scope["path"], self.max_bytes)
+        headers: Dict[bytes, bytes] = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and not content_length.isdigit():
+            response = JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={"detail": "Invalid Content-Length header"},
+            )
+            await response(scope, receive, send)
+            return
+        if content_length is not None and int(content_length) > max_bytes:
+            response = JSONResponse(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                content={"detail": "File too large"},
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail="File too large",
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+class RequestMetricsMiddleware:
+    """Count HTTP requests by method, route and status code.
+
+    Requests are labelled with the route's path template, such as
+    ``/v1/jobs/{job_id}``, so job IDs do not create new time series; paths
+    that match no route share the ``unmatched`` label.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Wrap ``app``."""
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Count the request once its response status is known."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def record_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, record_status)
+        finally:
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or "unmatched"
+            REQUEST_COUNT.labels(scope["method"], endpoint, str(status_code)).inc()
@@ -1,142 +1,700 @@
 """Job management routes for the ZebraFetch API."""
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, status
-from fastapi.responses import JSONResponse
-from typing import Optional, Coroutine, Any
+from fastapi import (
+    APIRouter,
+    HTTPException,
+    Depends,
+    Header,
+    Query,
+    Request,
+    status,
+)
+from fastapi.responses import JSONResponse, StreamingResponse
+from functools import partial
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
 import asyncio
-import tempfile
+import hashlib
+import json
 import os
+import shutil
+import time
 import uuid
-import sys
 
-from app.config import get_settings
-from app.services.scanner import Scanner
+from app.config import Settings, get_settings
+from app.exceptions import InvalidJobStateError, JobNotFoundError, QueueFullError
+from app.metrics import JOB_QUEUE_DEPTH, JOB_QUEUE_REJECTED, SCANS_CANCELLED
+from app.services.artifacts import (
+    ArtifactStore,
+    find_artifact,
+    iter_file,
+    media_type_for,
+    parse_byte_range,
+)
+from app.services.batch import BatchOutcomes, batch_response, scan_batch
+from app.services.cache import (
+    PageRecords,
+    compute_document_hash,
+    get_cached_result,
+    get_result_cache,
+    make_cache_key,
+    scan_response,
+    store_result,
+)
+from app.services.cancel import CancelToken, ScanBudgetExceeded, ScanCancelled
+from app.services.jobqueue import WORKER_ID, JobBackend, JobLease, get_job_backend
+from app.services.progress import TERMINAL_STATUSES, progress
+from app.services.scanner import count_pages
+from app.services.scheduler import JobScheduler, QueuedJob, QueuePoller
+from app.services.webhooks import WebhookDispatcher, resolve_callback_url
 from app.dependencies.auth import get_api_key
-from app.db import create_job, update_job_status, get_job
+from app.dependencies.scan import (
+    build_scanner,
+    parse_limits,
+    parse_page_range,
+    parse_symbologies,
+    resolve_regions,
+)
+from app.dependencies.upload import (
+    BATCH_UPLOAD_BODY,
+    PDF_UPLOAD_BODY,
+    spool_batch,
+    spool_upload,
+)
 
 router = APIRouter(prefix="/v1")
 
+# Seconds between keep-alive comments on idle progress streams
+SSE_HEARTBEAT_SEC = 15.0
 
-# Global task group manager
-class TaskGroupManager:
-    """Manages a global asyncio.TaskGroup for job processing."""
+# Retry-After of a full shared queue, whose drain rate no process knows
+SHARED_QUEUE_RETRY_AFTER_SEC = 5
 
-    def __init__(self) -> None:
-        """Initialize the TaskGroupManager."""
-        self._task_group: Optional[Any] = None
-        self._lock = asyncio.Lock()
 
-    async def get_task_group(self) -> Any:
-        """Get or create the global TaskGroup instance."""
-        async with self._lock:
-            if self._task_group is None:
-                if sys.version_info >= (3, 11):
-                    self._task_group = asyncio.TaskGroup()
-                else:
-                    raise NotImplementedError("TaskGroup requires Python 3.11+")
-            return self._task_group
+def _store() -> JobBackend:
+    """Return the configured job queue and result store."""
+    return get_job_backend(get_settings())
 
-    async def create_task(self, coro: Coroutine[Any, Any, None]) -> None:
-        """Add a coroutine to the global TaskGroup."""
-        task_group = await self.get_task_group()
-        async with task_group:
-            task_group.create_task(coro)
 
+async def _finish_job(
+    job_id: str,
+    job_status: str,
+    result: Dict[str, Any],
+    artifact_paths: Optional[List[str]] = None,
+    callback_url: Optional[str] = None,
+) -> None:
+    """Store a job's final status and result and announce it.
+
+    Waiting clients are woken, and with a ``callback_url`` a webhook is
+    queued in the outbox together with the result. Jobs this process runs
+    are only finished while it still holds their lease; otherwise the lease
+    is marked lost and the job is left to the worker that reclaimed it.
+    """
+    lease = _running.get(job_id)
+    stored = await _store().set_status(
+        job_id,
+        job_status,
+        result,
+        artifact_paths,
+        callback_url=callback_url,
+        worker=WORKER_ID if lease is not None else None,
+    )
+    if not stored:
+        if lease is not None:
+            lease.lost = True
+        return
+    if callback_url:
+        webhooks.notify()
+    progress.publish(job_id, status=job_status)
+
+
+async def _complete_job(
+    job_id: str,
+    records: PageRecords,
+    settings: Settings,
+    callback_url: Optional[str] = None,
+) -> None:
+    """Store a job's result, moving embedded images into the artifact store.
+
+    The stored result only references the image files, which keeps
+    ``result_json`` small and job polling cheap.
+    """
+    store = ArtifactStore(settings.artifact_dir)
+    loop = asyncio.get_event_loop()
+    records, paths = await loop.run_in_executor(
+        None, store.externalize, job_id, records
+    )
+    await _finish_job(job_id, "completed", scan_response(records), paths, callback_url)
+
+
+async def _complete_batch_job(
+    job_id: str,
+    outcomes: BatchOutcomes,
+    settings: Settings,
+    callback_url: Optional[str] = None,
+) -> None:
+    """Store a batch job's per-file results, externalizing their images.
+
+    Artifact names are prefixed with the file's position in the batch so
+    pages of different files do not collide.
+    """
+    store = ArtifactStore(settings.artifact_dir)
+    loop = asyncio.get_event_loop()
+    paths: List[str] = []
+    for index, (name, outcome) in enumerate(outcomes.items()):
+        if "records" in outcome:
+            records, written = await loop.run_in_executor(
+                None,
+                store.externalize,
+                job_id,
+                outcome["records"],
+                f"file-{index + 1}-",
+            )
+            outcomes[name] = {"records": records}
+            paths.extend(written)
+    await _finish_job(
+        job_id, "completed", batch_response(outcomes), paths, callback_url
+    )
+
+
+def _remove_file(path: str) -> None:
+    """Delete a job's input file or batch spool directory, ignoring errors."""
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+        return
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+async def _cached_records(
+    settings: Settings,
+    pdf_path: str,
+    params: Dict[str, Any],
+    doc_hash: Optional[str] = None,
+) -> Tuple[Optional[PageRecords], Optional[str], Optional[str]]:
+    """Look up a job's scan options in the result cache.
+
+    Returns ``(records, cache_key, doc_hash)``; ``records`` is ``None`` on a
+    miss, and the key and hash are reused to store the result later.
+    """
+    scanner = build_scanner(settings, params.get("regions"), params.get("limits"))
+    cache = get_result_cache(settings)
+    if doc_hash is None and (cache is not None or scanner.page_cache is not None):
+        doc_hash = await compute_document_hash(pdf_path)
+    if cache is None or doc_hash is None:
+        return None, None, doc_hash
+    cache_key = make_cache_key(
+        doc_hash,
+        params["pages"],
+        params["types"],
+        params["embed_page"],
+        params["embed_snippet"],
+        scanner.options(),
+    )
+    return await get_cached_result(cache, cache_key), cache_key, doc_hash
+
+
+async def _run_batch_job(
+    job: QueuedJob, settings: Settings, cancel: CancelToken
+) -> None:
+    """Scan a batch job's PDFs, publishing progress as each file finishes."""
+    loop = asyncio.get_running_loop()
+    documents = [tuple(document) for document in job.params["documents"]]
+    counts = {"files_done": 0, "pages_done": 0, "barcodes": 0}
+    progress.publish(job.job_id, status="running", files_total=len(documents), **counts)
+
+    def on_outcome(name: str, outcome: Dict[str, Any]) -> None:
+        # Called for one document at a time, first on the loop for cache
+        # hits, then from the executor thread for scanned documents
+        counts["files_done"] += 1
+        for record in outcome.get("records", []):
+            counts["pages_done"] += 1
+            counts["barcodes"] += len(record["results"])
+        progress.publish_threadsafe(loop, job.job_id, **counts)
+
+    outcomes = await scan_batch(
+        build_scanner(settings, limits=job.params.get("limits"), cancel=cancel),
+        get_result_cache(settings),
+        documents,
+        job.params,
+        on_outcome,
+    )
+    cancel.check()
+    await _complete_batch_job(
+        job.job_id, outcomes, settings, job.params.get("callback_url")
+    )
+
+
+def _scan_with_progress(
+    loop: asyncio.AbstractEventLoop, job_id: str, records: Iterator[Dict[str, Any]]
+) -> PageRecords:
+    """Collect a job's per-page records, publishing progress after each page."""
+    collected = []
+    barcodes = 0
+    for record in records:
+        collected.append(record)
+        barcodes += len(record["results"])
+        progress.publish_threadsafe(
+            loop, job_id, pages_done=len(collected), barcodes=barcodes
+        )
+    return collected
+
+
+async def _scan_job(job: QueuedJob, settings: Settings, cancel: CancelToken) -> None:
+    """Scan a job's PDF, publishing progress, and store the result."""
+    params = job.params
+    input_path = params["input_path"]
+    loop = asyncio.get_running_loop()
+    pages_total = await loop.run_in_executor(
+        None, count_pages, input_path, params["pages"]
+    )
+    progress.publish(
+        job.job_id,
+        status="running",
+        pages_done=0,
+        pages_total=pages_total,
+        barcodes=0,
+    )
+
+    records, cache_key, doc_hash = await _cached_records(
+        settings, input_path, params, params.get("doc_hash")
+    )
+
+    if records is None:
+        # Process PDF straight from the spooled input file
+        scanner = build_scanner(
+            settings, params.get("regions"), params.get("limits"), cancel
+        )
+        records = await loop.run_in_executor(
+            None,
+            _scan_with_progress,
+            loop,
+            job.job_id,
+            scanner.iter_records(
+                input_path,
+                page_range=params["pages"],
+                symbologies=params["types"],
+                embed_page=params["embed_page"],
+                embed_snippet=params["embed_snippet"],
+                doc_hash=doc_hash,
+            ),
+        )
+        cache = get_result_cache(settings)
+        if cache is not None and cache_key is not None:
+            await store_result(cache, cache_key, records)
+
+    # Update job with results, unless it was cancelled meanwhile
+    cancel.check()
+    await _complete_job(job.job_id, records, settings, params.get("callback_url"))
+
+
+async def _run_claimed_job(job: QueuedJob) -> None:
+    """Run a job claimed by this process and store the result or the error.
+
+    The job's lease is renewed while it runs, which also picks up
+    cancellations requested through other processes. A job that was
+    claimed more than ``job_max_attempts`` times keeps killing its workers
+    and fails. If this worker stops or loses the lease, the job and its
+    input are left for the next worker.
+    """
+    settings = get_settings()
+    params = job.params
+    budget = params.get("budget") or {}
+    cancel = CancelToken(budget.get("timeout_sec"), budget.get("max_pages", 0))
+    lease = JobLease(
+        _store(), job.job_id, settings, cancel, partial(progress.snapshot, job.job_id)
+    )
+    _running[job.job_id] = lease
+    heartbeat = asyncio.create_task(lease.run())
+    keep_input = False
+    try:
+        if job.attempts > settings.job_max_attempts:
+            raise RuntimeError(f"Job stopped its worker {job.attempts - 1} times")
+        if params.get("kind") == "batch":
+            await _run_batch_job(job, settings, cancel)
+        else:
+            await _scan_job(job, settings, cancel)
+
+    except ScanCancelled as e:
+        if lease.lost:
+            # The job belongs to another worker now
+            keep_input = True
+            return
+        # Jobs over budget fail; jobs cancelled by a client are cancelled
+        over_budget = isinstance(e, ScanBudgetExceeded)
+        SCANS_CANCELLED.labels(reason="budget" if over_budget else "cancelled").inc()
+        await _finish_job(
+            job.job_id,
+            "failed" if over_budget else "cancelled",
+            {"error": str(e)},
+            callback_url=params.get("callback_url"),
+        )
+
+    except Exception as e:
+        # Update job with error
+        await _finish_job(
+            job.job_id,
+            "failed",
+            {"error": str(e)},
+            callback_url=params.get("callback_url"),
+        )
+
+    except asyncio.CancelledError:
+        # The worker is stopping: end the scan and requeue the job
+        keep_input = True
+        cancel.cancel("Worker stopped")
+        await _store().release(job.job_id, WORKER_ID)
+        raise
+
+    finally:
+        heartbeat.cancel()
+        _running.pop(job.job_id, None)
+        if not keep_input and not lease.lost:
+            # Clean up temporary file
+            _remove_file(params["input_path"])
+
+
+async def _run_job(job: QueuedJob) -> None:
+    """Claim a job queued in this process and run it, unless it is taken."""
+    claimed = await _store().claim(job.job_id, WORKER_ID, get_settings().job_lease_sec)
+    if claimed is None:
+        # Cancelled while queued, or run by another process
+        return
+    job.attempts = claimed["attempts"]
+    await _run_claimed_job(job)
+
+
+async def _claim_next_job() -> Optional[QueuedJob]:
+    """Claim the next job of the shared queue, if there is one."""
+    claimed = await _store().claim(None, WORKER_ID, get_settings().job_lease_sec)
+    if claimed is None:
+        return None
+    job = QueuedJob(
+        claimed["id"],
+        owner=claimed["owner"],
+        priority=claimed["priority"],
+        params={**(claimed["params_json"] or {}), "input_path": claimed["input_path"]},
+    )
+    job.attempts = claimed["attempts"]
+    return job
+
+
+# Queue and workers that run scan jobs; started with the application
+scheduler = JobScheduler(_run_job)
+
+# Workers that claim jobs from a shared queue instead, if configured
+poller = QueuePoller(_claim_next_job, _run_claimed_job)
+
+# Leases of the jobs this process is running, by job ID
+_running: Dict[str, JobLease] = {}
+
+# Delivery of job completion callbacks; started with the application
+webhooks = WebhookDispatcher()
+
+
+def start_webhooks(settings: Settings) -> None:
+    """Configure webhook delivery from the settings and start it."""
+    webhooks.concurrency = settings.webhook_concurrency
+    webhooks.timeout_sec = settings.webhook_timeout_sec
+    webhooks.max_attempts = settings.webhook_max_attempts
+    webhooks.backoff_sec = settings.webhook_backoff_sec
+    webhooks.backoff_max_sec = settings.webhook_backoff_max_sec
+    webhooks.allowed_hosts = list(settings.webhook_allowed_hosts)
+    webhooks.start()
+
+
+async def start_scheduler(settings: Settings) -> None:
+    """Start the job workers and re-queue jobs interrupted by a restart.
+
+    With the local queue, jobs left ``pending`` or ``running`` are queued
+    again in their original order unless their input file or options are
+    gone, in which case they are marked failed. A shared queue needs no
+    recovery: its jobs stay claimable, running ones once their lease ends.
+    """
+    store = get_job_backend(settings)
+    if settings.job_queue == "shared":
+        if settings.run_job_workers:
+            poller.start(settings.job_concurrency, settings.job_poll_sec)
+        return
+    scheduler.start(settings.job_concurrency, settings.job_queue_size)
+    for row in await store.unfinished():
+        params = row["params_json"]
+        if params is None or not os.path.exists(row["input_path"]):
+            await _finish_job(
+                row["id"],
+                "failed",
+                {"error": "Job input was lost when the service restarted"},
+                callback_url=(params or {}).get("callback_url"),
+            )
+            continue
+        if row["status"] == "running":
+            await store.set_status(row["id"], "pending")
+        progress.publish(row["id"], status="pending")
+        scheduler.submit(
+            QueuedJob(
+                row["id"],
+                owner=row["owner"],
+                priority=row["priority"],
+                params={**params, "input_path": row["input_path"]},
+            ),
+            reserved=False,
+        )
+
+
+async def stop_scheduler() -> None:
+    """Stop the job workers, handing the jobs they run back to the queue."""
+    await scheduler.stop()
+    await poller.stop()
+
+
+async def _reserve_slot(settings: Settings) -> None:
+    """Claim a queue slot for a new job, raising ``QueueFullError`` if full.
+
+    The shared queue is counted in the job store, so its slots are only
+    taken once the job is created and ``_release_slot`` is a no-op.
+    """
+    if settings.job_queue == "local":
+        scheduler.reserve()
+        return
+    depth = await _store().depth()
+    JOB_QUEUE_DEPTH.set(depth)
+    if depth >= settings.job_queue_size:
+        JOB_QUEUE_REJECTED.inc()
+        raise QueueFullError(SHARED_QUEUE_RETRY_AFTER_SEC)
+
+
+def _release_slot(settings: Settings) -> None:
+    """Give back a slot claimed by ``_reserve_slot`` for a job not created."""
+    if settings.job_queue == "local":
+        scheduler.release()
+
+
+def _enqueue(settings: Settings, job: QueuedJob) -> None:
+    """Hand a created job to the local scheduler or wake the shared workers."""
+    if settings.job_queue == "local":
+        progress.publish(job.job_id, status="pending")
+        scheduler.submit(job)
+    else:
+        poller.notify()
+
+
+async def _parse_callback_url(
+    settings: Settings, callback_url: Optional[str]
+) -> Optional[str]:
+    """Validate a job's webhook URL, which must be public absolute http(s)."""
+    if callback_url is None:
+        return None
+    try:
+        await resolve_callback_url(callback_url, settings.webhook_allowed_hosts)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        ) from None
+    except OSError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="callback_url host could not be resolved",
+        ) from None
+    return callback_url
+
+
+def _job_budget(
+    settings: Settings, timeout_sec: Optional[float], max_pages: Optional[int]
+) -> Dict[str, Any]:
+    """Combine a job's requested budgets with the configured ceilings.
+
+    Each budget is the smaller of the two where both are set; 0 is none.
+    """
+
+    def tighter(requested: Optional[float], ceiling: float) -> Any:
+        limits = [limit for limit in (requested, ceiling) if limit]
+        return min(limits) if limits else 0
+
+    return {
+        "timeout_sec": tighter(timeout_sec, settings.job_timeout_sec),
+        "max_pages": tighter(max_pages, settings.job_max_pages),
+    }
 
-# Initialize task group manager
-task_manager = TaskGroupManager()
 
+def _job_owner(api_key: str) -> str:
+    """Identify the owner of a job for fair scheduling without storing keys."""
+    if not api_key:
+        return ""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
 
-@router.post("/jobs")  # type: ignore
+
+async def _owned_job(job_id: str, api_key: str) -> Dict[str, Any]:
+    """Load a job, answering ``404`` unless the caller's key created it."""
+    job = await _store().get(job_id)
+    if not job or job["owner"] != _job_owner(api_key):
+        raise JobNotFoundError(job_id)
+    return job
+
+
+@router.post("/jobs", openapi_extra=PDF_UPLOAD_BODY)  # type: ignore
 async def create_scan_job(
-    file: UploadFile = File(...),
+    request: Request,
     pages: Optional[str] = None,
     types: Optional[str] = None,
     embed_page: bool = False,
     embed_snippet: bool = False,
+    regions: Optional[str] = None,
+    template: Optional[str] = None,
+    stop_after: int = Query(0, ge=0),
+    first_match_per_page: bool = False,
+    match: Optional[str] = None,
+    timeout_sec: Optional[float] = Query(None, gt=0),
+    max_pages: Optional[int] = Query(None, ge=1),
+    priority: int = Query(0, ge=0, le=9),
+    callback_url: Optional[str] = None,
     api_key: str = Depends(get_api_key),
 ) -> JSONResponse:
-    """Create an asynchronous scan job."""
-    settings = get_settings()
+    """Create an asynchronous scan job.
 
-    # Validate file type
-    if not file.content_type == "application/pdf":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="File must be a PDF"
-        )
+    The job is queued and the response returns immediately. Jobs with a
+    higher ``priority`` run first; jobs of different API keys with the same
+    priority take turns. A full queue is answered with ``429``.
 
-    # Read file content
-    content = await file.read()
+    ``regions`` or a saved ``template`` restrict decoding to crop boxes, and
+    ``match``, ``first_match_per_page`` and ``stop_after`` select results and
+    end the scan early, as for ``POST /v1/scan``; templates are resolved when
+    the job is created.
 
-    # Check file size
-    if len(content) > settings.max_pdf_bytes:
-        raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"PDF must be smaller than {settings.max_pdf_mb}MB",
-        )
+    ``timeout_sec`` and ``max_pages`` budget the scan, within the configured
+    ``job_timeout_sec`` and ``job_max_pages``; a job that runs out fails and
+    stops using CPU straight away. ``DELETE /v1/jobs/{id}`` cancels a job.
+
+    With ``callback_url``, the job's status and result are POSTed there as
+    JSON once it completes or fails, with retries until delivered.
+    """
+    settings = get_settings()
+
+    # Parse parameters before a job record exists
+    callback_url = await _parse_callback_url(settings, callback_url)
+    params = {
+        "pages": parse_page_range(pages),
+        "types": parse_symbologies(types),
+        "embed_page": embed_page,
+        "embed_snippet": embed_snippet,
+        "regions": await resolve_regions(regions, template),
+        "limits": parse_limits(stop_after, first_match_per_page, match),
+        "budget": _job_budget(settings, timeout_sec, max_pages),
+        "callback_url": callback_url,
+    }
 
-    # Generate job ID and create temporary file
     job_id = str(uuid.uuid4())
-    with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-        temp_file.write(content)
-        temp_path = temp_file.name
-
-    # Create job record
-    await create_job(job_id, temp_path)
-
-    # Parse parameters
-    page_range = None
-    if pages:
-        try:
-            if "-" in pages:
-                start, end = map(int, pages.split("-"))
-                page_range = list(range(start - 1, end))
-            else:
-                page_range = [int(p) - 1 for p in pages.split(",")]
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid page range format",
+    owner = _job_owner(api_key)
+
+    # Spool the upload to disk; the spool file becomes the job's input
+    upload = await spool_upload(request, settings)
+    params["doc_hash"] = upload.sha256
+
+    # Complete resubmitted documents straight from the result cache
+    try:
+        cached, _, _ = await _cached_records(
+            settings, upload.path, params, upload.sha256
+        )
+        if cached is not None:
+            await _store().create(job_id, "", params, priority, owner)
+            await _complete_job(job_id, cached, settings, callback_url)
+            upload.remove()
+            return JSONResponse(
+                status_code=status.HTTP_202_ACCEPTED, content={"job_id": job_id}
             )
 
-    symbologies = types.split(",") if types else None
+        # Claim a queue slot before the job record is written
+        await _reserve_slot(settings)
+    except BaseException:
+        upload.remove()
+        raise
+    try:
+        await _store().create(job_id, upload.path, params, priority, owner)
+    except BaseException:
+        _release_slot(settings)
+        upload.remove()
+        raise
 
-    # Schedule processing
-    async def process_job() -> None:
-        try:
-            # Update status to running
-            await update_job_status(job_id, "running")
+    _enqueue(
+        settings,
+        QueuedJob(
+            job_id,
+            owner=owner,
+            priority=priority,
+            params={**params, "input_path": upload.path},
+        ),
+    )
+
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED, content={"job_id": job_id}
+    )
 
-            # Process PDF
-            scanner = Scanner()
-            loop = asyncio.get_event_loop()
-            results = await loop.run_in_executor(
-                None,
-                lambda: scanner.scan_pdf(
-                    content,
-                    page_range=page_range,
-                    symbologies=symbologies,
-                    embed_page=embed_page,
-                    embed_snippet=embed_snippet,
-                ),
-            )
 
-            # Update job with results
-            await update_job_status(job_id, "completed", result={"results": results})
+@router.post("/jobs/batch", openapi_extra=BATCH_UPLOAD_BODY)  # type: ignore
+async def create_batch_job(
+    request: Request,
+    pages: Optional[str] = None,
+    types: Optional[str] = None,
+    embed_page: bool = False,
+    embed_snippet: bool = False,
+    stop_after: int = Query(0, ge=0),
+    first_match_per_page: bool = False,
+    match: Optional[str] = None,
+    timeout_sec: Optional[float] = Query(None, gt=0),
+    max_pages: Optional[int] = Query(None, ge=1),
+    priority: int = Query(0, ge=0, le=9),
+    callback_url: Optional[str] = None,
+    api_key: str = Depends(get_api_key),
+) -> JSONResponse:
+    """Create one asynchronous job that scans many PDFs.
 
-        except Exception as e:
-            # Update job with error
-            await update_job_status(job_id, "failed", result={"error": str(e)})
+    Files are given as for ``/v1/scan/batch``. The whole batch takes a
+    single queue slot, and the completed job's result maps each file name to
+    its results under ``files``. Budgets and ``callback_url`` work as for
+    ``/v1/jobs``, with ``max_pages`` counting the pages of all files.
+    """
+    settings = get_settings()
 
-        finally:
-            # Clean up temporary file
-            try:
-                os.unlink(temp_path)
-            except OSError:
-                pass
+    params: Dict[str, Any] = {
+        "kind": "batch",
+        "pages": parse_page_range(pages),
+        "types": parse_symbologies(types),
+        "embed_page": embed_page,
+        "embed_snippet": embed_snippet,
+        "limits": parse_limits(stop_after, first_match_per_page, match),
+        "budget": _job_budget(settings, timeout_sec, max_pages),
+        "callback_url": await _parse_callback_url(settings, callback_url),
+    }
 
-    # Add task to group
-    await task_manager.create_task(process_job())
+    job_id = str(uuid.uuid4())
+    owner = _job_owner(api_key)
+
+    # The spool directory becomes the job's input
+    batch = await spool_batch(request, settings)
+    params["documents"] = [
+        [name, upload.path, upload.sha256] for name, upload in batch.files.items()
+    ]
+    try:
+        await _reserve_slot(settings)
+    except BaseException:
+        batch.remove()
+        raise
+    try:
+        await _store().create(job_id, batch.directory, params, priority, owner)
+    except BaseException:
+        _release_slot(settings)
+        batch.remove()
+        raise
+
+    _enqueue(
+        settings,
+        QueuedJob(
+            job_id,
+            owner=owner,
+            priority=priority,
+            params={**params, "input_path": batch.directory},
+        ),
+    )
 
     return JSONResponse(
         status_code=status.HTTP_202_ACCEPTED, content={"job_id": job_id}
@@ -145,14 +703,251 @@ async def create_scan_job(
 
 @router.get("/jobs/{job_id}")  # type: ignore
 async def get_job_status(
-    job_id: str, api_key: str = Depends(get_api_key)
+    job_id: str,
+    wait: float = Query(0, ge=0),
+    api_key: str = Depends(get_api_key),
 ) -> JSONResponse:
-    """Get the status and results of a scan job."""
-    job = await get_job(job_id)
+    """Get the status and results of a scan job.
+
+    Jobs created with another API key are reported as not found. With
+    ``wait``, the request is held for up to that many seconds (at most
+    ``job_wait_max_sec``) until the job completes or fails. Waiting on a
+    job of this process is served from memory; if the job is still
+    unfinished when the wait ends, the response only has ``id``, ``status``
+    and ``progress`` and the database is not queried again. Jobs of a
+    shared queue run elsewhere are polled in the job store every
+    ``job_poll_sec``. Unfinished jobs include their latest ``progress``
+    snapshot, as of the last lease renewal for jobs of other processes.
+    """
+    settings = get_settings()
+    wait = min(wait, settings.job_wait_max_sec)
+    job: Optional[Dict[str, Any]] = await _owned_job(job_id, api_key)
+    if wait > 0 and progress.snapshot(job_id) is not None:
+        snapshot = await progress.wait_finished(job_id, wait)
+        if snapshot is not None and snapshot["status"] not in TERMINAL_STATUSES:
+            return JSONResponse(
+                content={
+                    "id": job_id,
+                    "status": snapshot["status"],
+                    "progress": snapshot,
+                }
+            )
+        job = None
+    elif wait > 0 and settings.job_queue == "shared":
+        job = await _wait_in_store(job_id, wait, settings.job_poll_sec)
+
+    if job is None:
+        job = await _store().get(job_id)
 
     if not job:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
         )
 
+    snapshot = progress.snapshot(job_id)
+    stored = job.pop("progress_json", None)
+    if snapshot is not None:
+        job["progress"] = snapshot
+    elif stored and job["status"] not in TERMINAL_STATUSES:
+        job["progress"] = stored
     return JSONResponse(content=job)
+
+
+async def _wait_in_store(
+    job_id: str, timeout: float, poll_sec: float
+) -> Optional[Dict[str, Any]]:
+    """Poll the job store until a job finishes or ``timeout`` passes."""
+    deadline = time.monotonic() + timeout
+    job = await _store().get(job_id)
+    while job is not None and job["status"] not in TERMINAL_STATUSES:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        await asyncio.sleep(min(poll_sec, remaining))
+        job = await _store().get(job_id)
+    return job
+
+
+@router.delete("/jobs/{job_id}")  # type: ignore
+async def cancel_job(
+    job_id: str,
+    api_key: str = Depends(get_api_key),
+) -> JSONResponse:
+    """Cancel a queued or running job.
+
+    A queued job is cancelled at once (``200``). A running job is told to
+    stop and answers ``202``; its scan ends within a page or a tile and the
+    job then becomes ``cancelled``, unless it finished first. Jobs running
+    in another process of a shared queue hear of it at their next lease
+    renewal. Jobs that already finished cannot be cancelled (``400``), and
+    jobs created with another API key are reported as not found.
+    """
+    settings = get_settings()
+    store = _store()
+    job = await _owned_job(job_id, api_key)
+    queued = scheduler.cancel(job_id)
+    if queued is not None:
+        return await _cancel_queued(job_id, queued.params)
+
+    running = _running.get(job_id)
+    if running is not None:
+        running.cancel.cancel("Job cancelled")
+        return _cancelling(job_id)
+
+    # Take a fresh look in case the job left this process meanwhile
+    job = await store.get(job_id) or job
+    if job["status"] == "pending":
+        # Taking the job from the queue keeps any worker from starting it
+        claimed = await store.claim(job_id, WORKER_ID, settings.job_lease_sec)
+        if claimed is not None:
+            params = {**(claimed["params_json"] or {}), "input_path": job["input_path"]}
+            return await _cancel_queued(job_id, params)
+        job = await store.get(job_id) or job
+    if job["status"] == "running":
+        await store.request_cancel(job_id)
+        return _cancelling(job_id)
+    raise InvalidJobStateError(job_id, job["status"])
+
+
+async def _cancel_queued(job_id: str, params: Dict[str, Any]) -> JSONResponse:
+    """Mark a job taken off the queue cancelled and drop its input."""
+    await _finish_job(
+        job_id,
+        "cancelled",
+        {"error": "Job cancelled"},
+        callback_url=params.get("callback_url"),
+    )
+    SCANS_CANCELLED.labels(reason="cancelled").inc()
+    _remove_file(params["input_path"])
+    return JSONResponse(content={"id": job_id, "status": "cancelled"})
+
+
+def _cancelling(job_id: str) -> JSONResponse:
+    """Answer a cancellation that the job's worker has yet to act on."""
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={"id": job_id, "status": "cancelling"},
+    )
+
+
+def _sse_event(event: str, data: Dict[str, Any]) -> bytes:
+    """Format one Server-Sent Event."""
+    return (
+        f"id: {data.get('version', 0)}\nevent: {event}\n"
+        f"data: {json.dumps(data)}\n\n"
+    ).encode()
+
+
+async def _sse_stream(job_id: str) -> AsyncIterator[bytes]:
+    """Relay a job's progress snapshots as Server-Sent Events."""
+    async for snapshot in progress.subscribe(job_id, SSE_HEARTBEAT_SEC):
+        if snapshot is None:
+            yield b": keepalive\n\n"
+            continue
+        job_status = snapshot.get("status")
+        event = job_status if job_status in TERMINAL_STATUSES else "progress"
+        yield _sse_event(str(event), snapshot)
+
+
+async def _sse_poll(job_id: str, poll_sec: float) -> AsyncIterator[bytes]:
+    """Relay a job run by another process as Server-Sent Events.
+
+    The job store is polled every ``poll_sec``; progress arrives as often
+    as the job's worker renews its lease.
+    """
+    last: Optional[Dict[str, Any]] = None
+    idle = 0.0
+    while True:
+        job = await _store().get(job_id)
+        if job is None:
+            return
+        snapshot = {**(job.get("progress_json") or {}), "status": job["status"]}
+        if snapshot != last:
+            last, idle = snapshot, 0.0
+            finished = job["status"] in TERMINAL_STATUSES
+            yield _sse_event(job["status"] if finished else "progress", snapshot)
+            if finished:
+                return
+        elif idle >= SSE_HEARTBEAT_SEC:
+            idle = 0.0
+            yield b": keepalive\n\n"
+        await asyncio.sleep(poll_sec)
+        idle += poll_sec
+
+
+@router.get("/jobs/{job_id}/events")  # type: ignore
+async def stream_job_events(
+    job_id: str, api_key: str = Depends(get_api_key)
+) -> StreamingResponse:
+    """Stream a job's status and progress as Server-Sent Events.
+
+    Every change is sent as a ``progress`` event carrying the snapshot
+    (``status``, ``pages_done``, ``pages_total``, ``barcodes``, ...); the
+    stream ends with a ``completed``, ``failed`` or ``cancelled`` event,
+    after which the result can be fetched once from ``GET /v1/jobs/{job_id}``.
+    """
+    settings = get_settings()
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    job = await _owned_job(job_id, api_key)
+    if progress.snapshot(job_id) is None:
+        # Not tracked in memory: finished long ago, run before a restart,
+        # or run by another process of a shared queue
+        if settings.job_queue == "shared" and job["status"] not in TERMINAL_STATUSES:
+            return StreamingResponse(
+                _sse_poll(job_id, settings.job_poll_sec),
+                media_type="text/event-stream",
+                headers=headers,
+            )
+        event = _sse_event(job["status"], {"status": job["status"]})
+        return StreamingResponse(
+            iter([event]), media_type="text/event-stream", headers=headers
+        )
+
+    return StreamingResponse(
+        _sse_stream(job_id), media_type="text/event-stream", headers=headers
+    )
+
+
+@router.get("/jobs/{job_id}/artifacts/{name}")  # type: ignore
+async def get_job_artifact(
+    job_id: str,
+    name: str,
+    range: Optional[str] = Header(None),
+    api_key: str = Depends(get_api_key),
+) -> StreamingResponse:
+    """Stream a job artifact such as a page image, honoring ``Range`` requests."""
+    job = await _store().get(job_id)
+    if job and job["owner"] != _job_owner(api_key):
+        job = None
+    path = find_artifact(job.get("artifact_paths") if job else None, name)
+    if path is None or not os.path.isfile(path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Artifact not found"
+        )
+
+    size = os.path.getsize(path)
+    try:
+        byte_range = parse_byte_range(range, size)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+
+    headers = {"Accept-Ranges": "bytes"}
+    if byte_range is None:
+        start, end = 0, size - 1
+        status_code = status.HTTP_200_OK
+    else:
+        start, end = byte_range
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    return StreamingResponse(
+        iter_file(path, start, end),
+        status_code=status_code,
+        media_type=media_type_for(path),
+        headers=headers,
+    )
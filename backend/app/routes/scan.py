@@ -1,99 +1,282 @@
 """Scan routes for the ZebraFetch API."""
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, status
-from fastapi.responses import JSONResponse
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+from typing import Optional, Iterator, Dict, Any
 import asyncio
-import tempfile
-import os
+import json
+import time
 
 from app.config import get_settings
-from app.services.scanner import Scanner
+from app.metrics import SCANS_CANCELLED
+from app.services.batch import batch_response, scan_batch
+from app.services.cancel import CancelToken, ScanBudgetExceeded
+from app.services.cache import (
+    PageRecords,
+    ResultCache,
+    get_cached_result,
+    get_result_cache,
+    make_cache_key,
+    scan_response,
+    store_result,
+)
 from app.dependencies.auth import get_api_key
+from app.dependencies.scan import (
+    build_scanner,
+    parse_limits,
+    parse_page_range,
+    parse_symbologies,
+    resolve_regions,
+)
+from app.dependencies.upload import (
+    BATCH_UPLOAD_BODY,
+    PDF_UPLOAD_BODY,
+    spool_batch,
+    spool_upload,
+)
 
 router = APIRouter(prefix="/v1")
 
 
-@router.post("/scan")  # type: ignore
+@router.post("/scan", openapi_extra=PDF_UPLOAD_BODY)  # type: ignore
 async def scan_pdf(
-    file: UploadFile = File(...),
+    request: Request,
     pages: Optional[str] = None,
     types: Optional[str] = None,
     embed_page: bool = False,
     embed_snippet: bool = False,
+    stream: bool = False,
+    regions: Optional[str] = None,
+    template: Optional[str] = None,
+    stop_after: int = Query(0, ge=0),
+    first_match_per_page: bool = False,
+    match: Optional[str] = None,
     api_key: str = Depends(get_api_key),
-) -> JSONResponse:
-    """Scan PDF for barcodes synchronously."""
-    settings = get_settings()
+) -> Response:
+    """Scan PDF for barcodes synchronously.
 
-    # Validate file type
-    if not file.content_type == "application/pdf":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="File must be a PDF"
-        )
+    With ``stream=true`` the response is NDJSON with one
+    ``{"page": ..., "results": [...]}`` line per scanned page, sent as soon as
+    the page is decoded.
 
-    # Read file content
-    content = await file.read()
+    With ``embed_page=true`` each page image is encoded once: the JSON
+    response lists them under ``page_images`` (per-page lines carry their own
+    ``page_image``) and results refer to them by ``id``.
 
-    # Check file size
-    if len(content) > settings.max_pdf_bytes:
-        raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"PDF must be smaller than {settings.max_pdf_mb}MB",
-        )
+    ``regions`` lists crop boxes in PDF points from the lower-left page
+    corner, as ``[pages:]x0,y0,x1,y1`` entries separated by ``;``; pages
+    with a box only have their boxes rendered and decoded. ``template``
+    uses the regions saved under that name instead.
+
+    Scans stop within a page once ``sync_timeout_sec`` passes or the client
+    goes away, so a timed-out request does not keep a worker busy.
+
+    ``match`` keeps only results whose value contains a match of that
+    regular expression, ``first_match_per_page`` only the first result of
+    each page, and ``stop_after`` ends the scan once that many results were
+    found: later pages are not scanned and are missing from the response.
+    """
+    settings = get_settings()
 
     # Parse page range
-    page_range = None
-    if pages:
-        try:
-            if "-" in pages:
-                start, end = map(int, pages.split("-"))
-                page_range = list(range(start - 1, end))  # Convert to 0-based
-            else:
-                page_range = [int(p) - 1 for p in pages.split(",")]
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid page range format",
-            )
+    page_range = parse_page_range(pages)
 
     # Parse barcode types
-    symbologies = types.split(",") if types else None
+    symbologies = parse_symbologies(types)
+
+    # Parse crop boxes or look up the named template
+    scan_regions = await resolve_regions(regions, template)
+
+    # Parse result predicates and the early-exit limit
+    limits = parse_limits(stop_after, first_match_per_page, match)
+
+    # Spool the upload to disk, enforcing the size limit and hashing it
+    upload = await spool_upload(request, settings)
+    doc_hash = upload.sha256
+
+    # Stops the scan once the client will no longer wait for it
+    cancel = CancelToken(timeout=settings.sync_timeout_sec)
+    scanner = build_scanner(settings, scan_regions, limits, cancel)
+
+    # Serve resubmitted documents from the result cache
+    cache = get_result_cache(settings)
+    cache_key = None
+    if cache is not None:
+        cache_key = make_cache_key(
+            doc_hash,
+            page_range,
+            symbologies,
+            embed_page,
+            embed_snippet,
+            scanner.options(),
+        )
+        records = await get_cached_result(cache, cache_key)
+        if records is not None:
+            upload.remove()
+            if stream:
+                return StreamingResponse(
+                    iter([json.dumps(record).encode() + b"\n" for record in records]),
+                    media_type="application/x-ndjson",
+                )
+            return JSONResponse(content=scan_response(records))
 
-    # Create temporary file
-    with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-        temp_file.write(content)
-        temp_path = temp_file.name
+    if stream:
+        return StreamingResponse(
+            _stream_ndjson(
+                scanner.iter_records(
+                    upload.path,
+                    page_range=page_range,
+                    symbologies=symbologies,
+                    embed_page=embed_page,
+                    embed_snippet=embed_snippet,
+                    doc_hash=doc_hash,
+                ),
+                deadline=time.monotonic() + settings.sync_timeout_sec,
+                cache=cache,
+                cache_key=cache_key,
+            ),
+            media_type="application/x-ndjson",
+            background=BackgroundTask(upload.remove),
+        )
 
     try:
         # Process PDF with timeout
-        scanner = Scanner()
         loop = asyncio.get_event_loop()
-        results = await asyncio.wait_for(
+        records = await asyncio.wait_for(
             loop.run_in_executor(
                 None,
-                lambda: scanner.scan_pdf(
-                    content,
-                    page_range=page_range,
-                    symbologies=symbologies,
-                    embed_page=embed_page,
-                    embed_snippet=embed_snippet,
+                lambda: list(
+                    scanner.iter_records(
+                        upload.path,
+                        page_range=page_range,
+                        symbologies=symbologies,
+                        embed_page=embed_page,
+                        embed_snippet=embed_snippet,
+                        doc_hash=doc_hash,
+                    )
                 ),
             ),
             timeout=settings.sync_timeout_sec,
         )
 
-        return JSONResponse(content={"results": results})
+        if cache is not None and cache_key is not None:
+            await store_result(cache, cache_key, records)
+
+        return JSONResponse(content=scan_response(records))
 
-    except asyncio.TimeoutError:
+    except (asyncio.TimeoutError, ScanBudgetExceeded):
+        SCANS_CANCELLED.labels(reason="budget").inc()
         raise HTTPException(
             status_code=status.HTTP_504_GATEWAY_TIMEOUT,
             detail="PDF processing timed out",
         )
 
     finally:
-        # Clean up temporary file
-        try:
-            os.unlink(temp_path)
-        except OSError:
-            pass
+        # Stop the scan if the request ended first, and clean up the spool
+        cancel.cancel()
+        upload.remove()
+
+
+@router.post("/scan/batch", openapi_extra=BATCH_UPLOAD_BODY)  # type: ignore
+async def scan_pdf_batch(
+    request: Request,
+    pages: Optional[str] = None,
+    types: Optional[str] = None,
+    embed_page: bool = False,
+    embed_snippet: bool = False,
+    stop_after: int = Query(0, ge=0),
+    first_match_per_page: bool = False,
+    match: Optional[str] = None,
+    api_key: str = Depends(get_api_key),
+) -> JSONResponse:
+    """Scan many PDFs in one request.
+
+    ``files`` may repeat and each part is a PDF or a zip/tar archive of PDFs.
+    The response maps every file name (archive members by their path in the
+    archive) to its own ``{"results": [...]}``, or to an ``error`` if that
+    file could not be scanned. Options apply to every file; ``stop_after``
+    counts the results of each file separately.
+    """
+    settings = get_settings()
+    limits = parse_limits(stop_after, first_match_per_page, match)
+    cancel = CancelToken(timeout=settings.sync_timeout_sec)
+
+    params = {
+        "pages": parse_page_range(pages),
+        "types": parse_symbologies(types),
+        "embed_page": embed_page,
+        "embed_snippet": embed_snippet,
+    }
+
+    batch = await spool_batch(request, settings)
+    try:
+        outcomes = await asyncio.wait_for(
+            scan_batch(
+                build_scanner(settings, limits=limits, cancel=cancel),
+                get_result_cache(settings),
+                [
+                    (name, upload.path, upload.sha256)
+                    for name, upload in batch.files.items()
+                ],
+                params,
+            ),
+            timeout=settings.sync_timeout_sec,
+        )
+        return JSONResponse(content=batch_response(outcomes))
+
+    except (asyncio.TimeoutError, ScanBudgetExceeded):
+        SCANS_CANCELLED.labels(reason="budget").inc()
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Batch processing timed out",
+        )
+
+    finally:
+        cancel.cancel()
+        batch.remove()
+
+
+def _stream_ndjson(
+    pages: Iterator[Dict[str, Any]],
+    deadline: float,
+    cache: Optional[ResultCache] = None,
+    cache_key: Optional[str] = None,
+) -> Iterator[bytes]:
+    """Serialize per-page scan results as NDJSON lines.
+
+    Errors and timeouts after the first line cannot change the HTTP status, so
+    they are reported as a final ``{"error": ...}`` line instead. Completed
+    scans are stored in ``cache`` unless they outgrow its memory budget, so
+    streaming never holds more than one cache entry's worth of results.
+    """
+    records: Optional[PageRecords] = [] if cache is not None else None
+    collected_bytes = 0
+    try:
+        for record in pages:
+            line = json.dumps(record).encode() + b"\n"
+            yield line
+            if records is not None and cache is not None:
+                collected_bytes += len(line)
+                if collected_bytes > cache.memory.max_bytes:
+                    records = None
+                else:
+                    records.append(record)
+            if time.monotonic() > deadline:
+                yield json.dumps({"error": "PDF processing timed out"}).encode() + b"\n"
+                return
+    except ScanBudgetExceeded:
+        SCANS_CANCELLED.labels(reason="budget").inc()
+        yield json.dumps({"error": "PDF processing timed out"}).encode() + b"\n"
+        return
+    except Exception as e:
+        yield json.dumps({"error": str(e)}).encode() + b"\n"
+        return
+    finally:
+        close = getattr(pages, "close", None)
+        if close is not None:
+            close()
+
+    if records is not None and cache is not None and cache_key is not None:
+        cache.put(cache_key, records)
@@ -0,0 +1,78 @@
+"""Saved scan region templates for the ZebraFetch API."""
+
+import re
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+from app.db import delete_template, get_template, list_templates, save_template
+from app.dependencies.auth import get_api_key
+from app.services.regions import parse_regions
+
+router = APIRouter(prefix="/v1")
+
+# Template names are used as query parameters, so keep them URL-safe
+TEMPLATE_NAME = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+class TemplateBody(BaseModel):
+    """Request body of ``PUT /v1/templates/{name}``."""
+
+    regions: str
+
+
+@router.put("/templates/{name}")  # type: ignore
+async def put_template(
+    name: str, body: TemplateBody, api_key: str = Depends(get_api_key)
+) -> Dict[str, Any]:
+    """Create or replace a named set of crop boxes.
+
+    ``regions`` uses the ``[pages:]x0,y0,x1,y1;...`` syntax of the
+    ``regions`` scan parameter. Scans then refer to it as ``template=name``.
+    """
+    if not TEMPLATE_NAME.match(name):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Template names are 1-64 letters, digits, '.', '_' or '-'",
+        )
+    try:
+        regions = parse_regions(body.regions)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid regions: {e}",
+        )
+    await save_template(name, regions)
+    return {"name": name, "regions": regions}
+
+
+@router.get("/templates")  # type: ignore
+async def get_templates(api_key: str = Depends(get_api_key)) -> JSONResponse:
+    """List the saved templates."""
+    return JSONResponse(content={"templates": await list_templates()})
+
+
+@router.get("/templates/{name}")  # type: ignore
+async def get_template_by_name(
+    name: str, api_key: str = Depends(get_api_key)
+) -> JSONResponse:
+    """Get one saved template."""
+    template = await get_template(name)
+    if template is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Template not found"
+        )
+    return JSONResponse(content=template)
+
+
+@router.delete("/templates/{name}")  # type: ignore
+async def remove_template(name: str, api_key: str = Depends(get_api_key)) -> Response:
+    """Delete a saved template; jobs created with it keep their regions."""
+    if await get_template(name) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Template not found"
+        )
+    await delete_template(name)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
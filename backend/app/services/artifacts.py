@@ -0,0 +1,153 @@
+"""On-disk storage of job artifacts such as embedded page images."""
+
+import base64
+import mimetypes
+import os
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.services.images import IMAGE_FORMATS
+
+# Read size when streaming artifacts to clients
+CHUNK_SIZE = 64 * 1024
+
+_EXTENSIONS = {media_type: ext for ext, (_, media_type) in IMAGE_FORMATS.items()}
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def artifact_url(job_id: str, name: str) -> str:
+    """Return the API path an artifact is served from."""
+    return f"/v1/jobs/{job_id}/artifacts/{name}"
+
+
+class ArtifactStore:
+    """Directory of per-job artifact files under ``root``."""
+
+    def __init__(self, root: str) -> None:
+        """Use ``root`` as the base directory; it is created on first write."""
+        self.root = root
+
+    def job_dir(self, job_id: str) -> str:
+        """Return the directory holding a job's artifacts."""
+        return os.path.join(self.root, job_id)
+
+    def write(self, job_id: str, name: str, data: bytes) -> str:
+        """Write one artifact and return its path."""
+        directory = self.job_dir(job_id)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def externalize(
+        self, job_id: str, records: List[Dict[str, Any]], prefix: str = ""
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """Write the images embedded in per-page records to artifact files.
+
+        Returns copies of the records that only reference the files, and the
+        written paths. Page images keep their metadata but their base64
+        ``data`` is replaced by a ``url``; result snippets are replaced by a
+        ``snippet_url``. The input records, which may be shared with the
+        result cache, are left untouched. File names start with ``prefix``,
+        which keeps the artifacts of different documents in a batch apart.
+        """
+        paths = []
+        externalized = []
+        for record in records:
+            record = dict(record)
+            page_image = record.get("page_image")
+            if page_image is not None and "data" in page_image:
+                page_image = dict(page_image)
+                extension = _EXTENSIONS[page_image["media_type"]]
+                name = f"{prefix}{page_image['id']}.{extension}"
+                data = base64.b64decode(page_image.pop("data"))
+                paths.append(self.write(job_id, name, data))
+                page_image["url"] = artifact_url(job_id, name)
+                record["page_image"] = page_image
+            results = []
+            for index, result in enumerate(record["results"]):
+                if "snippet" in result:
+                    result = dict(result)
+                    name = f"{prefix}page-{record['page']}-snippet-{index + 1}.png"
+                    data = base64.b64decode(result.pop("snippet"))
+                    paths.append(self.write(job_id, name, data))
+                    result["snippet_url"] = artifact_url(job_id, name)
+                results.append(result)
+            record["results"] = results
+            externalized.append(record)
+        return externalized, paths
+
+
+def find_artifact(artifact_paths: Optional[List[str]], name: str) -> Optional[str]:
+    """Return the tracked path whose file name is ``name``, if any.
+
+    Only files recorded for the job are served, so names can never reach
+    outside the artifact store.
+    """
+    for path in artifact_paths or []:
+        if os.path.basename(path) == name:
+            return path
+    return None
+
+
+def media_type_for(path: str) -> str:
+    """Guess an artifact's media type from its file name."""
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def parse_byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single-range ``Range`` header into inclusive ``(start, end)``.
+
+    Returns ``None`` when the whole file should be sent: no header, a unit
+    other than bytes, or several ranges, which servers may ignore. Raises
+    ``ValueError`` when the range cannot be satisfied.
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        raise ValueError("Empty byte range")
+    if not first:
+        # Suffix range: the final ``last`` bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("Empty suffix range")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range starts beyond the end of the file")
+    return start, end
+
+
+def iter_file(path: str, start: int, end: int) -> Iterator[bytes]:
+    """Yield bytes ``start`` to ``end`` inclusive of a file in chunks."""
+    remaining = end - start + 1
+    with open(path, "rb") as f:
+        f.seek(start)
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def remove_artifacts(paths: List[str]) -> None:
+    """Delete artifact files and any job directories left empty."""
+    directories = set()
+    for path in paths:
+        directories.add(os.path.dirname(path))
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # Ignore errors during cleanup
+    for directory in directories:
+        try:
+            os.rmdir(directory)
+        except OSError:
+            pass
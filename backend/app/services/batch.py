@@ -0,0 +1,103 @@
+"""Scanning of multi-document batches with per-document result caching."""
+
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.services.cache import (
+    ResultCache,
+    get_cached_result,
+    make_cache_key,
+    scan_response,
+    store_result,
+)
+from app.services.scanner import Scanner
+
+# (file name, spooled path, document hash) of one PDF in a batch
+BatchDocument = Tuple[str, str, str]
+
+# File name -> {"records": [...]} or {"error": "..."}
+BatchOutcomes = Dict[str, Dict[str, Any]]
+
+# Called with each document's name and outcome as soon as it is known
+OutcomeCallback = Callable[[str, Dict[str, Any]], None]
+
+
+async def scan_batch(
+    scanner: Scanner,
+    cache: Optional[ResultCache],
+    documents: List[BatchDocument],
+    params: Dict[str, Any],
+    on_outcome: Optional[OutcomeCallback] = None,
+) -> BatchOutcomes:
+    """Scan every document of a batch with the same scan options.
+
+    Documents already in the result cache are served from it; the rest are
+    scanned together by ``Scanner.iter_documents`` in one executor call, so
+    the batch pays for a single scanner and pool dispatch. A document that
+    fails is reported with its error and does not fail the batch.
+
+    ``on_outcome`` is called for every document as it finishes, from the
+    executor thread for scanned documents, so it must be thread-safe.
+    """
+    outcomes: BatchOutcomes = {}
+    cache_keys: Dict[str, str] = {}
+    missing: List[Tuple[str, str]] = []
+    for name, path, doc_hash in documents:
+        if cache is not None:
+            cache_key = make_cache_key(
+                doc_hash,
+                params["pages"],
+                params["types"],
+                params["embed_page"],
+                params["embed_snippet"],
+                scanner.options(),
+            )
+            records = await get_cached_result(cache, cache_key)
+            if records is not None:
+                outcomes[name] = {"records": records}
+                if on_outcome is not None:
+                    on_outcome(name, outcomes[name])
+                continue
+            cache_keys[name] = cache_key
+        missing.append((name, path))
+
+    def scan() -> None:
+        scanned = scanner.iter_documents(
+            [path for _, path in missing],
+            page_range=params["pages"],
+            symbologies=params["types"],
+            embed_page=params["embed_page"],
+            embed_snippet=params["embed_snippet"],
+        )
+        for (name, _), (records, error) in zip(missing, scanned):
+            if records is None:
+                outcomes[name] = {"error": error}
+            else:
+                outcomes[name] = {"records": records}
+            if on_outcome is not None:
+                on_outcome(name, outcomes[name])
+
+    loop = asyncio.get_event_loop()
+    await loop.run_in_executor(None, scan)
+    if cache is not None:
+        for name, cache_key in cache_keys.items():
+            if "records" in outcomes[name]:
+                await store_result(cache, cache_key, outcomes[name]["records"])
+
+    # Report files in upload order
+    return {name: outcomes[name] for name, _, _ in documents}
+
+
+def batch_response(outcomes: BatchOutcomes) -> Dict[str, Any]:
+    """Build the batch response body, keyed by file name.
+
+    Each scanned file has the shape of a single-file scan response; files
+    that failed carry an ``error`` instead.
+    """
+    files = {}
+    for name, outcome in outcomes.items():
+        if "records" in outcome:
+            files[name] = scan_response(outcome["records"])
+        else:
+            files[name] = {"error": outcome["error"]}
+    return {"files": files}
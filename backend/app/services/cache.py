@@ -0,0 +1,373 @@
+"""Content-addressed cache of scan results."""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Dict, Generic, List, Optional, Tuple, TypeVar, Union
+
+from app.config import Settings, get_settings
+from app.db import get_db_connection
+from app.services.images import collect_page_images
+from app.metrics import (
+    PAGE_CACHE_HITS,
+    PAGE_CACHE_MISSES,
+    SCAN_CACHE_HITS,
+    SCAN_CACHE_MISSES,
+)
+
+V = TypeVar("V")
+
+# Per-page scan output as stored in the cache: {"page": n, "results": [...]}
+PageRecords = List[Dict[str, Any]]
+
+
+def flatten_records(records: PageRecords) -> List[Dict[str, Any]]:
+    """Concatenate per-page records into the flat result list."""
+    return [result for record in records for result in record["results"]]
+
+
+def scan_response(records: PageRecords) -> Dict[str, Any]:
+    """Build the JSON scan result from per-page records.
+
+    Embedded page images are listed once under ``page_images``, and results
+    refer to them by ``id`` instead of repeating the image.
+    """
+    response: Dict[str, Any] = {"results": flatten_records(records)}
+    page_images = collect_page_images(records)
+    if page_images is not None:
+        response["page_images"] = page_images
+    return response
+
+
+class LRUCache(Generic[V]):
+    """Thread-safe LRU cache bounded by entry count, total size and age."""
+
+    def __init__(
+        self, max_entries: int, max_bytes: int, ttl_sec: Optional[float] = None
+    ) -> None:
+        """Initialize an empty cache with the given bounds."""
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_sec = ttl_sec
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[float, int, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Return the number of cached entries."""
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[V]:
+        """Return the cached value for ``key`` and mark it recently used."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, size, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.total_bytes -= size
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: V, size: int) -> None:
+        """Store ``value``, evicting least recently used entries as needed.
+
+        Values larger than ``max_bytes`` are not cached at all.
+        """
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        expires_at = time.monotonic() + (
+            self.ttl_sec if self.ttl_sec is not None else float("inf")
+        )
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            self._entries[key] = (expires_at, size, value)
+            self.total_bytes += size
+            while (
+                len(self._entries) > self.max_entries
+                or self.total_bytes > self.max_bytes
+            ):
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+
+# Read size when hashing documents on disk
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_document(pdf: Union[bytes, str, "os.PathLike[str]"]) -> str:
+    """Return the content hash that identifies a PDF in both caches.
+
+    ``pdf`` is the document's bytes or a path to it; files are hashed in
+    chunks.
+    """
+    if isinstance(pdf, bytes):
+        return hashlib.sha256(pdf).hexdigest()
+    digest = hashlib.sha256()
+    with open(pdf, "rb") as f:
+        for chunk in iter(partial(f.read, HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_cache_key(
+    doc_hash: str,
+    page_range: Optional[List[int]],
+    symbologies: Optional[List[str]],
+    embed_page: bool,
+    embed_snippet: bool,
+    scanner_options: Dict[str, Any],
+) -> str:
+    """Build a cache key from the document hash and normalized options.
+
+    Page order is kept because results are returned in the requested order;
+    symbologies are deduplicated and sorted since their order is irrelevant.
+    """
+    options = {
+        "pages": page_range,
+        "types": sorted(set(symbologies)) if symbologies else None,
+        "embed_page": embed_page,
+        "embed_snippet": embed_snippet,
+        "scanner": scanner_options,
+    }
+    digest = hashlib.sha256(doc_hash.encode())
+    digest.update(json.dumps(options, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Two-tier scan result cache: in-memory LRU plus optional SQLite table."""
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        ttl_sec: int,
+        disk_enabled: bool = False,
+        disk_max_bytes: int = 0,
+    ) -> None:
+        """Initialize the cache tiers."""
+        self.memory: LRUCache[PageRecords] = LRUCache(max_entries, max_bytes, ttl_sec)
+        self.ttl_sec = ttl_sec
+        self.disk_enabled = disk_enabled
+        self.disk_max_bytes = disk_max_bytes
+
+    def get(self, key: str) -> Optional[PageRecords]:
+        """Look up ``key`` in memory, then on disk, recording hit metrics."""
+        records = self.memory.get(key)
+        if records is not None:
+            SCAN_CACHE_HITS.labels(tier="memory").inc()
+            return records
+
+        if self.disk_enabled:
+            payload = self._disk_get(key)
+            if payload is not None:
+                SCAN_CACHE_HITS.labels(tier="disk").inc()
+                records = json.loads(payload)
+                self.memory.put(key, records, len(payload))
+                return records
+
+        SCAN_CACHE_MISSES.inc()
+        return None
+
+    def put(self, key: str, records: PageRecords) -> None:
+        """Store scan output in every enabled tier."""
+        payload = json.dumps(records)
+        self.memory.put(key, records, len(payload))
+        if self.disk_enabled:
+            self._disk_put(key, payload)
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        """Read an unexpired entry from the SQLite tier."""
+        with get_db_connection() as conn:
+            row = conn.execute(
+                """
+                SELECT result_json FROM scan_cache
+                WHERE key = ? AND expires_at > ?
+                """,
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE scan_cache SET last_access = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            conn.commit()
+            return str(row["result_json"])
+
+    def _disk_put(self, key: str, payload: str) -> None:
+        """Write an entry to the SQLite tier and enforce TTL and size limits."""
+        if len(payload) > self.disk_max_bytes:
+            return
+        now = time.time()
+        with get_db_connection() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO scan_cache
+                    (key, result_json, size, expires_at, last_access)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (key, payload, len(payload), now + self.ttl_sec, now),
+            )
+            conn.execute("DELETE FROM scan_cache WHERE expires_at <= ?", (now,))
+            # Drop least recently used rows until the tier fits its budget
+            conn.execute(
+                """
+                DELETE FROM scan_cache WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(size) OVER (
+                            ORDER BY last_access DESC, key
+                        ) AS running_size
+                        FROM scan_cache
+                    ) WHERE running_size > ?
+                )
+                """,
+                (self.disk_max_bytes,),
+            )
+            conn.commit()
+
+
+class PageCache:
+    """Memory-bounded LRU cache of raw per-page decodes.
+
+    Entries hold every barcode found on a page for the formats that were
+    searched, keyed by document hash, page index and the scanner options (DPI
+    and rendering mode). Overlapping page ranges and narrower ``types``
+    filters on the same document then only decode pages not seen before.
+    """
+
+    # Rough per-entry bookkeeping overhead on top of the serialized results
+    ENTRY_OVERHEAD = 256
+
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        """Initialize an empty page cache."""
+        self.entries: LRUCache[Tuple[Optional[List[str]], List[Dict[str, Any]]]] = (
+            LRUCache(max_entries, max_bytes)
+        )
+
+    @staticmethod
+    def _key(doc_hash: str, page_idx: int, options: Dict[str, Any]) -> str:
+        """Build the entry key for one page."""
+        return f"{doc_hash}:{page_idx}:{json.dumps(options, sort_keys=True)}"
+
+    def get(
+        self,
+        doc_hash: str,
+        page_idx: int,
+        options: Dict[str, Any],
+        symbologies: Optional[List[str]] = None,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Return raw page decodes covering ``symbologies``, if cached.
+
+        An entry decoded for every format covers any request; one decoded for
+        a subset of formats only covers requests within that subset. Callers
+        filter the returned decodes down to what they asked for.
+        """
+        entry = self.entries.get(self._key(doc_hash, page_idx, options))
+        if entry is not None:
+            searched, raw = entry
+            if searched is None or (
+                symbologies is not None and set(symbologies) <= set(searched)
+            ):
+                PAGE_CACHE_HITS.inc()
+                return raw
+        PAGE_CACHE_MISSES.inc()
+        return None
+
+    def put(
+        self,
+        doc_hash: str,
+        page_idx: int,
+        options: Dict[str, Any],
+        symbologies: Optional[List[str]],
+        raw: List[Dict[str, Any]],
+    ) -> None:
+        """Store the raw decodes of a page searched for ``symbologies``."""
+        size = self.ENTRY_OVERHEAD + len(json.dumps(raw))
+        self.entries.put(
+            self._key(doc_hash, page_idx, options), (symbologies, raw), size
+        )
+
+
+_cache: Optional[ResultCache] = None
+_page_cache: Optional[PageCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache(settings: Optional[Settings] = None) -> Optional[ResultCache]:
+    """Get the process-wide result cache, or ``None`` if caching is disabled."""
+    global _cache
+    settings = settings or get_settings()
+    if not settings.result_cache_enabled:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache(
+                max_entries=settings.result_cache_max_entries,
+                max_bytes=settings.result_cache_max_mb * 1024 * 1024,
+                ttl_sec=settings.result_cache_ttl_sec,
+                disk_enabled=settings.result_cache_disk,
+                disk_max_bytes=settings.result_cache_disk_max_mb * 1024 * 1024,
+            )
+        return _cache
+
+
+def get_page_cache(settings: Optional[Settings] = None) -> Optional[PageCache]:
+    """Get the process-wide page cache, or ``None`` if it is disabled."""
+    global _page_cache
+    settings = settings or get_settings()
+    if not settings.page_cache_enabled:
+        return None
+    with _cache_lock:
+        if _page_cache is None:
+            _page_cache = PageCache(
+                max_entries=settings.page_cache_max_entries,
+                max_bytes=settings.page_cache_max_mb * 1024 * 1024,
+            )
+        return _page_cache
+
+
+def reset_result_cache() -> None:
+    """Drop the process-wide caches so they are rebuilt from settings."""
+    global _cache, _page_cache
+    with _cache_lock:
+        _cache = None
+        _page_cache = None
+
+
+async def get_cached_result(cache: ResultCache, key: str) -> Optional[PageRecords]:
+    """Look up a cache entry without blocking the event loop on disk reads."""
+    records = cache.memory.get(key)
+    if records is not None:
+        SCAN_CACHE_HITS.labels(tier="memory").inc()
+        return records
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, partial(cache.get, key))
+
+
+async def store_result(cache: ResultCache, key: str, records: PageRecords) -> None:
+    """Store a cache entry without blocking the event loop on disk writes."""
+    loop = asyncio.get_event_loop()
+    await loop.run_in_executor(None, partial(cache.put, key, records))
+
+
+async def compute_document_hash(pdf: Union[bytes, str]) -> str:
+    """Hash the PDF off the event loop; large uploads take a while to digest."""
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, partial(hash_document, pdf))
@@ -0,0 +1,69 @@
+"""Cooperative cancellation and time and page budgets for running scans."""
+
+import time
+from typing import Optional
+
+from app.services.parallel import is_stopped
+
+# Seconds between checks of the token while waiting for pool workers
+CANCEL_POLL_SEC = 0.1
+
+
+class ScanCancelled(Exception):
+    """Raised inside a scan whose token was cancelled."""
+
+
+class ScanBudgetExceeded(ScanCancelled):
+    """Raised inside a scan that ran out of time or pages."""
+
+
+class CancelToken:
+    """Tells a running scan to stop; the scanner checks it between pages.
+
+    A token is cancelled explicitly with ``cancel``, once ``timeout``
+    seconds have passed since it was created, once more than ``max_pages``
+    pages were charged to it, or, in pool workers, once the ``StopFlag`` at
+    ``stop_path`` is stopped. ``check`` then raises the reason, and keeps
+    raising it, so every layer of the scan unwinds.
+    """
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        max_pages: int = 0,
+        stop_path: Optional[str] = None,
+    ) -> None:
+        """Start the time budget, if any, from now."""
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self.stop_path = stop_path
+        self.pages = 0
+        self.error: Optional[ScanCancelled] = None
+
+    def cancel(self, reason: str = "Scan cancelled") -> None:
+        """Cancel the scan unless it already stopped for another reason."""
+        if self.error is None:
+            self.error = ScanCancelled(reason)
+
+    def check(self) -> None:
+        """Raise ``ScanCancelled`` if the scan should stop."""
+        if self.error is None:
+            if self.deadline is not None and time.monotonic() > self.deadline:
+                self.error = ScanBudgetExceeded(
+                    f"Time budget of {self.timeout:g} s exceeded"
+                )
+            elif is_stopped(self.stop_path):
+                self.error = ScanCancelled("Scan cancelled")
+        if self.error is not None:
+            raise self.error
+
+    def charge(self, pages: int = 1) -> None:
+        """Count pages about to be scanned, raising if over the page budget."""
+        self.check()
+        if self.max_pages and self.pages + pages > self.max_pages:
+            self.error = ScanBudgetExceeded(
+                f"Page budget of {self.max_pages} pages exceeded"
+            )
+            raise self.error
+        self.pages += pages
@@ -0,0 +1,146 @@
+"""Cheap barcode region detection on low-resolution page previews."""
+
+import math
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# (left, top, right, bottom) in preview pixels
+Box = Tuple[int, int, int, int]
+
+
+def find_barcode_regions(
+    gray: np.ndarray,
+    block: int = 8,
+    min_gradient: float = 20.0,
+    max_cross_ratio: float = 0.25,
+    min_blocks: int = 6,
+) -> List[Box]:
+    """Find areas of a grayscale preview that look like 1D barcode bars.
+
+    Bars produce strong intensity gradients across the bars and almost none
+    along them, while text strokes produce both. Each ``block`` x ``block``
+    cell is marked when its mean gradient in one direction is above
+    ``min_gradient`` and the other direction stays below ``max_cross_ratio``
+    of it. Connected groups of at least ``min_blocks`` cells are returned as
+    bounding boxes, which filters out the isolated cells that text produces.
+    """
+    if gray.shape[0] < block + 1 or gray.shape[1] < block + 1:
+        return []
+
+    pixels: np.ndarray = gray.astype(np.int16)
+    gx = np.abs(np.diff(pixels, axis=1))[:-1, :].astype(np.float32)
+    gy = np.abs(np.diff(pixels, axis=0))[:, :-1].astype(np.float32)
+    rows, cols = gx.shape[0] // block, gx.shape[1] // block
+
+    def block_means(grad: np.ndarray) -> np.ndarray:
+        cells = grad[: rows * block, : cols * block]
+        means: np.ndarray = cells.reshape(rows, block, cols, block).mean(axis=(1, 3))
+        return means
+
+    mx, my = block_means(gx), block_means(gy)
+    mask = ((mx > min_gradient) & (my < max_cross_ratio * mx)) | (
+        (my > min_gradient) & (mx < max_cross_ratio * my)
+    )
+
+    boxes = []
+    seen = np.zeros_like(mask)
+    for row, col in zip(*np.nonzero(mask)):
+        if seen[row, col]:
+            continue
+        # Flood fill the 4-connected component starting at this cell
+        stack = [(row, col)]
+        seen[row, col] = True
+        cells = []
+        while stack:
+            r, c = stack.pop()
+            cells.append((r, c))
+            for nr, nc in ((r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)):
+                if 0 <= nr < rows and 0 <= nc < cols:
+                    if mask[nr, nc] and not seen[nr, nc]:
+                        seen[nr, nc] = True
+                        stack.append((nr, nc))
+        if len(cells) < min_blocks:
+            continue
+        rs = [r for r, _ in cells]
+        cs = [c for _, c in cells]
+        boxes.append(
+            (
+                min(cs) * block,
+                min(rs) * block,
+                (max(cs) + 1) * block,
+                (max(rs) + 1) * block,
+            )
+        )
+    return boxes
+
+
+def merge_boxes(
+    boxes: List[Tuple[float, float, float, float]]
+) -> List[Tuple[float, float, float, float]]:
+    """Merge overlapping ``(left, top, right, bottom)`` boxes until disjoint."""
+    merged = list(boxes)
+    changed = True
+    while changed:
+        changed = False
+        result: List[Tuple[float, float, float, float]] = []
+        for box in merged:
+            for i, other in enumerate(result):
+                if boxes_overlap(box, other):
+                    result[i] = (
+                        min(box[0], other[0]),
+                        min(box[1], other[1]),
+                        max(box[2], other[2]),
+                        max(box[3], other[3]),
+                    )
+                    changed = True
+                    break
+            else:
+                result.append(box)
+        merged = result
+    return merged
+
+
+def boxes_overlap(
+    box: Tuple[float, float, float, float], other: Tuple[float, float, float, float]
+) -> bool:
+    """Tell whether two ``(left, top, right, bottom)`` boxes touch or overlap."""
+    return (
+        box[0] <= other[2]
+        and other[0] <= box[2]
+        and box[1] <= other[3]
+        and other[1] <= box[3]
+    )
+
+
+def split_box(
+    box: Tuple[float, float, float, float],
+    side: float,
+    overlap: float,
+    height: Optional[float] = None,
+) -> List[Tuple[float, float, float, float]]:
+    """Cover a box with tiles of at most ``side`` that overlap by ``overlap``.
+
+    Each axis gets as few tiles as possible, all the same size and spread
+    evenly, so neighbours overlap by exactly ``overlap`` and no pixels are
+    rendered more often than needed. Tiles are square unless a different
+    ``height`` is given. The overlap is capped at half the tile size so tiles
+    always advance.
+    """
+    left, top, right, bottom = box
+
+    def spans(low: float, high: float, side: float) -> List[Tuple[float, float]]:
+        length = high - low
+        if length <= side:
+            return [(low, high)]
+        step = min(overlap, side / 2)
+        count = math.ceil((length - step) / (side - step))
+        size = (length + (count - 1) * step) / count
+        starts = [low + i * (size - step) for i in range(count)]
+        return [(start, min(start + size, high)) for start in starts]
+
+    return [
+        (x0, y0, x1, y1)
+        for y0, y1 in spans(top, bottom, side if height is None else height)
+        for x0, x1 in spans(left, right, side)
+    ]
@@ -0,0 +1,88 @@
+"""Encoding of rendered page images embedded in scan output."""
+
+import base64
+import io
+from typing import Any, Dict, List, Optional
+
+from PIL import Image
+
+# Pillow format names and media types of the supported page image encodings
+IMAGE_FORMATS = {
+    "png": ("PNG", "image/png"),
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+}
+
+
+class ImageEncoding:
+    """How embedded page images are encoded.
+
+    ``quality`` applies to JPEG and WebP. With ``max_px`` set, images are
+    downscaled so their longer side is at most that many pixels; barcode
+    positions stay in full-resolution pixels, and each encoded page image
+    records the ``scale`` needed to map them onto it.
+    """
+
+    def __init__(self, format: str = "png", quality: int = 80, max_px: int = 0):
+        """Validate and store the encoding parameters."""
+        format = format.lower()
+        if format == "jpg":
+            format = "jpeg"
+        if format not in IMAGE_FORMATS:
+            raise ValueError(
+                f"Unsupported page image format {format!r}; "
+                f"expected one of {', '.join(IMAGE_FORMATS)}"
+            )
+        if not 1 <= quality <= 100:
+            raise ValueError("Page image quality must be between 1 and 100")
+        self.format = format
+        self.quality = quality
+        self.max_px = max(0, max_px)
+
+    @property
+    def media_type(self) -> str:
+        """Return the media type of encoded images."""
+        return IMAGE_FORMATS[self.format][1]
+
+    def options(self) -> Dict[str, Any]:
+        """Return the parameters that affect encoded output."""
+        return {"format": self.format, "quality": self.quality, "max_px": self.max_px}
+
+    def encode(self, image: Image.Image) -> Dict[str, Any]:
+        """Downscale and encode ``image``, returning its page image entry."""
+        width, height = image.size
+        scale = 1.0
+        if self.max_px and max(width, height) > self.max_px:
+            scale = self.max_px / max(width, height)
+            image = image.resize(
+                (max(1, round(width * scale)), max(1, round(height * scale))),
+                Image.Resampling.BILINEAR,
+                reducing_gap=2.0,
+            )
+        buffer = io.BytesIO()
+        pil_format = IMAGE_FORMATS[self.format][0]
+        if self.format == "png":
+            image.save(buffer, format=pil_format)
+        else:
+            image.save(buffer, format=pil_format, quality=self.quality)
+        return {
+            "media_type": self.media_type,
+            "width": image.width,
+            "height": image.height,
+            "scale": scale,
+            "data": base64.b64encode(buffer.getvalue()).decode(),
+        }
+
+
+def page_image_id(page_no: int) -> str:
+    """Return the identifier results use to refer to a 1-based page's image."""
+    return f"page-{page_no}"
+
+
+def collect_page_images(records: List[Dict[str, Any]]) -> Optional[List[Any]]:
+    """Gather the page images of per-page records, or ``None`` if there are none.
+
+    Each page image appears once, however many results on the page point to it.
+    """
+    images = [record["page_image"] for record in records if "page_image" in record]
+    return images or None
@@ -0,0 +1,238 @@
+"""Pluggable queue and result store of asynchronous jobs."""
+
+import asyncio
+import logging
+import os
+import socket
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Type
+
+from app import db
+from app.config import Settings
+from app.services.cancel import CancelToken
+
+logger = logging.getLogger(__name__)
+
+
+class JobBackend(ABC):
+    """Queue and result store shared by every process that runs jobs.
+
+    Jobs are created ``pending``. A worker ``claim``s one, which makes it
+    ``running`` under a lease the worker renews with ``heartbeat``; once a
+    lease runs out, because its worker died, the job can be claimed again.
+    Claims must be atomic across all processes using the backend, so API
+    replicas and standalone workers can share one queue.
+    """
+
+    @abstractmethod
+    async def create(
+        self,
+        job_id: str,
+        input_path: str,
+        params: Dict[str, Any],
+        priority: int = 0,
+        owner: str = "",
+    ) -> None:
+        """Store a new pending job."""
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job's record, or ``None`` if there is no such job."""
+
+    @abstractmethod
+    async def set_status(
+        self,
+        job_id: str,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        artifact_paths: Optional[List[str]] = None,
+        callback_url: Optional[str] = None,
+        worker: Optional[str] = None,
+    ) -> bool:
+        """Store a job's status and result, queueing its webhook if any.
+
+        With ``worker``, nothing is stored unless that worker still holds
+        the job's lease, so a worker that lost it cannot overwrite the
+        result of the one that reclaimed the job. Returns whether the
+        status was stored.
+        """
+
+    @abstractmethod
+    async def unfinished(self) -> List[Dict[str, Any]]:
+        """List jobs left ``pending`` or ``running``, oldest first."""
+
+    @abstractmethod
+    async def depth(self) -> int:
+        """Count the jobs waiting for a worker."""
+
+    @abstractmethod
+    async def claim(
+        self, job_id: Optional[str], worker: str, lease_sec: float
+    ) -> Optional[Dict[str, Any]]:
+        """Claim ``job_id``, or the next queued job, for ``worker``.
+
+        Returns the job's ``id``, ``input_path``, ``params_json``,
+        ``priority``, ``owner`` and ``attempts`` (claims so far, this one
+        included), or ``None`` if it is not free.
+        """
+
+    @abstractmethod
+    async def heartbeat(
+        self,
+        job_id: str,
+        worker: str,
+        lease_sec: float,
+        progress: Optional[Dict[str, Any]] = None,
+    ) -> Optional[bool]:
+        """Renew a lease; return whether cancellation was requested.
+
+        Returns ``None`` if ``worker`` lost the lease to another worker.
+        """
+
+    @abstractmethod
+    async def release(self, job_id: str, worker: str) -> None:
+        """Hand a job ``worker`` is running back to the queue."""
+
+    @abstractmethod
+    async def request_cancel(self, job_id: str) -> None:
+        """Ask whichever worker runs a job to cancel it."""
+
+
+class SQLiteJobBackend(JobBackend):
+    """Job backend on the SQLite job store of ``app.db``; the default.
+
+    Processes on one machine share the queue through the database file,
+    which makes it the local stand-in for a networked backend as well.
+    """
+
+    async def create(
+        self,
+        job_id: str,
+        input_path: str,
+        params: Dict[str, Any],
+        priority: int = 0,
+        owner: str = "",
+    ) -> None:
+        """Store a new pending job."""
+        await db.create_job(job_id, input_path, params, priority, owner)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job's record, or ``None`` if there is no such job."""
+        return await db.get_job(job_id)
+
+    async def set_status(
+        self,
+        job_id: str,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        artifact_paths: Optional[List[str]] = None,
+        callback_url: Optional[str] = None,
+        worker: Optional[str] = None,
+    ) -> bool:
+        """Store a job's status and result, queueing its webhook if any."""
+        return await db.update_job_status(
+            job_id,
+            status,
+            result,
+            artifact_paths,
+            callback_url=callback_url,
+            worker=worker,
+        )
+
+    async def unfinished(self) -> List[Dict[str, Any]]:
+        """List jobs left ``pending`` or ``running``, oldest first."""
+        return await db.get_unfinished_jobs()
+
+    async def depth(self) -> int:
+        """Count the jobs waiting for a worker."""
+        return await db.count_queued_jobs()
+
+    async def claim(
+        self, job_id: Optional[str], worker: str, lease_sec: float
+    ) -> Optional[Dict[str, Any]]:
+        """Claim ``job_id``, or the next queued job, for ``worker``."""
+        return await db.claim_job(job_id, worker, lease_sec)
+
+    async def heartbeat(
+        self,
+        job_id: str,
+        worker: str,
+        lease_sec: float,
+        progress: Optional[Dict[str, Any]] = None,
+    ) -> Optional[bool]:
+        """Renew a lease; return whether cancellation was requested."""
+        return await db.renew_job_lease(job_id, worker, lease_sec, progress)
+
+    async def release(self, job_id: str, worker: str) -> None:
+        """Hand a job ``worker`` is running back to the queue."""
+        await db.release_job(job_id, worker)
+
+    async def request_cancel(self, job_id: str) -> None:
+        """Ask whichever worker runs a job to cancel it."""
+        await db.request_job_cancel(job_id)
+
+
+# Job backends by their ``job_backend`` setting
+JOB_BACKENDS: Dict[str, Type[JobBackend]] = {"sqlite": SQLiteJobBackend}
+
+
+def get_job_backend(settings: Settings) -> JobBackend:
+    """Return the job backend named by the settings."""
+    try:
+        return JOB_BACKENDS[settings.job_backend]()
+    except KeyError:
+        raise ValueError(f"Unknown job backend: {settings.job_backend}") from None
+
+
+# Identifies this process in job leases
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}"
+
+
+class JobLease:
+    """Keep a claimed job's lease alive while it runs.
+
+    Every ``heartbeat_sec`` the lease is renewed together with the job's
+    latest progress, so other processes can report it. A cancellation
+    requested through the backend cancels ``cancel``; so does losing the
+    lease, after which ``lost`` is set and the job belongs to another
+    worker.
+    """
+
+    def __init__(
+        self,
+        backend: JobBackend,
+        job_id: str,
+        settings: Settings,
+        cancel: CancelToken,
+        progress: Callable[[], Optional[Dict[str, Any]]],
+    ) -> None:
+        """Describe the lease ``WORKER_ID`` holds on ``job_id``."""
+        self.backend = backend
+        self.job_id = job_id
+        self.lease_sec = settings.job_lease_sec
+        self.heartbeat_sec = settings.job_heartbeat_sec
+        self.cancel = cancel
+        self.progress = progress
+        self.lost = False
+
+    async def run(self) -> None:
+        """Renew the lease until cancelled, the job is cancelled or it is lost."""
+        while True:
+            await asyncio.sleep(self.heartbeat_sec)
+            try:
+                cancel_requested = await self.backend.heartbeat(
+                    self.job_id, WORKER_ID, self.lease_sec, self.progress()
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Renewing the lease on job %s failed", self.job_id)
+                continue
+            if cancel_requested is None:
+                logger.warning("Lost the lease on job %s", self.job_id)
+                self.lost = True
+                self.cancel.cancel("Job lease was lost")
+                return
+            if cancel_requested:
+                self.cancel.cancel("Job cancelled")
+                return
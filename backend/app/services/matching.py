@@ -0,0 +1,80 @@
+"""Result predicates and limits that let a scan stop before the last page."""
+
+from typing import Any, Dict, List, Optional
+
+import re2
+
+# Scanner options that only select among decoded results; pages decode the
+# same whatever they are, so cached page decodes are shared across them
+LIMIT_OPTIONS = ("stop_after", "first_match_per_page", "match")
+
+# Longest result value pattern a client may send
+MAX_MATCH_LENGTH = 256
+
+# A result value pattern compiled by RE2
+MatchPattern = Any
+
+_RE2_OPTIONS = re2.Options()
+_RE2_OPTIONS.log_errors = False
+
+
+def compile_match(match: Optional[str]) -> Optional[MatchPattern]:
+    """Compile a result value pattern, raising ``ValueError`` if refused.
+
+    Patterns run against every decoded value inside the scan, where nothing
+    can interrupt them, so they are compiled with RE2, which matches in time
+    linear in the value whatever the pattern. Its syntax is that of ``re``
+    without backreferences and lookaround; patterns using those, invalid
+    ones and those longer than ``MAX_MATCH_LENGTH`` are refused.
+    """
+    if not match:
+        return None
+    if len(match) > MAX_MATCH_LENGTH:
+        raise ValueError(f"longer than {MAX_MATCH_LENGTH} characters")
+    try:
+        return re2.compile(match, _RE2_OPTIONS)
+    except re2.error as e:
+        reason = e.args[0] if e.args else "invalid pattern"
+        if isinstance(reason, bytes):
+            reason = reason.decode("utf-8", "replace")
+        raise ValueError(str(reason)) from e
+
+
+class ResultLimit:
+    """Keep the results a scan asks for and tell when it has all of them.
+
+    Results whose value does not contain a match of ``match`` are dropped,
+    ``first_match_per_page`` keeps only the first remaining result of each
+    page, and once ``stop_after`` results were kept the scan is ``done``.
+    A limit counts across the pages passed to ``take`` in order, so each
+    scan needs its own.
+    """
+
+    def __init__(
+        self,
+        stop_after: int = 0,
+        first_match_per_page: bool = False,
+        match: Optional[str] = None,
+    ) -> None:
+        """Initialize a limit that has kept nothing yet."""
+        self.stop_after = stop_after
+        self.first_match_per_page = first_match_per_page
+        self.pattern = compile_match(match)
+        self.kept = 0
+
+    @property
+    def done(self) -> bool:
+        """Return whether ``stop_after`` results were kept."""
+        return 0 < self.stop_after <= self.kept
+
+    def take(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Return the results of the next page that count towards the scan."""
+        if self.pattern is not None:
+            pattern = self.pattern
+            results = [r for r in results if pattern.search(r["value"])]
+        if self.first_match_per_page:
+            results = results[:1]
+        if self.stop_after:
+            results = results[: self.stop_after - self.kept]
+        self.kept += len(results)
+        return results
@@ -0,0 +1,131 @@
+"""Process pool management for page-parallel PDF scanning."""
+
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import List, Optional
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_size = 0
+_pool_lock = threading.Lock()
+_threads: Optional[ThreadPoolExecutor] = None
+_threads_size = 0
+
+
+def get_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Get the shared scan process pool, creating it on first use.
+
+    The pool is recreated if a different size is requested. Workers are
+    started with the ``spawn`` method so they never inherit pdfium state or
+    locks from a multi-threaded parent, and warm themselves up on start.
+    """
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is None or _pool_size != max_workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+            _pool_size = max_workers
+        return _pool
+
+
+def get_decode_pool(max_workers: int) -> ThreadPoolExecutor:
+    """Get the thread pool that decodes tiles, creating it on first use.
+
+    zxing-cpp releases the GIL while decoding, so tiles of one page decode in
+    parallel threads while the next tile is rendered. Each process has its
+    own pool; it is recreated if a different size is requested.
+    """
+    global _threads, _threads_size
+    with _pool_lock:
+        if _threads is None or _threads_size != max_workers:
+            if _threads is not None:
+                _threads.shutdown(wait=False)
+            _threads = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="zebrafetch-decode"
+            )
+            _threads_size = max_workers
+        return _threads
+
+
+def _init_worker() -> None:
+    """Import the scanner and its native libraries in a new worker process."""
+    from app.services.scanner import warm_up
+
+    warm_up()
+
+
+def _worker_pid() -> int:
+    """Return the id of the worker process running this task."""
+    return os.getpid()
+
+
+def prewarm_process_pool(max_workers: int) -> None:
+    """Start every worker of the shared pool and wait until they are ready.
+
+    Spawned workers otherwise start one by one as scans are submitted, and
+    the first scans pay for interpreter start-up and imports.
+    """
+    pool = get_process_pool(max_workers)
+    wait([pool.submit(_worker_pid) for _ in range(max_workers)])
+
+
+def shutdown_process_pool() -> None:
+    """Shut down the shared scan process and decode thread pools if started."""
+    global _pool, _pool_size, _threads, _threads_size
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+            _pool_size = 0
+        if _threads is not None:
+            _threads.shutdown(wait=True, cancel_futures=True)
+            _threads = None
+            _threads_size = 0
+
+
+class StopFlag:
+    """A signal that tells pool workers to stop scanning their page runs.
+
+    Futures can only be cancelled before a worker picks them up, so runs
+    that are already scanning check the flag between pages. It is a small
+    temporary file that exists while work should go on: removing it reaches
+    every worker process given its ``path``, and a flag that is never
+    stopped explicitly still is once it is cleaned up.
+    """
+
+    def __init__(self) -> None:
+        """Create the flag file in the temporary directory."""
+        fd, self.path = tempfile.mkstemp(prefix="zebrafetch-run-")
+        os.close(fd)
+
+    def stop(self) -> None:
+        """Signal workers to stop; safe to call more than once."""
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def is_stopped(path: Optional[str]) -> bool:
+    """Return whether the ``StopFlag`` at ``path`` was stopped."""
+    return path is not None and not os.path.exists(path)
+
+
+def split_pages(pages: List[int], chunks: int) -> List[List[int]]:
+    """Split a page list into at most ``chunks`` contiguous, balanced runs."""
+    chunks = max(1, min(chunks, len(pages)))
+    size, extra = divmod(len(pages), chunks)
+    runs = []
+    start = 0
+    for i in range(chunks):
+        end = start + size + (1 if i < extra else 0)
+        runs.append(pages[start:end])
+        start = end
+    return [run for run in runs if run]
@@ -0,0 +1,156 @@
+"""In-memory publish/subscribe of job status and progress."""
+
+import asyncio
+import time
+from functools import partial
+from typing import Any, AsyncIterator, Dict, Optional
+
+# Job states after which no further progress is published
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+class _Channel:
+    """Latest progress snapshot of one job and the event its waiters block on."""
+
+    def __init__(self) -> None:
+        """Create an empty channel at version 0."""
+        self.snapshot: Dict[str, Any] = {"version": 0}
+        self.changed = asyncio.Event()
+        self.finished_at: Optional[float] = None
+
+
+class ProgressBroker:
+    """Fan job progress out to waiting clients without touching the database.
+
+    Each job has a channel holding its latest snapshot, e.g. ``{"status":
+    "running", "pages_done": 3, "pages_total": 10, "barcodes": 2, "version":
+    7}``. Publishing merges fields into the snapshot, bumps ``version`` and
+    wakes every waiter; slow waiters simply see the newest snapshot, so
+    nothing queues up per client. Channels of finished jobs are dropped
+    ``retention_sec`` after the job finishes.
+
+    All methods except ``publish_threadsafe`` must run on the event loop.
+    """
+
+    def __init__(self, retention_sec: float = 300.0) -> None:
+        """Create an empty broker."""
+        self.retention_sec = retention_sec
+        self._channels: Dict[str, _Channel] = {}
+
+    def _channel(self, job_id: str) -> _Channel:
+        """Return a job's channel, creating it on first use."""
+        channel = self._channels.get(job_id)
+        if channel is None:
+            channel = self._channels[job_id] = _Channel()
+        return channel
+
+    def publish(self, job_id: str, **fields: Any) -> Dict[str, Any]:
+        """Merge ``fields`` into a job's snapshot and wake its waiters."""
+        channel = self._channel(job_id)
+        snapshot = {**channel.snapshot, **fields}
+        snapshot["version"] = channel.snapshot["version"] + 1
+        channel.snapshot = snapshot
+        # Swap the event first so waiters woken here block on the next one
+        changed, channel.changed = channel.changed, asyncio.Event()
+        changed.set()
+        if snapshot.get("status") in TERMINAL_STATUSES:
+            channel.finished_at = time.monotonic()
+            self._prune()
+        return snapshot
+
+    def publish_threadsafe(
+        self, loop: asyncio.AbstractEventLoop, job_id: str, **fields: Any
+    ) -> None:
+        """Publish from a worker thread via the event loop that owns the broker."""
+        loop.call_soon_threadsafe(partial(self.publish, job_id, **fields))
+
+    def snapshot(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job's latest snapshot, or ``None`` if none was published."""
+        channel = self._channels.get(job_id)
+        if channel is None or channel.snapshot["version"] == 0:
+            return None
+        return channel.snapshot
+
+    async def wait(
+        self, job_id: str, since: int, timeout: float
+    ) -> Optional[Dict[str, Any]]:
+        """Wait for a snapshot newer than version ``since``.
+
+        Returns the newest snapshot as soon as one exists, or ``None`` if
+        nothing was published within ``timeout`` seconds or the job is not
+        tracked.
+        """
+        channel = self._channels.get(job_id)
+        if channel is None:
+            return None
+        return await self._wait(channel, since, timeout)
+
+    @staticmethod
+    async def _wait(
+        channel: _Channel, since: int, timeout: float
+    ) -> Optional[Dict[str, Any]]:
+        """Wait on one channel; see ``wait``."""
+        if channel.snapshot["version"] > since:
+            return channel.snapshot
+        try:
+            await asyncio.wait_for(channel.changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return channel.snapshot
+
+    async def wait_finished(
+        self, job_id: str, timeout: float
+    ) -> Optional[Dict[str, Any]]:
+        """Wait up to ``timeout`` seconds for a job to complete or fail.
+
+        Returns the latest snapshot either way, or ``None`` if the job never
+        published anything.
+        """
+        deadline = time.monotonic() + timeout
+        snapshot = self.snapshot(job_id)
+        while snapshot is None or snapshot.get("status") not in TERMINAL_STATUSES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or job_id not in self._channels:
+                break
+            since = snapshot["version"] if snapshot else 0
+            snapshot = await self.wait(job_id, since, remaining) or snapshot
+        return snapshot
+
+    async def subscribe(
+        self, job_id: str, heartbeat: float
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Yield each new snapshot of a job until it completes or fails.
+
+        The current snapshot is yielded first; untracked jobs yield nothing.
+        ``None`` is yielded whenever ``heartbeat`` seconds pass without news,
+        so streaming callers can keep idle connections alive.
+        """
+        # Hold on to the channel so pruning cannot end the stream early
+        channel = self._channels.get(job_id)
+        if channel is None:
+            return
+        since = 0
+        while True:
+            snapshot = await self._wait(channel, since, heartbeat)
+            if snapshot is None:
+                yield None
+                continue
+            since = snapshot["version"]
+            yield snapshot
+            if snapshot.get("status") in TERMINAL_STATUSES:
+                return
+
+    def _prune(self) -> None:
+        """Drop channels of jobs that finished more than ``retention_sec`` ago."""
+        cutoff = time.monotonic() - self.retention_sec
+        expired = [
+            job_id
+            for job_id, channel in self._channels.items()
+            if channel.finished_at is not None and channel.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._channels[job_id]
+
+
+# Progress of the jobs run by this process
+progress = ProgressBroker()
@@ -0,0 +1,90 @@
+"""Region-of-interest hints: crop boxes in PDF coordinates."""
+
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+# (x0, y0, x1, y1) in PDF points from the page's lower-left corner
+Box = Tuple[float, float, float, float]
+
+# {"pages": [1-based page numbers] or None for every page, "box": [x0, y0,
+# x1, y1]}, the JSON form regions take in job params and templates
+Region = Dict[str, Any]
+
+# Most pages a region may list; page ranges are expanded into lists
+MAX_REGION_PAGES = 10_000
+
+
+def parse_regions(spec: str) -> List[Region]:
+    """Parse ``"[pages:]x0,y0,x1,y1"`` entries separated by ``;``.
+
+    ``pages`` is a 1-based page number, a ``"2-5"`` range or a ``"1,3"``
+    list; entries without it apply to every page. Raises ``ValueError`` on
+    malformed specs.
+    """
+    regions = []
+    for entry in spec.split(";"):
+        entry = entry.strip()
+        if not entry:
+            continue
+        pages: Optional[List[int]] = None
+        if ":" in entry:
+            page_spec, entry = entry.split(":", 1)
+            pages = _parse_pages(page_spec.strip())
+        box = [float(value) for value in entry.split(",")]
+        regions.append({"pages": pages, "box": box})
+    return validate_regions(regions)
+
+
+def _parse_pages(spec: str) -> List[int]:
+    """Convert a 1-based page spec to a sorted list of page numbers."""
+    if "-" in spec:
+        start, end = map(int, spec.split("-"))
+        if end - start >= MAX_REGION_PAGES:
+            raise ValueError(
+                f"Page range {spec!r} spans more than {MAX_REGION_PAGES} pages"
+            )
+        pages = list(range(start, end + 1))
+    else:
+        pages = [int(page) for page in spec.split(",")]
+    if not pages:
+        raise ValueError(f"Empty page range: {spec!r}")
+    return sorted(set(pages))
+
+
+def validate_regions(regions: List[Region]) -> List[Region]:
+    """Check and normalize regions, e.g. ones loaded from a template.
+
+    Raises ``ValueError`` if there are none, a box is not four finite numbers
+    with positive width and height, a page number is below 1, or a region
+    lists more than ``MAX_REGION_PAGES`` pages.
+    """
+    if not regions:
+        raise ValueError("At least one region is required")
+    normalized = []
+    for region in regions:
+        box = [float(value) for value in region["box"]]
+        if len(box) != 4:
+            raise ValueError("A region box needs four numbers: x0,y0,x1,y1")
+        x0, y0, x1, y1 = box
+        if not all(math.isfinite(value) for value in box):
+            raise ValueError(f"Region box values must be finite: {box}")
+        if x0 < 0 or y0 < 0 or x1 <= x0 or y1 <= y0:
+            raise ValueError(f"Invalid region box: {box}")
+        pages = region.get("pages")
+        if pages is not None:
+            if len(pages) > MAX_REGION_PAGES:
+                raise ValueError(f"A region may list at most {MAX_REGION_PAGES} pages")
+            pages = sorted({int(page) for page in pages})
+            if not pages or pages[0] < 1:
+                raise ValueError(f"Invalid region pages: {region['pages']}")
+        normalized.append({"pages": pages, "box": box})
+    return normalized
+
+
+def page_boxes(regions: List[Region], page_idx: int) -> List[Box]:
+    """Return the boxes that apply to a 0-based page index."""
+    return [
+        (region["box"][0], region["box"][1], region["box"][2], region["box"][3])
+        for region in regions
+        if region["pages"] is None or page_idx + 1 in region["pages"]
+    ]
@@ -2,108 +2,1294 @@
 
 import io
 import base64
-from typing import List, Dict, Any, Optional
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, wait
+from typing import (
+    List,
+    Dict,
+    Any,
+    Optional,
+    Iterator,
+    Generator,
+    Tuple,
+    Deque,
+    TypeVar,
+    Union,
+)
+import numpy as np
 import pypdfium2 as pdfium
+import pypdfium2.raw as pdfium_c
 import zxingcpp
 import logging
+from PIL import Image
+
+from app.metrics import OPEN_SECONDS, observe_pages
+from app.services.cache import PageCache, hash_document
+from app.services.cancel import CANCEL_POLL_SEC, CancelToken, ScanCancelled
+from app.services.detect import (
+    boxes_overlap,
+    find_barcode_regions,
+    merge_boxes,
+    split_box,
+)
+from app.services.images import ImageEncoding, page_image_id
+from app.services.matching import LIMIT_OPTIONS, ResultLimit
+from app.services.parallel import (
+    StopFlag,
+    get_decode_pool,
+    get_process_pool,
+    split_pages,
+)
+from app.services.regions import Box, Region, page_boxes
+from app.services.symbology import format_mask, resolve_symbologies, symbology_name
+from app.services.vector import (
+    UNCHECKED_SYMBOLOGIES,
+    VECTOR_SYMBOLOGIES,
+    collect_rects,
+    decode_bar_run,
+    find_bar_runs,
+    has_loose_modules,
+    hint_matches,
+    text_near,
+)
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-"""Scanner service for the ZebraFetch API."""
+# A PDF given as its bytes or as a file path
+PdfSource = Union[bytes, str, "os.PathLike[str]"]
+
+# (page_idx, results, encoded page image if embedded)
+PageResults = Tuple[int, List[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+# (page_idx, filtered results, raw decodes before filtering and embedding,
+# encoded page image if embedded)
+ScannedPage = Tuple[
+    int, List[Dict[str, Any]], List[Dict[str, Any]], Optional[Dict[str, Any]]
+]
+
+# (per-page records, or None and an error message, page timings) of one
+# document in a batch
+DocumentResult = Tuple[
+    Optional[List[Dict[str, Any]]], Optional[str], List[Dict[str, Any]]
+]
+
+# A decoded barcode with the pixel offset of the image it was found in and
+# the scale from that image's pixels to full-page pixels. The image is a PIL
+# image when snippets are embedded, otherwise a grayscale NumPy view of the
+# pdfium bitmap, or None for regions and tiles, which are released as soon
+# as they are decoded.
+Detection = Tuple[Any, float, float, Any, float, float]
+
+T = TypeVar("T")
+
+# Padding around preview candidates before re-rendering, in PDF points
+REGION_PADDING_PT = 18.0
+# Detection cells, in subsampled pixels, when looking for bars cut by seams
+SEAM_BLOCK = 4
+
+
+def open_document(pdf: PdfSource) -> pdfium.PdfDocument:
+    """Open a PDF from bytes or from a file path.
+
+    pdfium reads documents opened by path on demand, so large files on disk
+    are never loaded into memory as a whole.
+    """
+    if isinstance(pdf, bytes):
+        return pdfium.PdfDocument(io.BytesIO(pdf))
+    return pdfium.PdfDocument(os.fspath(pdf))
+
+
+def warm_up() -> None:
+    """Render, decode and encode a blank page once to load lazy dependencies.
+
+    pypdfium2's NumPy bridge, zxing-cpp's reader and PIL's image plugins are
+    set up on first use; doing that here keeps it out of the first scan.
+    """
+    doc = pdfium.PdfDocument.new()
+    try:
+        bitmap = doc.new_page(72, 72).render(scale=1, grayscale=True)
+        zxingcpp.read_barcodes(bitmap.to_numpy())
+        Image.init()
+        bitmap.to_pil().save(io.BytesIO(), format="PNG")
+    finally:
+        doc.close()
+
+
+def count_pages(pdf: PdfSource, page_range: Optional[List[int]] = None) -> int:
+    """Return how many pages a scan of ``page_range`` will cover."""
+    doc = open_document(pdf)
+    try:
+        if not page_range:
+            return len(doc)
+        return sum(1 for page_idx in page_range if page_idx < len(doc))
+    finally:
+        doc.close()
+
+
+def _scan_chunk(
+    pdf: PdfSource,
+    page_range: List[int],
+    options: Dict[str, Any],
+    symbologies: Optional[List[str]],
+    embed_page: bool,
+    embed_snippet: bool,
+    stop_path: Optional[str] = None,
+) -> Tuple[List[ScannedPage], List[Dict[str, Any]]]:
+    """Scan a contiguous run of pages inside a pool worker process.
+
+    The run ends early, with the pages scanned so far, once the ``StopFlag``
+    at ``stop_path`` is stopped.
+    """
+    scanner = Scanner(
+        **options, cancel=CancelToken(stop_path=stop_path), record_metrics=False
+    )
+    doc = open_document(pdf)
+    pages: List[ScannedPage] = []
+    try:
+        for page in scanner._iter_serial(
+            doc, page_range, symbologies, embed_page, embed_snippet
+        ):
+            pages.append(page)
+    except ScanCancelled:
+        pass
+    finally:
+        doc.close()
+    return pages, scanner.page_stats
+
+
+def _scan_document(
+    pdf: PdfSource,
+    page_range: Optional[List[int]],
+    options: Dict[str, Any],
+    symbologies: Optional[List[str]],
+    embed_page: bool,
+    embed_snippet: bool,
+    stop_path: Optional[str] = None,
+) -> DocumentResult:
+    """Scan a whole document inside a pool worker process."""
+    scanner = Scanner(
+        **options, cancel=CancelToken(stop_path=stop_path), record_metrics=False
+    )
+    try:
+        records = list(
+            scanner.iter_records(
+                pdf, page_range, symbologies, embed_page, embed_snippet
+            )
+        )
+    except Exception as e:
+        return None, str(e), scanner.page_stats
+    return records, None, scanner.page_stats
+
+
+def _pixel_count(image: Any) -> int:
+    """Return the number of pixels in a PIL image or NumPy array."""
+    if isinstance(image, Image.Image):
+        return int(image.width * image.height)
+    return int(image.shape[0] * image.shape[1])
+
+
+def _decode(image: Any, formats: Any) -> Tuple[List[Any], float]:
+    """Decode an image, returning the barcodes and the time taken in ms."""
+    start = time.perf_counter()
+    barcodes = zxingcpp.read_barcodes(image, formats=formats)
+    return barcodes, (time.perf_counter() - start) * 1000
+
+
+def _page_box(detection: Detection) -> Tuple[float, float, float, float]:
+    """Return a detection's bounding box in full-page pixels."""
+    barcode, offset_x, offset_y, _, scale_x, scale_y = detection
+    position = barcode.position
+    corners = [
+        position.top_left,
+        position.top_right,
+        position.bottom_right,
+        position.bottom_left,
+    ]
+    xs = [offset_x + corner.x * scale_x for corner in corners]
+    ys = [offset_y + corner.y * scale_y for corner in corners]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _merge_seams(detections: List[Detection]) -> List[Detection]:
+    """Drop repeat decodes of barcodes that lie in more than one tile.
+
+    Duplicates have the same format and text and overlapping page boxes. The
+    largest decode is kept because a linear barcode cut by a tile edge can
+    still decode, just with fewer scan lines. Detections keep tile order.
+    """
+    boxes = [_page_box(detection) for detection in detections]
+    by_size = sorted(
+        range(len(detections)),
+        key=lambda i: (boxes[i][2] - boxes[i][0]) * (boxes[i][3] - boxes[i][1]),
+        reverse=True,
+    )
+    kept: List[int] = []
+    for i in by_size:
+        barcode = detections[i][0]
+        if not any(
+            detections[j][0].format == barcode.format
+            and detections[j][0].text == barcode.text
+            and boxes_overlap(boxes[i], boxes[j])
+            for j in kept
+        ):
+            kept.append(i)
+    return [detections[i] for i in sorted(kept)]
+
+
+def _filter_results(
+    raw: List[Dict[str, Any]], symbologies: Optional[List[str]]
+) -> List[Dict[str, Any]]:
+    """Narrow cached page decodes to canonical symbologies, copying each result.
+
+    Cached decodes may cover more formats than the current request asks for.
+    """
+    return [
+        dict(result)
+        for result in raw
+        if not symbologies or symbology_name(result["type"]) in symbologies
+    ]
 
 
 class Scanner:
     """Service for scanning PDFs and extracting barcodes."""
 
-    def __init__(self, dpi: int = 300):
-        """Initialize scanner with specified DPI."""
+    def __init__(
+        self,
+        dpi: int = 300,
+        workers: int = 1,
+        chunk_pages: int = 8,
+        adaptive: bool = False,
+        preview_dpi: int = 72,
+        max_region_fraction: float = 0.5,
+        page_cache: Optional[PageCache] = None,
+        image_format: str = "png",
+        image_quality: int = 80,
+        image_max_px: int = 0,
+        regions: Optional[List[Region]] = None,
+        tile_max_px: int = 0,
+        tile_overlap_pt: float = 144.0,
+        tile_threads: int = 1,
+        native_images: bool = False,
+        vector_barcodes: bool = False,
+        stop_after: int = 0,
+        first_match_per_page: bool = False,
+        match: Optional[str] = None,
+        cancel: Optional[CancelToken] = None,
+        record_metrics: bool = True,
+    ):
+        """Initialize scanner with specified DPI and process pool size.
+
+        With ``workers`` greater than one, multi-page documents are split into
+        contiguous runs of at most ``chunk_pages`` pages that are rendered and
+        decoded in parallel by the shared process pool.
+
+        With ``adaptive`` enabled, each page is first rendered at
+        ``preview_dpi`` to locate candidate barcode regions, and only those
+        regions are re-rendered at ``dpi``. Pages where the preview finds
+        nothing, or where candidates cover more than ``max_region_fraction``
+        of the page, fall back to a full-resolution render.
+
+        With a ``page_cache``, raw decodes are reused for pages of the same
+        document that were scanned before with the same options, whatever the
+        page range or symbology filter. Scans that embed images bypass it
+        because they need the rendered pixels anyway.
+
+        Embedded page images are encoded once per page that has results, as
+        ``image_format`` at ``image_quality`` and downscaled to at most
+        ``image_max_px`` pixels on the longer side when that is set.
+
+        With ``regions`` (see ``app.services.regions``), pages that have a
+        crop box render and decode only their boxes; other pages, and rotated
+        pages, are scanned in full. When page images are embedded the whole
+        page is rendered anyway, and only barcodes inside the boxes are kept.
+
+        With ``tile_max_px``, no render exceeds that many pixels: larger pages
+        and regions are rendered as tiles overlapping by ``tile_overlap_pt``,
+        decoded by ``tile_threads`` threads while the next tile renders, and
+        barcodes found in two tiles are reported once. Barcodes up to the
+        overlap in size are always whole in some tile; bar-like areas cut by
+        a seam are rendered again as strips across the seam, so longer linear
+        barcodes are read whole as well. Rotated pages and
+        pages with embedded images are still rendered in one piece.
+
+        With ``native_images``, pages that consist of a single upright image,
+        as scanner output does, are not rendered: the embedded image is
+        decoded at its own resolution and positions are mapped onto the page
+        at ``dpi``. Pages with any other visible content fall back to
+        rendering, as do images over the tile budget.
+
+        With ``vector_barcodes``, 1D barcodes drawn as vector bars (Code128,
+        EAN/UPC, Code39) are read from the page objects and the page is not
+        rendered. Pages the geometry cannot fully account for are rendered:
+        pages with images, barcode fonts or what may be a vector 2D code,
+        bar runs that do not decode, and Code39 symbols whose printed text
+        does not confirm them. Snippet and page embedding always render.
+
+        ``match``, a regular expression searched for in each result's value,
+        drops results that do not contain it; ``first_match_per_page`` keeps
+        only the first remaining result of each page; and with ``stop_after``
+        the scan ends once that many results were kept, without rendering
+        further pages. Parallel scans then hand out one page at a time and
+        stop the pages still in flight, so callers that only need one ID
+        from the first pages of a long document do not wait for the rest.
+
+        A ``cancel`` token is checked before every page and tile and charged
+        for every page scanned; once it is cancelled or out of budget, the
+        scan raises ``ScanCancelled`` and pool workers stop their page runs,
+        so abandoned scans free the CPU within a page.
+
+        Per-page render, decode and encode timings and barcode counts are
+        appended to ``page_stats`` and, with ``record_metrics``, exported as
+        Prometheus metrics. Scanners inside pool workers leave that to the
+        scanner that receives their ``page_stats``.
+        """
         self.dpi = dpi
+        self.workers = workers
+        self.chunk_pages = chunk_pages
+        self.adaptive = adaptive
+        self.preview_dpi = preview_dpi
+        self.max_region_fraction = max_region_fraction
+        self.page_cache = page_cache
+        self.image_encoding = ImageEncoding(image_format, image_quality, image_max_px)
+        self.regions = regions
+        self.tile_max_px = tile_max_px
+        self.tile_overlap_pt = tile_overlap_pt
+        self.tile_threads = tile_threads
+        self.native_images = native_images
+        self.vector_barcodes = vector_barcodes
+        self.stop_after = stop_after
+        self.first_match_per_page = first_match_per_page
+        self.match = match
+        self.cancel = cancel
+        self.record_metrics = record_metrics
+        self.page_stats: List[Dict[str, Any]] = []
+
+    def options(self) -> Dict[str, Any]:
+        """Return the constructor options that affect scan output."""
+        return {
+            "dpi": self.dpi,
+            "adaptive": self.adaptive,
+            "preview_dpi": self.preview_dpi,
+            "max_region_fraction": self.max_region_fraction,
+            "image_format": self.image_encoding.format,
+            "image_quality": self.image_encoding.quality,
+            "image_max_px": self.image_encoding.max_px,
+            "regions": self.regions,
+            "tile_max_px": self.tile_max_px,
+            "tile_overlap_pt": self.tile_overlap_pt,
+            "native_images": self.native_images,
+            "vector_barcodes": self.vector_barcodes,
+            "stop_after": self.stop_after,
+            "first_match_per_page": self.first_match_per_page,
+            "match": self.match,
+        }
+
+    def _decode_options(self) -> Dict[str, Any]:
+        """Return the options that affect what a page decodes to."""
+        options = self.options()
+        for name in LIMIT_OPTIONS:
+            del options[name]
+        return options
 
     def scan_pdf(
         self,
-        pdf_bytes: bytes,
+        pdf: PdfSource,
         page_range: Optional[List[int]] = None,
         symbologies: Optional[List[str]] = None,
         embed_page: bool = False,
         embed_snippet: bool = False,
     ) -> List[Dict[str, Any]]:
-        """Scan PDF and extract barcodes."""
-        logger.debug(f"Starting PDF scan with symbologies: {symbologies}")
-        doc = pdfium.PdfDocument(io.BytesIO(pdf_bytes))
+        """Scan PDF and extract barcodes.
+
+        ``pdf`` is the document's bytes or a path to it. Results are returned
+        as a flat list. Embedded page images are inlined
+        into each result's ``page_image``; results on the same page share a
+        single encoded string.
+        """
         results = []
+        for _, page_results, page_image in self.iter_pages(
+            pdf, page_range, symbologies, embed_page, embed_snippet
+        ):
+            for result in page_results:
+                if page_image is not None:
+                    result["page_image"] = page_image["data"]
+                results.append(result)
 
-        # Determine page range
-        if not page_range:
-            page_range = list(range(len(doc)))
+        logger.debug("Scan complete. Found %d matching barcodes", len(results))
+        return results
+
+    def iter_records(
+        self,
+        pdf: PdfSource,
+        page_range: Optional[List[int]] = None,
+        symbologies: Optional[List[str]] = None,
+        embed_page: bool = False,
+        embed_snippet: bool = False,
+        doc_hash: Optional[str] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Scan PDF lazily, yielding one per-page record in page order.
+
+        Records have the form ``{"page": n, "results": [...]}``, with 1-based
+        page numbers.
+
+        With ``embed_page``, records of pages that have results also carry the
+        encoded ``page_image``, and each result refers to it by ``id``.
+        """
+        for page_idx, results, page_image in self.iter_pages(
+            pdf, page_range, symbologies, embed_page, embed_snippet, doc_hash
+        ):
+            record: Dict[str, Any] = {"page": page_idx + 1, "results": results}
+            if page_image is not None:
+                record["page_image"] = page_image
+            yield record
+
+    def iter_pages(
+        self,
+        pdf: PdfSource,
+        page_range: Optional[List[int]] = None,
+        symbologies: Optional[List[str]] = None,
+        embed_page: bool = False,
+        embed_snippet: bool = False,
+        doc_hash: Optional[str] = None,
+    ) -> Iterator[PageResults]:
+        """Scan PDF lazily, yielding ``(page_idx, results, page_image)`` in order.
+
+        Only the pages currently being decoded are held in memory, so callers
+        can stream results while the rest of the document is still scanned.
+        With ``stop_after``, iteration ends at the page that completes it.
+        Pass a file path as ``pdf`` for large documents: pdfium then reads
+        pages from disk on demand and pool workers open the file themselves
+        instead of each receiving a copy of its bytes.
+        ``doc_hash`` may be passed to avoid re-hashing the PDF for the page
+        cache when the caller already has it.
+        """
+        logger.debug("Starting PDF scan with symbologies: %s", symbologies)
+        symbologies = resolve_symbologies(symbologies)
+        start = time.perf_counter()
+        doc = open_document(pdf)
+        if self.record_metrics:
+            OPEN_SECONDS.observe(time.perf_counter() - start)
 
-        # Process each page
+        try:
+            # Determine page range
+            if not page_range:
+                page_range = list(range(len(doc)))
+            page_range = [page_idx for page_idx in page_range if page_idx < len(doc)]
+
+            # Look up pages decoded by earlier scans of the same document
+            page_cache = self.page_cache
+            if embed_page or embed_snippet:
+                page_cache = None
+            cached: Dict[int, List[Dict[str, Any]]] = {}
+            options = self._decode_options()
+            if page_cache is not None:
+                doc_hash = doc_hash or hash_document(pdf)
+                for page_idx in page_range:
+                    raw = page_cache.get(doc_hash, page_idx, options, symbologies)
+                    if raw is not None:
+                        cached[page_idx] = raw
+            missing = [page_idx for page_idx in page_range if page_idx not in cached]
+
+            if self.workers > 1 and len(missing) > 1:
+                doc.close()
+                scanned = self._iter_parallel(
+                    pdf, missing, symbologies, embed_page, embed_snippet
+                )
+            else:
+                scanned = self._iter_serial(
+                    doc, missing, symbologies, embed_page, embed_snippet
+                )
+
+            limit = ResultLimit(self.stop_after, self.first_match_per_page, self.match)
+            try:
+                for page_idx in page_range:
+                    if page_idx in cached:
+                        results = _filter_results(cached[page_idx], symbologies)
+                        yield page_idx, limit.take(results), None
+                    else:
+                        if self.cancel is not None:
+                            self.cancel.charge()
+                        page_idx, results, raw, page_image = next(scanned)
+                        if page_cache is not None and doc_hash is not None:
+                            page_cache.put(
+                                doc_hash, page_idx, options, symbologies, raw
+                            )
+                        results = limit.take(results)
+                        yield page_idx, results, page_image if results else None
+                    if limit.done:
+                        return
+            finally:
+                scanned.close()
+        finally:
+            doc.close()
+
+    def iter_documents(
+        self,
+        documents: List[PdfSource],
+        page_range: Optional[List[int]] = None,
+        symbologies: Optional[List[str]] = None,
+        embed_page: bool = False,
+        embed_snippet: bool = False,
+    ) -> Generator[Tuple[Optional[List[Dict[str, Any]]], Optional[str]], None, None]:
+        """Scan many documents, yielding ``(records, error)`` for each in order.
+
+        A document that fails to scan yields ``(None, message)`` instead of
+        stopping the batch. With ``workers`` greater than one, whole documents
+        are spread across the process pool, at most two per worker in flight,
+        which suits batches of short documents better than splitting each one
+        into page runs. A cancelled ``cancel`` token ends the whole batch.
+        """
+        symbologies = resolve_symbologies(symbologies)
+        if self.workers <= 1 or len(documents) <= 1:
+            for pdf in documents:
+                try:
+                    records = list(
+                        self.iter_records(
+                            pdf, page_range, symbologies, embed_page, embed_snippet
+                        )
+                    )
+                except ScanCancelled:
+                    raise
+                except Exception as e:
+                    yield None, str(e)
+                    continue
+                yield records, None
+            return
+
+        pool = get_process_pool(self.workers)
+        queued = iter(documents)
+        pending: Deque["Future[DocumentResult]"] = deque()
+        stop = StopFlag()
+
+        def submit_next() -> None:
+            pdf = next(queued, None)
+            if pdf is not None:
+                pending.append(
+                    pool.submit(
+                        _scan_document,
+                        pdf,
+                        page_range,
+                        self.options(),
+                        symbologies,
+                        embed_page,
+                        embed_snippet,
+                        stop.path,
+                    )
+                )
+
+        try:
+            for _ in range(self.workers * 2):
+                submit_next()
+            while pending:
+                scanned, error, page_stats = self._wait(pending.popleft())
+                submit_next()
+                self.page_stats.extend(page_stats)
+                if self.record_metrics:
+                    observe_pages(page_stats)
+                if self.cancel is not None:
+                    self.cancel.charge(len(page_stats))
+                yield scanned, error
+        finally:
+            stop.stop()
+            for future in pending:
+                future.cancel()
+
+    def _iter_serial(
+        self,
+        doc: pdfium.PdfDocument,
+        page_range: List[int],
+        symbologies: Optional[List[str]],
+        embed_page: bool,
+        embed_snippet: bool,
+    ) -> Generator[ScannedPage, None, None]:
+        """Scan pages one after another in the calling thread."""
         for page_idx in page_range:
-            if page_idx >= len(doc):
-                continue
+            if self.cancel is not None:
+                self.cancel.check()
+            results, raw, page_image = self._scan_page(
+                doc, page_idx, symbologies, embed_page, embed_snippet
+            )
+            if self.record_metrics:
+                observe_pages(self.page_stats[-1:])
+            yield page_idx, results, raw, page_image
+
+    def _iter_parallel(
+        self,
+        pdf: PdfSource,
+        page_range: List[int],
+        symbologies: Optional[List[str]],
+        embed_page: bool,
+        embed_snippet: bool,
+    ) -> Generator[ScannedPage, None, None]:
+        """Fan page runs out to the process pool and yield them in page order.
+
+        At most two runs per worker are in flight, which keeps memory bounded
+        for long documents. If the consumer stops iterating early, runs not
+        yet started are cancelled and running ones stop after their current
+        page. Scans that may stop early (``stop_after``) use one-page runs so
+        each page is returned as soon as it is decoded.
+        """
+        pool = get_process_pool(self.workers)
+        chunk_pages = 1 if self.stop_after else self.chunk_pages
+        chunk_count = max(self.workers, -(-len(page_range) // chunk_pages))
+        chunks = iter(split_pages(page_range, chunk_count))
+        stop = StopFlag()
+        pending: Deque["Future[Tuple[List[ScannedPage], List[Dict[str, Any]]]]"] = (
+            deque()
+        )
+
+        def submit_next() -> None:
+            chunk = next(chunks, None)
+            if chunk is not None:
+                pending.append(
+                    pool.submit(
+                        _scan_chunk,
+                        pdf,
+                        chunk,
+                        self.options(),
+                        symbologies,
+                        embed_page,
+                        embed_snippet,
+                        stop.path,
+                    )
+                )
+
+        try:
+            for _ in range(self.workers * 2):
+                submit_next()
+            while pending:
+                pages, page_stats = self._wait(pending.popleft())
+                submit_next()
+                self.page_stats.extend(page_stats)
+                if self.record_metrics:
+                    observe_pages(page_stats)
+                yield from pages
+        finally:
+            stop.stop()
+            for future in pending:
+                future.cancel()
+
+    def _wait(self, future: "Future[T]") -> T:
+        """Wait for a pool result, checking the cancel token meanwhile."""
+        if self.cancel is not None:
+            while not wait([future], timeout=CANCEL_POLL_SEC).done:
+                self.cancel.check()
+        return future.result()
+
+    @staticmethod
+    def _render(
+        page: pdfium.PdfPage,
+        scale: float,
+        crop: Tuple[float, float, float, float] = (0, 0, 0, 0),
+        color: bool = False,
+    ) -> Any:
+        """Render a page, or a cropped part of it, for decoding.
+
+        By default pdfium renders straight into a one-byte-per-pixel grayscale
+        bitmap and a NumPy view of its buffer is returned, which zxing-cpp
+        reads without a copy. A color PIL image is only built when ``color``
+        is set because the pixels are embedded in the response.
+        """
+        bitmap = page.render(scale=scale, crop=crop, grayscale=not color)
+        if color:
+            return bitmap.to_pil()
+        return bitmap.to_numpy()
+
+    def _scan_page(
+        self,
+        doc: pdfium.PdfDocument,
+        page_idx: int,
+        symbologies: Optional[List[str]],
+        embed_page: bool,
+        embed_snippet: bool,
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Render a single page and decode its barcodes.
+
+        Only the requested symbologies are searched for. Returns the results
+        with any embedded snippets, the raw decodes without them, which are
+        what the page cache stores, and the encoded page image when
+        ``embed_page`` is set and the page has results.
+        """
+        results: List[Dict[str, Any]] = []
+        raw: List[Dict[str, Any]] = []
+        logger.debug("Processing page %d", page_idx + 1)
+        page = doc.get_page(page_idx)
+        stats: Dict[str, Any] = {
+            "page": page_idx + 1,
+            "mode": "full",
+            "render_ms": 0.0,
+            "decode_ms": 0.0,
+            "encode_ms": 0.0,
+            "render_pixels": 0,
+            "peak_pixels": 0,
+            "barcodes": 0,
+        }
+
+        # Only search for the requested formats
+        formats = format_mask(symbologies)
 
-            logger.debug(f"Processing page {page_idx + 1}")
-            page = doc.get_page(page_idx)
-            pil_image = page.render(scale=self.dpi / 72).to_pil()
+        boxes = page_boxes(self.regions, page_idx) if self.regions else []
+        detections = None
+        pil_image = None
+        if not embed_page:
+            detections = self._decode_partial(
+                page, boxes, symbologies, formats, embed_snippet, stats
+            )
+        if detections is None:
+            start = time.perf_counter()
+            image = self._render(page, self.dpi / 72, color=embed_page or embed_snippet)
+            stats["render_ms"] += (time.perf_counter() - start) * 1000
+            stats["render_pixels"] += _pixel_count(image)
+            stats["peak_pixels"] = _pixel_count(image)
+            if embed_page:
+                pil_image = image
 
             # Find barcodes
-            barcodes = zxingcpp.read_barcodes(pil_image)
-            logger.debug(f"Found {len(barcodes)} barcodes on page {page_idx + 1}")
-
-            if not barcodes:
-                continue
-
-            # Process each barcode
-            for barcode in barcodes:
-                barcode_format = str(barcode.format)
-                logger.debug(f"Found barcode of type: {barcode_format}")
-
-                # Calculate position and dimensions from corner points
-                x = barcode.position.top_left.x
-                y = barcode.position.top_left.y
-                width = barcode.position.top_right.x - barcode.position.top_left.x
-                height = barcode.position.bottom_left.y - barcode.position.top_left.y
-
-                result = {
-                    "page": page_idx + 1,  # 1-based page numbers
-                    "type": barcode_format,
-                    "value": barcode.text,
-                    "position": {"x": x, "y": y, "width": width, "height": height},
-                }
-
-                # Filter by symbology if specified
-                if symbologies:
-                    logger.debug(f"Checking if {barcode_format} is in {symbologies}")
-                    if barcode_format not in symbologies:
-                        logger.debug(
-                            f"Skipping barcode - format {barcode_format} "
-                            "not in requested symbologies"
+            start = time.perf_counter()
+            barcodes = zxingcpp.read_barcodes(image, formats=formats)
+            stats["decode_ms"] += (time.perf_counter() - start) * 1000
+            detections = [(barcode, 0, 0, image, 1.0, 1.0) for barcode in barcodes]
+            if boxes and page.get_rotation() == 0:
+                detections = self._within_boxes(page, boxes, detections)
+
+        self.page_stats.append(stats)
+        stats["barcodes"] = len(detections)
+        logger.debug("Found %d barcodes on page %d", len(detections), page_idx + 1)
+
+        if not detections:
+            return results, raw, None
+
+        # Encode the page image once, however many barcodes point to it
+        start = time.perf_counter()
+        page_image = None
+        if embed_page and pil_image is not None:
+            page_image = {
+                "id": page_image_id(page_idx + 1),
+                "page": page_idx + 1,
+                **self.image_encoding.encode(pil_image),
+            }
+
+        # Process each barcode
+        for barcode, offset_x, offset_y, source_image, scale_x, scale_y in detections:
+            barcode_format = str(barcode.format)
+
+            # Calculate position and dimensions from corner points
+            local_x = barcode.position.top_left.x
+            local_y = barcode.position.top_left.y
+            local_width = barcode.position.top_right.x - barcode.position.top_left.x
+            local_height = barcode.position.bottom_left.y - barcode.position.top_left.y
+
+            result = {
+                "page": page_idx + 1,  # 1-based page numbers
+                "type": barcode_format,
+                "value": barcode.text,
+                "position": {
+                    "x": round(offset_x + local_x * scale_x),
+                    "y": round(offset_y + local_y * scale_y),
+                    "width": round(local_width * scale_x),
+                    "height": round(local_height * scale_y),
+                },
+            }
+            raw.append(dict(result))
+
+            # Point to the page image if one is embedded
+            if page_image is not None:
+                result["page_image"] = page_image["id"]
+
+            # Embed barcode snippet if requested
+            if embed_snippet:
+                snippet = source_image.crop(
+                    (local_x, local_y, local_x + local_width, local_y + local_height)
+                )
+                img_byte_arr = io.BytesIO()
+                snippet.save(img_byte_arr, format="PNG")
+                result["snippet"] = base64.b64encode(img_byte_arr.getvalue()).decode()
+
+            results.append(result)
+
+        if embed_page or embed_snippet:
+            stats["encode_ms"] += (time.perf_counter() - start) * 1000
+        return results, raw, page_image
+
+    def _decode_partial(
+        self,
+        page: pdfium.PdfPage,
+        boxes: List[Box],
+        symbologies: Optional[List[str]],
+        formats: Any,
+        color: bool,
+        stats: Dict[str, Any],
+    ) -> Optional[List[Detection]]:
+        """Decode a page without a full render where the options allow it.
+
+        Vector bars, crop boxes, embedded images, adaptive previews and tiles
+        are tried in that order. Returns ``None`` when the page has to be
+        rendered in one piece.
+        """
+        detections = None
+        if self.vector_barcodes and not color:
+            detections = self._decode_vector(page, symbologies, stats)
+            if detections is not None and boxes:
+                detections = self._within_boxes(page, boxes, detections)
+        if detections is not None:
+            return detections
+        if boxes:
+            return self._decode_regions(page, boxes, formats, color, stats)
+        if self.native_images:
+            detections = self._decode_embedded(page, formats, color, stats)
+        if detections is None and self.adaptive:
+            detections = self._decode_adaptive(page, formats, color, stats)
+        if detections is None and self._needs_tiles(page):
+            page_width, page_height = page.get_size()
+            detections = self._decode_boxes(
+                page, [(0.0, 0.0, page_width, page_height)], formats, color, stats
+            )
+            stats["mode"] = "tiled"
+        return detections
+
+    def _decode_vector(
+        self,
+        page: pdfium.PdfPage,
+        symbologies: Optional[List[str]],
+        stats: Dict[str, Any],
+    ) -> Optional[List[Detection]]:
+        """Decode 1D barcodes drawn as vector bars without rendering the page.
+
+        Each run of bars is redrawn as a small bitmap and decoded as a pure
+        symbol. Returns ``None`` when the page has to be rendered instead:
+        see ``vector_barcodes``.
+        """
+        wanted = [
+            name
+            for name in VECTOR_SYMBOLOGIES
+            if not symbologies or name in symbologies
+        ]
+        if not wanted or page.get_rotation() != 0:
+            return None
+        start = time.perf_counter()
+        rects = collect_rects(page)
+        if rects is None:
+            return None
+        runs, loose = find_bar_runs(rects)
+        stats["render_ms"] += (time.perf_counter() - start) * 1000
+        if has_loose_modules(loose):
+            return None
+
+        formats = format_mask(wanted)
+        scale = self.dpi / 72
+        page_left, _, _, page_top = page.get_cropbox()
+        textpage = None
+        detections: List[Detection] = []
+        for run in runs:
+            start = time.perf_counter()
+            barcodes, image, placement = decode_bar_run(run, formats)
+            stats["decode_ms"] += (time.perf_counter() - start) * 1000
+            if len(barcodes) != 1 or image is None:
+                return None
+            barcode = barcodes[0]
+            if symbology_name(str(barcode.format)) in UNCHECKED_SYMBOLOGIES:
+                if textpage is None:
+                    textpage = page.get_textpage()
+                if not hint_matches(barcode.text, text_near(textpage, run)):
+                    return None
+            stats["render_pixels"] += _pixel_count(image)
+            stats["peak_pixels"] = max(stats["peak_pixels"], _pixel_count(image))
+            left, top, pt_across, pt_down = placement
+            detections.append(
+                (
+                    barcode,
+                    (left - page_left) * scale,
+                    (page_top - top) * scale,
+                    None,
+                    pt_across * scale,
+                    pt_down * scale,
+                )
+            )
+        stats["mode"] = "vector"
+        return detections
+
+    def _decode_embedded(
+        self,
+        page: pdfium.PdfPage,
+        formats: Any,
+        color: bool,
+        stats: Dict[str, Any],
+    ) -> Optional[List[Detection]]:
+        """Decode the only image of a scanned page at its native resolution.
+
+        Returns ``None`` when the page has to be rendered instead: rotated
+        pages, pages with anything but one image and invisible (OCR) text,
+        flipped, rotated or skewed images, and images over the tile budget.
+        """
+        if page.get_rotation() != 0:
+            return None
+        image_object = None
+        for page_object in page.get_objects(max_depth=0):
+            if page_object.type == pdfium_c.FPDF_PAGEOBJ_IMAGE and image_object is None:
+                image_object = page_object
+            elif not (
+                page_object.type == pdfium_c.FPDF_PAGEOBJ_TEXT
+                and pdfium_c.FPDFTextObj_GetTextRenderMode(page_object.raw)
+                == pdfium_c.FPDF_TEXTRENDERMODE_INVISIBLE
+            ):
+                return None
+        if image_object is None:
+            return None
+        # The image matrix maps the unit square onto the page
+        a, b, c, d, e, f = image_object.get_matrix().get()
+        if b or c or a <= 0 or d <= 0:
+            return None
+        width, height = image_object.get_px_size()
+        if not width or not height:
+            return None
+        if self.tile_max_px and width * height > self.tile_max_px:
+            return None
+
+        start = time.perf_counter()
+        try:
+            bitmap = image_object.get_bitmap(render=False)
+        except pdfium.PdfiumError:
+            return None
+        image = bitmap.to_pil() if color else bitmap.to_numpy()
+        stats["render_ms"] += (time.perf_counter() - start) * 1000
+        stats["render_pixels"] += width * height
+        stats["peak_pixels"] = width * height
+
+        barcodes, decode_ms = _decode(image, formats)
+        stats["decode_ms"] += decode_ms
+        stats["mode"] = "image"
+
+        # Place image pixels where a full render at dpi would put them
+        scale = self.dpi / 72
+        page_left, _, _, page_top = page.get_cropbox()
+        offset_x = (e - page_left) * scale
+        offset_y = (page_top - f - d) * scale
+        scale_x = a * scale / width
+        scale_y = d * scale / height
+        source = image if color else None
+        return [
+            (barcode, offset_x, offset_y, source, scale_x, scale_y)
+            for barcode in barcodes
+        ]
+
+    def _decode_adaptive(
+        self,
+        page: pdfium.PdfPage,
+        formats: Any,
+        color: bool,
+        stats: Dict[str, Any],
+    ) -> Optional[List[Detection]]:
+        """Decode only the page regions a low-DPI preview marks as candidates.
+
+        Returns ``None`` when the page has to be decoded at full resolution
+        instead: rotated pages, pages without candidates, pages where the
+        candidates cover most of the page, and pages where the high-DPI
+        regions decode fewer barcodes than the preview already found.
+        """
+        if page.get_rotation() != 0:
+            stats["mode"] = "fallback"
+            return None
+
+        preview_scale = self.preview_dpi / 72
+        start = time.perf_counter()
+        preview = page.render(scale=preview_scale, grayscale=True).to_numpy()
+        stats["render_ms"] += (time.perf_counter() - start) * 1000
+        stats["render_pixels"] += preview.shape[0] * preview.shape[1]
+        stats["peak_pixels"] = preview.shape[0] * preview.shape[1]
+
+        start = time.perf_counter()
+        hits = zxingcpp.read_barcodes(preview, formats=formats, return_errors=True)
+        candidates: List[Tuple[float, float, float, float]] = []
+        for hit in hits:
+            corners = [
+                hit.position.top_left,
+                hit.position.top_right,
+                hit.position.bottom_right,
+                hit.position.bottom_left,
+            ]
+            xs = [corner.x for corner in corners]
+            ys = [corner.y for corner in corners]
+            candidates.append((min(xs), min(ys), max(xs), max(ys)))
+        candidates.extend(find_barcode_regions(preview))
+        stats["decode_ms"] += (time.perf_counter() - start) * 1000
+        expected = sum(1 for hit in hits if hit.valid)
+
+        if not candidates:
+            stats["mode"] = "fallback"
+            return None
+
+        # Convert preview pixels to padded, page-clipped PDF point boxes
+        page_width, page_height = page.get_size()
+        regions = merge_boxes(
+            [
+                (
+                    max(0.0, left / preview_scale - REGION_PADDING_PT),
+                    max(0.0, top / preview_scale - REGION_PADDING_PT),
+                    min(page_width, right / preview_scale + REGION_PADDING_PT),
+                    min(page_height, bottom / preview_scale + REGION_PADDING_PT),
+                )
+                for left, top, right, bottom in candidates
+            ]
+        )
+        region_area = sum((r - left) * (b - t) for left, t, r, b in regions)
+        if region_area > self.max_region_fraction * page_width * page_height:
+            stats["mode"] = "fallback"
+            return None
+
+        detections = self._decode_boxes(page, regions, formats, color, stats)
+        if len(detections) < expected:
+            stats["mode"] = "fallback"
+            return None
+
+        stats["mode"] = "adaptive"
+        return detections
+
+    def _decode_regions(
+        self,
+        page: pdfium.PdfPage,
+        boxes: List[Box],
+        formats: Any,
+        color: bool,
+        stats: Dict[str, Any],
+    ) -> Optional[List[Detection]]:
+        """Decode only the crop boxes a page was given.
+
+        Returns ``None`` for rotated pages, whose boxes cannot be mapped onto
+        the rendered bitmap without a full render, so they are scanned whole.
+        """
+        if page.get_rotation() != 0:
+            stats["mode"] = "fallback"
+            return None
+
+        # Flip PDF boxes to top-left page coordinates and clip them to the page
+        page_width, page_height = page.get_size()
+        regions = merge_boxes(
+            [
+                (
+                    max(0.0, x0),
+                    max(0.0, page_height - y1),
+                    min(page_width, x1),
+                    min(page_height, page_height - y0),
+                )
+                for x0, y0, x1, y1 in boxes
+            ]
+        )
+        regions = [box for box in regions if box[2] > box[0] and box[3] > box[1]]
+        stats["mode"] = "regions"
+        return self._decode_boxes(page, regions, formats, color, stats)
+
+    def _within_boxes(
+        self, page: pdfium.PdfPage, boxes: List[Box], detections: List[Detection]
+    ) -> List[Detection]:
+        """Keep detections whose center lies inside a crop box."""
+        scale = self.dpi / 72
+        page_height = page.get_size()[1]
+        kept = []
+        for detection in detections:
+            left, top, right, bottom = _page_box(detection)
+            x = (left + right) / 2 / scale
+            y = page_height - (top + bottom) / 2 / scale
+            if any(x0 <= x <= x1 and y0 <= y <= y1 for x0, y0, x1, y1 in boxes):
+                kept.append(detection)
+        return kept
+
+    def _needs_tiles(self, page: pdfium.PdfPage) -> bool:
+        """Tell whether a full render of a page would exceed the pixel budget."""
+        if not self.tile_max_px or page.get_rotation() != 0:
+            return False
+        page_width, page_height = page.get_size()
+        scale = self.dpi / 72
+        return bool(page_width * page_height * scale * scale > self.tile_max_px)
+
+    def _tiles(
+        self, region: Tuple[float, float, float, float]
+    ) -> List[Tuple[float, float, float, float]]:
+        """Split a region into tiles within the pixel budget, if it exceeds it."""
+        left, top, right, bottom = region
+        scale = self.dpi / 72
+        area = (right - left) * (bottom - top) * scale * scale
+        if not self.tile_max_px or area <= self.tile_max_px:
+            return [region]
+        # Snapping to the pixel grid can widen a tile by up to two pixels
+        side = (math.sqrt(self.tile_max_px) - 2) / scale
+        return split_box(region, side, self.tile_overlap_pt)
+
+    def _strips(
+        self, region: Tuple[float, float, float, float]
+    ) -> List[Tuple[float, float, float, float]]:
+        """Split a region into strips that keep its longer side whole.
+
+        Linear barcodes are read along their longer side, so strips cut them
+        only along their bars. Regions too long for strips of at least the
+        tile overlap are tiled as usual.
+        """
+        left, top, right, bottom = region
+        scale = self.dpi / 72
+        width, height = (right - left) * scale, (bottom - top) * scale
+        if not self.tile_max_px or width * height <= self.tile_max_px:
+            return [region]
+        length = max(width, height) + 2
+        across = (self.tile_max_px / length - 2) / scale
+        if across < self.tile_overlap_pt:
+            return self._tiles(region)
+        if width >= height:
+            return split_box(region, length / scale, self.tile_overlap_pt, across)
+        return split_box(region, across, self.tile_overlap_pt, length / scale)
+
+    def _decode_boxes(
+        self,
+        page: pdfium.PdfPage,
+        regions: List[Tuple[float, float, float, float]],
+        formats: Any,
+        color: bool,
+        stats: Dict[str, Any],
+        seam_pass: bool = False,
+    ) -> List[Detection]:
+        """Render and decode ``(left, top, right, bottom)`` page regions.
+
+        Regions are in PDF points from the top-left corner of an unrotated
+        page. Detections carry the pixel offset of their region in a full
+        render at ``dpi``, so positions match a full-page scan. Regions over
+        the pixel budget are tiled; at most ``tile_threads`` tiles wait for
+        decoding while the next one renders, which bounds memory.
+
+        A linear barcode longer than the tile overlap is cut by every seam it
+        crosses. Bar-like areas touching a seam are therefore collected from
+        each tile, merged across tiles and decoded again in a ``seam_pass``,
+        which splits them into strips that keep such barcodes whole.
+        """
+        page_width, page_height = page.get_size()
+        scale = self.dpi / 72
+        split = self._strips if seam_pass else self._tiles
+        tiles = [(tile, region) for region in regions for tile in split(region)]
+        tiled = len(tiles) > len(regions)
+        cut: List[Tuple[float, float, float, float]] = []
+        pool = None
+        if tiled and self.tile_threads > 1:
+            pool = get_decode_pool(self.tile_threads)
+        pending: Deque[Tuple["Future[Tuple[List[Any], float]]", int, int, Any]] = (
+            deque()
+        )
+        detections: List[Detection] = []
+
+        def collect() -> None:
+            future, offset_x, offset_y, source = pending.popleft()
+            barcodes, decode_ms = future.result()
+            stats["decode_ms"] += decode_ms
+            detections.extend(
+                (barcode, offset_x, offset_y, source, 1.0, 1.0) for barcode in barcodes
+            )
+
+        try:
+            for (left, top, right, bottom), region in tiles:
+                if self.cancel is not None:
+                    self.cancel.check()
+                # Snap the top-left corner to the full-page pixel grid so
+                # region coordinates match a full render exactly
+                offset_x = math.floor(left * scale)
+                offset_y = math.floor(top * scale)
+                # pdfium crops are measured inward from each page edge and
+                # rounded up to whole pixels, so stay just below the snapped
+                # pixel
+                crop = (
+                    max(0.0, (offset_x - 0.01) / scale),
+                    page_height - bottom,
+                    page_width - right,
+                    max(0.0, (offset_y - 0.01) / scale),
+                )
+                start = time.perf_counter()
+                image = self._render(page, scale, crop=crop, color=color)
+                stats["render_ms"] += (time.perf_counter() - start) * 1000
+                stats["render_pixels"] += _pixel_count(image)
+                stats["peak_pixels"] = max(stats["peak_pixels"], _pixel_count(image))
+                if tiled and not seam_pass:
+                    cut.extend(
+                        self._seam_candidates(
+                            image, (left, top, right, bottom), region, scale
                         )
-                        continue
-                    logger.debug(
-                        f"Keeping barcode - format {barcode_format} "
-                        "matches requested symbologies"
                     )
+                # Only snippets need the pixels once a tile is decoded
+                source = image if color else None
 
-                # Embed page image if requested
-                if embed_page:
-                    img_byte_arr = io.BytesIO()
-                    pil_image.save(img_byte_arr, format="PNG")
-                    result["page_image"] = base64.b64encode(
-                        img_byte_arr.getvalue()
-                    ).decode()
-
-                # Embed barcode snippet if requested
-                if embed_snippet:
-                    snippet = pil_image.crop((x, y, x + width, y + height))
-                    img_byte_arr = io.BytesIO()
-                    snippet.save(img_byte_arr, format="PNG")
-                    result["snippet"] = base64.b64encode(
-                        img_byte_arr.getvalue()
-                    ).decode()
+                if pool is None:
+                    barcodes, decode_ms = _decode(image, formats)
+                    stats["decode_ms"] += decode_ms
+                    detections.extend(
+                        (barcode, offset_x, offset_y, source, 1.0, 1.0)
+                        for barcode in barcodes
+                    )
+                    continue
+                pending.append(
+                    (pool.submit(_decode, image, formats), offset_x, offset_y, source)
+                )
+                if len(pending) >= self.tile_threads:
+                    collect()
+            while pending:
+                collect()
+        finally:
+            for future, _, _, _ in pending:
+                future.cancel()
 
-                results.append(result)
+        if tiled:
+            stats["tiles"] = len(tiles)
+            if cut:
+                cut = merge_boxes(cut)
+                stats["seam_regions"] = len(cut)
+                detections += self._decode_boxes(
+                    page, cut, formats, color, stats, seam_pass=True
+                )
+                # Strips are counted in seam_regions, not as page tiles
+                stats["tiles"] = len(tiles)
+            return _merge_seams(detections)
+        return detections
 
-        logger.debug(f"Scan complete. Found {len(results)} matching barcodes")
-        return results
+    def _seam_candidates(
+        self,
+        image: Any,
+        tile: Tuple[float, float, float, float],
+        region: Tuple[float, float, float, float],
+        scale: float,
+    ) -> List[Tuple[float, float, float, float]]:
+        """Return padded page boxes of bar-like areas a tile's seams cut.
+
+        Bars are located as in the adaptive preview, on the tile rendering
+        subsampled to about ``preview_dpi``. Areas reaching an edge of the
+        tile inside ``region`` may continue in the next tile.
+        """
+        gray = (
+            image if isinstance(image, np.ndarray) else np.asarray(image.convert("L"))
+        )
+        step = max(1, round(self.dpi / self.preview_dpi))
+        left, top, right, bottom = tile
+        offset_x = math.floor(left * scale)
+        offset_y = math.floor(top * scale)
+        edge = 2 * SEAM_BLOCK * step / scale
+        boxes = []
+        for x0, y0, x1, y1 in find_barcode_regions(
+            gray[::step, ::step], block=SEAM_BLOCK
+        ):
+            box = (
+                (offset_x + x0 * step) / scale,
+                (offset_y + y0 * step) / scale,
+                (offset_x + x1 * step) / scale,
+                (offset_y + y1 * step) / scale,
+            )
+            crosses = (
+                (left > region[0] and box[0] - left < edge)
+                or (right < region[2] and right - box[2] < edge)
+                or (top > region[1] and box[1] - top < edge)
+                or (bottom < region[3] and bottom - box[3] < edge)
+            )
+            if crosses:
+                boxes.append(
+                    (
+                        max(region[0], box[0] - REGION_PADDING_PT),
+                        max(region[1], box[1] - REGION_PADDING_PT),
+                        min(region[2], box[2] + REGION_PADDING_PT),
+                        min(region[3], box[3] + REGION_PADDING_PT),
+                    )
+                )
+        return boxes
@@ -0,0 +1,274 @@
+"""Bounded, priority- and owner-aware scheduling of asynchronous scan jobs."""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.exceptions import QueueFullError
+from app.metrics import (
+    ACTIVE_JOBS,
+    JOB_DURATION,
+    JOB_QUEUE_DEPTH,
+    JOB_QUEUE_REJECTED,
+    JOB_QUEUE_WAIT,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class QueuedJob:
+    """A job waiting for a scheduler worker."""
+
+    def __init__(
+        self,
+        job_id: str,
+        owner: str = "",
+        priority: int = 0,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Describe a job; higher ``priority`` values run first."""
+        self.job_id = job_id
+        self.owner = owner
+        self.priority = priority
+        self.params = params or {}
+        self.enqueued_at = time.monotonic()
+        # Times the job was claimed from the job store, this run included
+        self.attempts = 0
+
+
+async def _run_timed(
+    handler: Callable[[QueuedJob], Awaitable[None]], job: QueuedJob
+) -> float:
+    """Run ``handler`` on a job, recording it as active, and return its duration."""
+    start = time.monotonic()
+    ACTIVE_JOBS.inc()
+    try:
+        await handler(job)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        logger.exception("Job %s failed in the scheduler", job.job_id)
+    finally:
+        ACTIVE_JOBS.dec()
+    duration = time.monotonic() - start
+    JOB_DURATION.observe(duration)
+    return duration
+
+
+class JobScheduler:
+    """In-process job queue drained by a fixed pool of asyncio workers.
+
+    At most ``max_queued`` jobs wait at once; ``reserve`` refuses admission
+    beyond that with ``QueueFullError`` (HTTP 429). Workers always take a job
+    of the highest waiting priority. Within a priority, owners (API keys) are
+    served round-robin and each owner's jobs in submission order, so one
+    client flooding the queue cannot starve the others.
+    """
+
+    # Weight of the latest job in the running average of job durations
+    DURATION_SMOOTHING = 0.2
+
+    def __init__(self, handler: Callable[[QueuedJob], Awaitable[None]]) -> None:
+        """Create a stopped scheduler that runs ``handler`` for each job."""
+        self.handler = handler
+        self.workers = 0
+        self.max_queued = 0
+        self.avg_duration = 1.0
+        self._owners: "OrderedDict[str, List[Tuple[int, int, QueuedJob]]]" = (
+            OrderedDict()
+        )
+        self._seq = itertools.count()
+        self._queued = 0
+        self._reserved = 0
+        self._ready: Optional[asyncio.Semaphore] = None
+        self._tasks: List["asyncio.Task[None]"] = []
+
+    @property
+    def depth(self) -> int:
+        """Return the number of jobs waiting for a worker."""
+        return self._queued
+
+    def start(self, workers: int, max_queued: int) -> None:
+        """Start ``workers`` worker tasks on the running event loop."""
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self._ready = asyncio.Semaphore(self._queued)
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"zebrafetch-job-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        """Cancel the workers and forget queued jobs.
+
+        Jobs interrupted here stay ``pending`` or ``running`` in the job
+        store and are recovered on the next start.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._owners.clear()
+        self._queued = 0
+        self._reserved = 0
+        self._ready = None
+        JOB_QUEUE_DEPTH.set(0)
+
+    def reserve(self) -> None:
+        """Claim a queue slot for a job about to be submitted.
+
+        Raises ``QueueFullError`` when the queue is full. Every successful
+        call must be followed by ``submit`` or ``release``.
+        """
+        if self._queued + self._reserved >= self.max_queued:
+            JOB_QUEUE_REJECTED.inc()
+            raise QueueFullError(self.retry_after())
+        self._reserved += 1
+
+    def release(self) -> None:
+        """Give back a slot claimed by ``reserve`` without submitting a job."""
+        self._reserved = max(0, self._reserved - 1)
+
+    def submit(self, job: QueuedJob, reserved: bool = True) -> None:
+        """Queue a job, consuming the slot claimed by ``reserve``.
+
+        Pass ``reserved=False`` to queue without admission control, as done
+        for jobs recovered after a restart.
+        """
+        if reserved:
+            self.release()
+        job.enqueued_at = time.monotonic()
+        heap = self._owners.setdefault(job.owner, [])
+        heapq.heappush(heap, (-job.priority, next(self._seq), job))
+        self._queued += 1
+        JOB_QUEUE_DEPTH.set(self._queued)
+        if self._ready is not None:
+            self._ready.release()
+
+    def cancel(self, job_id: str) -> Optional[QueuedJob]:
+        """Remove a waiting job from the queue and return it, if it is there.
+
+        The worker woken for the job's slot finds nothing to run and goes
+        back to waiting.
+        """
+        for owner, heap in self._owners.items():
+            for index, (_, _, job) in enumerate(heap):
+                if job.job_id == job_id:
+                    break
+            else:
+                continue
+            heap[index] = heap[-1]
+            heap.pop()
+            heapq.heapify(heap)
+            if not heap:
+                del self._owners[owner]
+            self._queued -= 1
+            JOB_QUEUE_DEPTH.set(self._queued)
+            return job
+        return None
+
+    def retry_after(self) -> int:
+        """Estimate the seconds until a queue slot frees up."""
+        estimate = self.avg_duration * max(1, self._queued) / max(1, self.workers)
+        return max(1, min(60, math.ceil(estimate)))
+
+    def _pop(self) -> QueuedJob:
+        """Remove the next job: top priority, owners in round-robin order."""
+        best = min(heap[0][0] for heap in self._owners.values())
+        for owner, heap in self._owners.items():
+            if heap[0][0] == best:
+                break
+        _, _, job = heapq.heappop(heap)
+        # Send this owner to the back of the rotation
+        if heap:
+            self._owners.move_to_end(owner)
+        else:
+            del self._owners[owner]
+        self._queued -= 1
+        JOB_QUEUE_DEPTH.set(self._queued)
+        return job
+
+    async def _work(self) -> None:
+        """Run queued jobs one at a time until cancelled."""
+        assert self._ready is not None
+        while True:
+            await self._ready.acquire()
+            if not self._owners:
+                # The slot belonged to a cancelled job
+                continue
+            job = self._pop()
+            JOB_QUEUE_WAIT.observe(time.monotonic() - job.enqueued_at)
+            duration = await _run_timed(self.handler, job)
+            self.avg_duration += self.DURATION_SMOOTHING * (
+                duration - self.avg_duration
+            )
+
+
+class QueuePoller:
+    """Job workers that claim jobs from a queue shared between processes.
+
+    Each of ``workers`` tasks asks ``claim`` for a job and runs ``handler``
+    on it. Ordering and admission are up to the shared queue; when it is
+    empty a worker sleeps ``poll_sec``, or until ``notify`` reports a job
+    queued by this process.
+    """
+
+    def __init__(
+        self,
+        claim: Callable[[], Awaitable[Optional[QueuedJob]]],
+        handler: Callable[[QueuedJob], Awaitable[None]],
+    ) -> None:
+        """Create a stopped poller running ``handler`` for claimed jobs."""
+        self.claim = claim
+        self.handler = handler
+        self.poll_sec = 1.0
+        self._wake: Optional[asyncio.Event] = None
+        self._tasks: List["asyncio.Task[None]"] = []
+
+    def start(self, workers: int, poll_sec: float) -> None:
+        """Start ``workers`` worker tasks on the running event loop."""
+        self.poll_sec = poll_sec
+        self._wake = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"zebrafetch-job-poller-{i}")
+            for i in range(max(1, workers))
+        ]
+
+    async def stop(self) -> None:
+        """Cancel the workers; their handlers hand running jobs back."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._wake = None
+
+    def notify(self) -> None:
+        """Wake idle workers after a job was queued."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _work(self) -> None:
+        """Claim and run jobs one at a time until cancelled."""
+        assert self._wake is not None
+        wake = self._wake
+        while True:
+            wake.clear()
+            try:
+                job = await self.claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Claiming a job failed")
+                job = None
+            if job is not None:
+                await _run_timed(self.handler, job)
+                continue
+            try:
+                await asyncio.wait_for(wake.wait(), self.poll_sec)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,83 @@
+"""Registry of supported barcode symbologies and zxing-cpp format masks."""
+
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+import zxingcpp
+
+from app.exceptions import UnsupportedSymbologyError
+
+# Enum members that are format groups or placeholders, not symbologies
+_GROUPS = {"LinearCodes", "MatrixCodes"}
+_NON_FORMATS = _GROUPS | {"NONE"}
+
+
+def normalize_symbology(name: str) -> str:
+    """Reduce a symbology name to a lookup key.
+
+    Case, separators and a ``BarcodeFormat.`` prefix are ignored, so
+    ``"QR_CODE"``, ``"qrcode"`` and ``"BarcodeFormat.QRCode"`` (the ``type``
+    reported in scan results) all name the same symbology.
+    """
+    name = name.strip()
+    if name.startswith("BarcodeFormat."):
+        name = name[len("BarcodeFormat.") :]
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+# Canonical zxing-cpp names keyed by normalized name
+SYMBOLOGIES: Dict[str, str] = {
+    normalize_symbology(name): name
+    for name in zxingcpp.BarcodeFormat.__members__
+    if name not in _NON_FORMATS
+}
+
+# Format groups expanded to their canonical member names
+_GROUP_MEMBERS: Dict[str, List[str]] = {
+    normalize_symbology(group): sorted(
+        SYMBOLOGIES[normalize_symbology(member)]
+        for member in str(zxingcpp.barcode_formats_from_str(group)).split("|")
+        if normalize_symbology(member) in SYMBOLOGIES
+    )
+    for group in _GROUPS
+}
+
+
+def resolve_symbologies(names: Optional[Iterable[str]]) -> Optional[List[str]]:
+    """Validate symbology names and return their sorted canonical names.
+
+    ``None`` or an empty list means every symbology. ``LinearCodes`` and
+    ``MatrixCodes`` expand to their members. Raises
+    ``UnsupportedSymbologyError`` listing any names that are not known.
+    """
+    if not names:
+        return None
+    resolved = set()
+    unknown = []
+    for name in names:
+        key = normalize_symbology(name)
+        if key in SYMBOLOGIES:
+            resolved.add(SYMBOLOGIES[key])
+        elif key in _GROUP_MEMBERS:
+            resolved.update(_GROUP_MEMBERS[key])
+        elif key:
+            unknown.append(name)
+    if unknown:
+        raise UnsupportedSymbologyError(unknown, sorted(SYMBOLOGIES.values()))
+    return sorted(resolved) or None
+
+
+def format_mask(symbologies: Optional[List[str]]) -> Any:
+    """Build the zxing-cpp ``BarcodeFormats`` mask for canonical names.
+
+    An empty mask, which zxing-cpp treats as every format, is returned when
+    no symbologies are given.
+    """
+    if not symbologies:
+        return zxingcpp.BarcodeFormats(zxingcpp.BarcodeFormat.NONE)
+    return zxingcpp.barcode_formats_from_str(",".join(symbologies))
+
+
+def symbology_name(barcode_type: str) -> Optional[str]:
+    """Return the canonical name for a result ``type`` such as ``str(format)``."""
+    return SYMBOLOGIES.get(normalize_symbology(barcode_type))
@@ -0,0 +1,347 @@
+"""Barcode detection from vector page content, without rendering.
+
+Label printers and ERP systems draw 1D barcodes as filled rectangles. The
+bars are read from pdfium's page objects, grouped into runs of parallel,
+closely spaced bars, and each run is redrawn as a small, module-exact
+bitmap for zxing-cpp to decode.
+"""
+
+import ctypes
+import re
+from typing import Any, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pypdfium2 as pdfium
+import pypdfium2.raw as pdfium_c
+import zxingcpp
+
+# (left, bottom, right, top) in PDF points from the page's lower-left corner
+Rect = Tuple[float, float, float, float]
+
+# Bars of one symbol, ordered along it, and whether the symbol is vertical
+# (horizontal bars, read from top to bottom)
+BarRun = Tuple[List[Rect], bool]
+
+# Where a bar bitmap sits on the page: the PDF point of its top-left pixel
+# corner and the points per pixel across and down
+Placement = Tuple[float, float, float, float]
+
+# Linear symbologies whose bars can be read from the page geometry
+VECTOR_SYMBOLOGIES = ["Code128", "Code39", "EAN13", "EAN8", "UPCA", "UPCE"]
+
+# Symbologies without a mandatory check digit; a decode is only trusted when
+# the human-readable text printed with the bars agrees
+UNCHECKED_SYMBOLOGIES = {"Code39"}
+
+# The shortest symbols (one Code128 character) have 13 bars
+MIN_BARS = 12
+# Widest space inside a symbol in narrow modules (Code128 and EAN use 4)
+MAX_SPACE_MODULES = 4.5
+PX_PER_MODULE = 3
+QUIET_MODULES = 12
+BITMAP_ROWS = 8
+MAX_BITMAP_PX = 20_000
+# Loose squares up to this size may be the modules of a vector 2D code
+MAX_MODULE_PT = 12.0
+MAX_LOOSE_MODULES = 16
+# Barcode fonts turn text into bars, which only a render can show
+BARCODE_FONT = re.compile(r"barcode|code.?128|3.?of.?9|code.?39|ean|upc", re.I)
+
+
+def collect_rects(page: pdfium.PdfPage) -> Optional[List[Rect]]:
+    """Return the dark, filled, axis-aligned rectangles drawn on a page.
+
+    Stroked straight lines count as rectangles of their line width. Returns
+    ``None`` when the page has content that could carry a barcode the
+    geometry does not show: images, shadings, barcode fonts, and filled
+    shapes other than axis-aligned rectangles.
+    """
+    rects: List[Rect] = []
+    for page_object, matrix in _walk(page, page.get_objects(max_depth=0), None):
+        kind = page_object.type
+        if kind in (pdfium_c.FPDF_PAGEOBJ_IMAGE, pdfium_c.FPDF_PAGEOBJ_SHADING):
+            return None
+        if kind == pdfium_c.FPDF_PAGEOBJ_TEXT and _is_barcode_font(page_object):
+            return None
+        if kind != pdfium_c.FPDF_PAGEOBJ_PATH:
+            continue
+        path_rects = _path_rects(page_object, matrix)
+        if path_rects is None:
+            return None
+        rects.extend(path_rects)
+    return rects
+
+
+def _walk(
+    page: pdfium.PdfPage, objects: Iterator[Any], parent: Optional[pdfium.PdfMatrix]
+) -> Iterator[Tuple[Any, pdfium.PdfMatrix]]:
+    """Yield page objects with their matrix to page space, entering forms."""
+    for page_object in objects:
+        matrix = page_object.get_matrix()
+        if parent is not None:
+            matrix = matrix.multiply(parent)
+        if page_object.type == pdfium_c.FPDF_PAGEOBJ_FORM:
+            kids = page.get_objects(max_depth=0, form=page_object)
+            yield from _walk(page, kids, matrix)
+        else:
+            yield page_object, matrix
+
+
+def _is_barcode_font(text_object: Any) -> bool:
+    """Tell whether a text object is set in a barcode font."""
+    font = pdfium_c.FPDFTextObj_GetFont(text_object.raw)
+    if not font:
+        return False
+    length = pdfium_c.FPDFFont_GetBaseFontName(font, None, 0)
+    buffer = ctypes.create_string_buffer(length)
+    pdfium_c.FPDFFont_GetBaseFontName(font, buffer, length)
+    return bool(BARCODE_FONT.search(buffer.value.decode("latin-1")))
+
+
+def _is_dark(raw: Any, getter: Any) -> bool:
+    """Tell whether an object's fill or stroke color is dark and opaque."""
+    r, g, b, a = (ctypes.c_uint() for _ in range(4))
+    if not getter(raw, r, g, b, a):
+        return False
+    return a.value >= 128 and 0.299 * r.value + 0.587 * g.value + 0.114 * b.value < 128
+
+
+def _path_rects(path: Any, matrix: pdfium.PdfMatrix) -> Optional[List[Rect]]:
+    """Return the rectangles a path paints, or ``None`` for other fills.
+
+    Any dark filled subpath that is not an axis-aligned rectangle, such as a
+    polygon, a curve or a tilted bar, makes the page need a render.
+    """
+    raw = path.raw
+    fill_mode = ctypes.c_int()
+    stroke = ctypes.c_int()
+    pdfium_c.FPDFPath_GetDrawMode(raw, fill_mode, stroke)
+    filled = fill_mode.value != 0 and _is_dark(raw, pdfium_c.FPDFPageObj_GetFillColor)
+    stroked = stroke.value and _is_dark(raw, pdfium_c.FPDFPageObj_GetStrokeColor)
+    if not filled and not stroked:
+        return []
+
+    rects: List[Rect] = []
+    for points, curved in _subpaths(raw):
+        if curved:
+            # Filled curves may be the modules of a 2D code
+            if filled:
+                return None
+            continue
+        points = [matrix.on_point(x, y) for x, y in points]
+        if filled and len(points) >= 3:
+            rect = _as_rect(points)
+            if rect is None:
+                return None
+            rects.append(rect)
+        elif stroked and len(points) == 2:
+            (x0, y0), (x1, y1) = points
+            width = ctypes.c_float()
+            pdfium_c.FPDFPageObj_GetStrokeWidth(raw, width)
+            # Matrix scaling is applied to the line width as well
+            half = width.value * abs(matrix.get()[0] or matrix.get()[1]) / 2
+            if abs(x0 - x1) < 1e-3:
+                rects.append((x0 - half, min(y0, y1), x0 + half, max(y0, y1)))
+            elif abs(y0 - y1) < 1e-3:
+                rects.append((min(x0, x1), y0 - half, max(x0, x1), y0 + half))
+    return rects
+
+
+def _subpaths(raw: Any) -> Iterator[Tuple[List[Tuple[float, float]], bool]]:
+    """Yield the points of each subpath and whether it has curves."""
+    points: List[Tuple[float, float]] = []
+    curved = False
+    x, y = ctypes.c_float(), ctypes.c_float()
+    for i in range(pdfium_c.FPDFPath_CountSegments(raw)):
+        segment = pdfium_c.FPDFPath_GetPathSegment(raw, i)
+        kind = pdfium_c.FPDFPathSegment_GetType(segment)
+        if kind == pdfium_c.FPDF_SEGMENT_MOVETO and points:
+            yield points, curved
+            points, curved = [], False
+        pdfium_c.FPDFPathSegment_GetPoint(segment, x, y)
+        points.append((x.value, y.value))
+        curved = curved or kind == pdfium_c.FPDF_SEGMENT_BEZIERTO
+    if points:
+        yield points, curved
+
+
+def _as_rect(points: List[Tuple[float, float]]) -> Optional[Rect]:
+    """Return the rectangle four or five corner points outline, if any."""
+    if len(points) == 5:
+        if abs(points[0][0] - points[4][0]) > 1e-3:
+            return None
+        if abs(points[0][1] - points[4][1]) > 1e-3:
+            return None
+        points = points[:4]
+    if len(points) != 4:
+        return None
+    xs = sorted(x for x, _ in points)
+    ys = sorted(y for _, y in points)
+    # An axis-aligned rectangle has two distinct x and two distinct y values
+    if xs[1] - xs[0] > 1e-3 or xs[3] - xs[2] > 1e-3:
+        return None
+    if ys[1] - ys[0] > 1e-3 or ys[3] - ys[2] > 1e-3:
+        return None
+    if xs[2] - xs[1] < 1e-3 or ys[2] - ys[1] < 1e-3:
+        return None
+    return xs[0], ys[0], xs[3], ys[3]
+
+
+def _along(rect: Rect, vertical: bool) -> Tuple[float, float, float, float]:
+    """Return ``(start, end, low, high)`` of a bar along and across its run."""
+    left, bottom, right, top = rect
+    if vertical:
+        return -top, -bottom, left, right
+    return left, right, bottom, top
+
+
+def find_bar_runs(rects: List[Rect]) -> Tuple[List[BarRun], List[Rect]]:
+    """Group bars into runs that may be 1D symbols.
+
+    Tall rectangles form horizontal symbols and wide ones vertical symbols.
+    A bar joins a run when it overlaps the run's last bar across the run
+    and the space between them is at most ``MAX_SPACE_MODULES`` of the
+    narrowest bar; touching rectangles are merged into one bar. Returns the
+    runs of at least ``MIN_BARS`` bars and the rectangles left over.
+    """
+    runs: List[BarRun] = []
+    loose: List[Rect] = []
+    for vertical in (False, True):
+        bars = []
+        for rect in rects:
+            start, end, low, high = _along(rect, vertical)
+            if high - low >= 2 * (end - start):
+                bars.append(rect)
+            elif not vertical and end - start < 2 * (high - low):
+                loose.append(rect)
+        bars.sort(key=lambda rect: _along(rect, vertical)[0])
+
+        # Each open run is its bars and the width of its narrowest bar
+        open_runs: List[Tuple[List[Rect], float]] = []
+        for rect in bars:
+            start, end, low, high = _along(rect, vertical)
+            for i, (run, narrow) in enumerate(open_runs):
+                _, last_end, last_low, last_high = _along(run[-1], vertical)
+                overlap = min(high, last_high) - max(low, last_low)
+                if overlap < 0.5 * min(high - low, last_high - last_low):
+                    continue
+                gap = start - last_end
+                if gap < -1e-3 or gap > MAX_SPACE_MODULES * narrow:
+                    continue
+                if gap <= 0.05 * (end - start):
+                    # Bars drawn module by module touch; join them into one
+                    last = run[-1]
+                    run[-1] = (
+                        min(last[0], rect[0]),
+                        min(last[1], rect[1]),
+                        max(last[2], rect[2]),
+                        max(last[3], rect[3]),
+                    )
+                    joined = _along(run[-1], vertical)
+                    open_runs[i] = (run, min(narrow, joined[1] - joined[0]))
+                else:
+                    run.append(rect)
+                    open_runs[i] = (run, min(narrow, end - start))
+                break
+            else:
+                open_runs.append(([rect], end - start))
+        for run, _ in open_runs:
+            if len(run) >= MIN_BARS:
+                runs.append((run, vertical))
+            elif not vertical:
+                loose.extend(run)
+    return runs, loose
+
+
+def has_loose_modules(loose: List[Rect]) -> bool:
+    """Tell whether left-over squares may be the modules of a 2D code."""
+    modules = [
+        rect
+        for rect in loose
+        if max(rect[2] - rect[0], rect[3] - rect[1]) <= MAX_MODULE_PT
+    ]
+    return len(modules) >= MAX_LOOSE_MODULES
+
+
+def bar_bitmap(run: BarRun) -> Optional[Tuple[np.ndarray, Placement]]:
+    """Redraw a run as a bitmap with square modules and quiet zones.
+
+    The narrowest bar or space becomes ``PX_PER_MODULE`` pixels wide.
+    Returns ``None`` for runs too long to draw at that resolution.
+    """
+    bars, vertical = run
+    spans = [_along(bar, vertical) for bar in bars]
+    widths = [end - start for start, end, _, _ in spans]
+    spaces = [spans[i + 1][0] - spans[i][1] for i in range(len(spans) - 1)]
+    narrow = min(widths + [space for space in spaces if space > 0])
+    px_per_pt = PX_PER_MODULE / narrow
+    quiet = QUIET_MODULES * PX_PER_MODULE
+    origin = spans[0][0]
+    length = round((spans[-1][1] - origin) * px_per_pt) + 2 * quiet
+    if length > MAX_BITMAP_PX:
+        return None
+
+    row = np.full(length, 255, dtype=np.uint8)
+    for start, end, _, _ in spans:
+        first = quiet + round((start - origin) * px_per_pt)
+        row[first : quiet + round((end - origin) * px_per_pt)] = 0
+    image = np.tile(row, (BITMAP_ROWS, 1))
+
+    low = min(low for _, _, low, _ in spans)
+    high = max(high for _, _, _, high in spans)
+    pt_per_px = 1 / px_per_pt
+    # zxing-cpp reports the first and last row it read, which map to the
+    # ends of the bars
+    across = (high - low) / (BITMAP_ROWS - 1)
+    if vertical:
+        image = np.ascontiguousarray(image.T)
+        # Rows run down the page from the top of the first bar
+        return image, (low, -origin + quiet * pt_per_px, across, pt_per_px)
+    return image, (origin - quiet * pt_per_px, high, pt_per_px, across)
+
+
+def decode_bar_run(
+    run: BarRun, formats: Any
+) -> Tuple[List[Any], Optional[np.ndarray], Placement]:
+    """Decode a run's bitmap, returning the barcodes, bitmap and placement."""
+    drawn = bar_bitmap(run)
+    if drawn is None:
+        return [], None, (0.0, 0.0, 0.0, 0.0)
+    image, placement = drawn
+    barcodes = zxingcpp.read_barcodes(
+        image,
+        formats=formats,
+        try_rotate=run[1],
+        try_downscale=False,
+        binarizer=zxingcpp.Binarizer.BoolCast,
+    )
+    return barcodes, image, placement
+
+
+def text_near(textpage: pdfium.PdfTextPage, run: BarRun) -> str:
+    """Return the text printed next to a run's bars, where the digits go."""
+    bars, vertical = run
+    left = min(bar[0] for bar in bars)
+    bottom = min(bar[1] for bar in bars)
+    right = max(bar[2] for bar in bars)
+    top = max(bar[3] for bar in bars)
+    if vertical:
+        margin = (right - left) * 0.6
+        boxes = [
+            (left - margin, bottom, left, top),
+            (right, bottom, right + margin, top),
+        ]
+    else:
+        margin = (top - bottom) * 0.6
+        boxes = [
+            (left, bottom - margin, right, bottom),
+            (left, top, right, top + margin),
+        ]
+    return " ".join(textpage.get_text_bounded(*box) for box in boxes)
+
+
+def hint_matches(value: str, hint: str) -> bool:
+    """Tell whether the human-readable text near a symbol shows its value."""
+    value_key = re.sub(r"[^0-9A-Za-z]", "", value).upper()
+    hint_key = re.sub(r"[^0-9A-Za-z]", "", hint).upper()
+    return bool(value_key) and value_key in hint_key
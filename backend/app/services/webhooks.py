@@ -0,0 +1,239 @@
+"""Delivery of job completion webhooks from the persisted outbox."""
+
+import asyncio
+import ipaddress
+import logging
+import math
+import random
+import socket
+import time
+from typing import Any, Dict, List, Optional, Sequence
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.db import claim_due_callbacks, get_next_callback_due, update_callback
+from app.metrics import WEBHOOK_DELIVERIES
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying besides 5xx: timeouts and rate limiting
+RETRYABLE_STATUSES = (408, 425, 429)
+
+
+def is_valid_callback_url(url: str) -> bool:
+    """Tell whether ``url`` is an absolute http(s) URL."""
+    parts = urlsplit(url)
+    return parts.scheme in ("http", "https") and bool(parts.hostname)
+
+
+def is_public_address(address: str) -> bool:
+    """Tell whether an IP address is publicly routable and not multicast.
+
+    Loopback, link-local, private, shared, reserved and unspecified
+    addresses are not, and neither are IPv4 addresses mapped into IPv6.
+    """
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+async def resolve_callback_url(url: str, allowed_hosts: Sequence[str]) -> List[str]:
+    """Resolve the host of a webhook URL to the addresses it may be sent to.
+
+    Hosts in ``allowed_hosts`` are trusted wherever they resolve and give an
+    empty list. Any other host must resolve only to public addresses, so
+    clients cannot make the server POST to itself or to internal services.
+    Raises ``ValueError`` for a rejected URL and ``OSError`` if resolving
+    the host failed.
+    """
+    host = urlsplit(url).hostname
+    if not is_valid_callback_url(url) or host is None:
+        raise ValueError("callback_url must be an absolute http or https URL")
+    if host in allowed_hosts:
+        return []
+    infos = await asyncio.get_running_loop().getaddrinfo(
+        host, None, type=socket.SOCK_STREAM
+    )
+    addresses = list(dict.fromkeys(str(info[4][0]) for info in infos))
+    if not addresses or not all(is_public_address(a) for a in addresses):
+        raise ValueError("callback_url must not point to a non-public address")
+    return addresses
+
+
+class WebhookDispatcher:
+    """Background task that POSTs outbox entries to their callback URLs.
+
+    Due deliveries are claimed from the ``webhook_outbox`` table in batches
+    of ``batch_size`` and sent through one pooled ``httpx.AsyncClient``,
+    with at most ``concurrency`` requests in flight. A 2xx response marks a
+    delivery done. Network errors, 5xx, 408, 425 and 429 are retried with
+    exponential backoff (``backoff_sec`` doubled per attempt, capped at
+    ``backoff_max_sec``, with jitter) until ``max_attempts`` is reached.
+    Other statuses fail the delivery at once. Every delivery resolves its
+    host again and connects to the checked address, so a callback host
+    cannot be re-pointed at internal addresses after the job was created;
+    ``allowed_hosts`` are exempt from the check. Because the outbox lives in
+    SQLite, deliveries pending at shutdown resume after a restart, and
+    dispatchers of several processes sharing it claim different deliveries.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 8,
+        timeout_sec: float = 10.0,
+        max_attempts: int = 8,
+        backoff_sec: float = 2.0,
+        backoff_max_sec: float = 600.0,
+        batch_size: int = 100,
+        poll_interval_sec: float = 30.0,
+        allowed_hosts: Sequence[str] = (),
+    ) -> None:
+        """Create a stopped dispatcher."""
+        self.concurrency = concurrency
+        self.timeout_sec = timeout_sec
+        self.max_attempts = max_attempts
+        self.backoff_sec = backoff_sec
+        self.backoff_max_sec = backoff_max_sec
+        self.batch_size = batch_size
+        self.poll_interval_sec = poll_interval_sec
+        self.allowed_hosts = list(allowed_hosts)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def start(self) -> None:
+        """Open the HTTP client and start delivering on the running loop."""
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout_sec,
+            limits=httpx.Limits(
+                max_connections=self.concurrency,
+                max_keepalive_connections=self.concurrency,
+            ),
+            headers={"User-Agent": "ZebraFetch-Webhooks"},
+        )
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="zebrafetch-webhooks")
+
+    async def stop(self) -> None:
+        """Stop delivering; unfinished deliveries stay in the outbox."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._wake = None
+
+    def notify(self) -> None:
+        """Wake the dispatcher after new deliveries were queued."""
+        if self._wake is not None:
+            self._wake.set()
+
+    @property
+    def claim_sec(self) -> float:
+        """Return how long a claimed batch may take before others retry it."""
+        rounds = math.ceil(self.batch_size / max(1, self.concurrency))
+        return self.timeout_sec * (rounds + 1)
+
+    def backoff(self, attempts: int) -> float:
+        """Return the delay before retry number ``attempts``, with jitter."""
+        delay = min(self.backoff_max_sec, self.backoff_sec * 2 ** (attempts - 1))
+        return float(delay * random.uniform(0.5, 1.0))
+
+    async def _run(self) -> None:
+        """Deliver due batches, sleeping until the next is due or a wake-up."""
+        assert self._wake is not None
+        while True:
+            self._wake.clear()
+            try:
+                due = await claim_due_callbacks(
+                    time.time(), self.batch_size, self.claim_sec
+                )
+                if due:
+                    await self._deliver_batch(due)
+                    continue
+                next_due = await get_next_callback_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Webhook dispatch failed")
+                next_due = None
+            delay = self.poll_interval_sec
+            if next_due is not None:
+                delay = max(0.0, min(delay, next_due - time.time()))
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _deliver_batch(self, due: List[Dict[str, Any]]) -> None:
+        """Send one batch of deliveries, ``concurrency`` at a time."""
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def deliver(row: Dict[str, Any]) -> None:
+            async with slots:
+                await self._deliver(row)
+
+        await asyncio.gather(*(deliver(row) for row in due))
+
+    async def _deliver(self, row: Dict[str, Any]) -> None:
+        """Attempt one delivery and record its outcome in the outbox."""
+        assert self._client is not None
+        attempts = row["attempts"] + 1
+        error: Optional[str] = None
+        retry = True
+        headers = {
+            "Content-Type": "application/json",
+            "X-ZebraFetch-Delivery": str(row["id"]),
+            "X-ZebraFetch-Job": row["job_id"],
+        }
+        try:
+            url = httpx.URL(row["url"])
+            extensions: Dict[str, Any] = {}
+            addresses = await resolve_callback_url(row["url"], self.allowed_hosts)
+            if addresses:
+                # Connect to the checked address, not whatever the host
+                # resolves to by the time the connection is made
+                headers["Host"] = url.netloc.decode("ascii")
+                extensions["sni_hostname"] = url.host
+                url = url.copy_with(host=addresses[0])
+            response = await self._client.post(
+                url, content=row["payload_json"], headers=headers, extensions=extensions
+            )
+            if response.is_success:
+                WEBHOOK_DELIVERIES.labels(outcome="delivered").inc()
+                await update_callback(row["id"], "delivered", attempts)
+                return
+            error = f"HTTP {response.status_code}"
+            retry = (
+                response.status_code >= 500
+                or response.status_code in RETRYABLE_STATUSES
+            )
+        except ValueError as e:
+            error = str(e)
+            retry = False
+        except (httpx.HTTPError, OSError) as e:
+            error = f"{type(e).__name__}: {e}"
+
+        if retry and attempts < self.max_attempts:
+            WEBHOOK_DELIVERIES.labels(outcome="retried").inc()
+            await update_callback(
+                row["id"],
+                "pending",
+                attempts,
+                time.time() + self.backoff(attempts),
+                error,
+            )
+            return
+        WEBHOOK_DELIVERIES.labels(outcome="failed").inc()
+        logger.warning(
+            "Webhook for job %s to %s failed after %d attempts: %s",
+            row["job_id"],
+            row["url"],
+            attempts,
+            error,
+        )
+        await update_callback(row["id"], "failed", attempts, error=error)
@@ -0,0 +1,66 @@
+"""Standalone job worker for deployments with a shared job queue.
+
+With ``ZF_JOB_QUEUE=shared``, API replicas only queue jobs in the job store
+(``ZF_RUN_JOB_WORKERS=false``) or scan some themselves, and any number of
+these workers claim and scan the rest, so scan capacity scales apart from
+the API. Each runs ``job_concurrency`` jobs at once and delivers webhooks
+from the shared outbox. Inputs and artifacts are read and written through
+``upload_dir`` and ``artifact_dir``, which must be shared with the API.
+Run from ``backend/``::
+
+    python -m app.worker
+"""
+
+import asyncio
+import logging
+import signal
+
+from app.config import Settings, get_settings
+from app.db import close_db, init_db
+from app.routes import jobs
+from app.services.parallel import prewarm_process_pool, shutdown_process_pool
+from app.services.scanner import warm_up
+
+logger = logging.getLogger(__name__)
+
+
+async def run(settings: Settings) -> None:
+    """Claim and scan jobs until SIGINT or SIGTERM, then hand back running ones."""
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    await init_db()
+    await loop.run_in_executor(None, warm_up)
+    if settings.prewarm_workers and settings.worker_pool_size > 1:
+        await loop.run_in_executor(
+            None, prewarm_process_pool, settings.worker_pool_size
+        )
+    jobs.start_webhooks(settings)
+    jobs.poller.start(settings.job_concurrency, settings.job_poll_sec)
+    logger.info("Job worker %s started", jobs.WORKER_ID)
+    try:
+        await stop.wait()
+    finally:
+        await jobs.stop_scheduler()
+        await jobs.webhooks.stop()
+        shutdown_process_pool()
+        close_db()
+    logger.info("Job worker %s stopped", jobs.WORKER_ID)
+
+
+def main() -> None:
+    """Run a job worker configured from the environment."""
+    settings = get_settings()
+    logging.basicConfig(
+        level=settings.log_level,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    if settings.job_queue != "shared":
+        raise SystemExit("Job workers need a shared job queue (ZF_JOB_QUEUE=shared)")
+    asyncio.run(run(settings))
+
+
+if __name__ == "__main__":
+    main()
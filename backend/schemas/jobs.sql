@@ -6,8 +6,48 @@ CREATE TABLE IF NOT EXISTS jobs (
     expires_at DATETIME NOT NULL,
     input_path TEXT NOT NULL,
     result_json TEXT,
-    artifact_paths TEXT
+    artifact_paths TEXT,
+    params_json TEXT,
+    priority INTEGER NOT NULL DEFAULT 0,
+    owner TEXT NOT NULL DEFAULT '',
+    lease_owner TEXT,
+    lease_expires_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    progress_json TEXT
 );
 
 CREATE INDEX IF NOT EXISTS idx_jobs_expires_at ON jobs(expires_at);
-CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status); 
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status); 
+CREATE TABLE IF NOT EXISTS scan_cache (
+    key TEXT PRIMARY KEY,
+    result_json TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_scan_cache_last_access ON scan_cache(last_access);
+
+CREATE TABLE IF NOT EXISTS webhook_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    url TEXT NOT NULL,
+    payload_json TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_webhook_outbox_due ON webhook_outbox(status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_webhook_outbox_job_id ON webhook_outbox(job_id);
+
+CREATE TABLE IF NOT EXISTS scan_templates (
+    name TEXT PRIMARY KEY,
+    regions_json TEXT NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
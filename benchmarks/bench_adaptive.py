@@ -0,0 +1,58 @@
+"""Compare fixed-DPI and two-pass adaptive DPI rendering.
+
+Uses the scanner's per-page timing counters to report where the time goes.
+Run from the repository root::
+
+    python -m benchmarks.bench_adaptive --pages 20 --label-every 2
+"""
+
+import argparse
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+from benchmarks.corpus import make_pdf
+from app.services.scanner import Scanner
+
+
+def _summarize(name: str, stats: List[Dict[str, Any]], elapsed: float) -> None:
+    """Print totals of the per-page timing counters."""
+    pages = len(stats)
+    render = sum(s["render_ms"] for s in stats)
+    decode = sum(s["decode_ms"] for s in stats)
+    pixels = sum(s["render_pixels"] for s in stats)
+    modes = dict(Counter(s["mode"] for s in stats))
+    print(
+        f"{name:>9}: {pages / elapsed:6.1f} pages/s  "
+        f"render {render / pages:7.1f} ms/page  "
+        f"decode {decode / pages:7.1f} ms/page  "
+        f"{pixels / pages / 1e6:5.2f} MPx/page  {modes}"
+    )
+
+
+def main() -> None:
+    """Run the benchmark on text pages with a corner label."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--label-every", type=int, default=1)
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--preview-dpi", type=int, default=72)
+    args = parser.parse_args()
+
+    pdf_bytes = make_pdf(args.pages, text=True, label_every=args.label_every)
+    baseline: List[Dict[str, Any]] = []
+    for name, adaptive in (("fixed", False), ("adaptive", True)):
+        scanner = Scanner(dpi=args.dpi, adaptive=adaptive, preview_dpi=args.preview_dpi)
+        start = time.perf_counter()
+        results = scanner.scan_pdf(pdf_bytes)
+        elapsed = time.perf_counter() - start
+        _summarize(name, scanner.page_stats, elapsed)
+        values = [r["value"] for r in results]
+        if not baseline:
+            baseline = results
+        elif values != [r["value"] for r in baseline]:
+            print(f"  recall mismatch: {len(values)} vs {len(baseline)} barcodes")
+
+
+if __name__ == "__main__":
+    main()
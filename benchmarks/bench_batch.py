@@ -0,0 +1,102 @@
+"""Compare one request per PDF with batch requests for many small labels.
+
+Sends ``--files`` one- or two-page label PDFs to ``POST /v1/scan`` one at a
+time, then as a single multipart ``POST /v1/scan/batch`` and as one zip
+archive, through the in-process test client. The result cache is disabled
+so every file is actually scanned. Run from the repository root::
+
+    python -m benchmarks.bench_batch --files 200 --workers 4
+"""
+
+import argparse
+import io
+import os
+import tempfile
+import time
+import zipfile
+from typing import Any, Callable, List, Tuple
+
+from benchmarks.corpus import make_pdf
+
+
+def _time(run: Callable[[], Any], repeat: int) -> float:
+    """Return the best wall-clock time over ``repeat`` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    """Run the benchmark and print files/sec for each request style."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ.update(
+        {
+            "ZF_SQLITE_URL": f"sqlite:///{tmp.name}/jobs.db",
+            "ZF_ARTIFACT_DIR": f"{tmp.name}/artifacts",
+            "ZF_WORKER_POOL_SIZE": str(args.workers),
+            "ZF_SCAN_DPI": str(args.dpi),
+            "ZF_RESULT_CACHE_ENABLED": "false",
+            "ZF_PAGE_CACHE_ENABLED": "false",
+        }
+    )
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    # Typical ingest traffic: mostly single labels, some two-page documents
+    labels = [make_pdf(2 if i % 4 == 0 else 1) for i in range(args.files)]
+    names = [f"label-{i:05d}.pdf" for i in range(args.files)]
+    parts: List[Tuple[str, Tuple[str, bytes, str]]] = [
+        ("files", (name, pdf, "application/pdf")) for name, pdf in zip(names, labels)
+    ]
+    zipped = io.BytesIO()
+    with zipfile.ZipFile(zipped, "w") as archive:
+        for name, pdf in zip(names, labels):
+            archive.writestr(name, pdf)
+
+    with TestClient(app) as client:
+
+        def single() -> None:
+            for name, pdf in zip(names, labels):
+                response = client.post(
+                    "/v1/scan", files={"file": (name, pdf, "application/pdf")}
+                )
+                assert response.status_code == 200
+
+        def batch() -> None:
+            response = client.post("/v1/scan/batch", files=parts)
+            assert len(response.json()["files"]) == args.files
+
+        def archive() -> None:
+            response = client.post(
+                "/v1/scan/batch",
+                files={"files": ("labels.zip", zipped.getvalue(), "application/zip")},
+            )
+            assert len(response.json()["files"]) == args.files
+
+        # Warm up the process pool so worker spawn is not billed to a style
+        batch()
+        print(f"{'style':>10} {'files/s':>9} {'speedup':>8}")
+        t_single = _time(single, args.repeat)
+        print(f"{'single':>10} {args.files / t_single:>9.1f} {1:>7.2f}x")
+        for style, run in (("multipart", batch), ("zip", archive)):
+            elapsed = _time(run, args.repeat)
+            print(
+                f"{style:>10} {args.files / elapsed:>9.1f} "
+                f"{t_single / elapsed:>7.2f}x"
+            )
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Measure job-status read and write throughput under concurrent polling.
+
+Compares the pooled WAL job store in ``app.db`` with the previous approach
+of opening a fresh ``sqlite3`` connection per call on the default executor.
+``--clients`` coroutines poll random jobs for ``--seconds`` and update one
+with probability ``--write-ratio``. Run from the repository root::
+
+    python -m benchmarks.bench_jobstore --clients 64 --seconds 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import benchmarks.corpus  # noqa: F401  (puts the backend on sys.path)
+from app import db
+from app.config import get_settings
+
+RESULT = {"results": [{"page": 1, "type": "QRCode", "value": "x" * 32}] * 4}
+
+
+def _legacy_connect(db_path: str) -> sqlite3.Connection:
+    """Open a connection the way the store did before pooling."""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _legacy_get(db_path: str, job_id: str) -> Optional[Dict[str, Any]]:
+    """Read a job through a fresh connection."""
+    conn = _legacy_connect(db_path)
+    try:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if not row:
+            return None
+        job = dict(row)
+        if job.get("result_json"):
+            job["result_json"] = json.loads(job["result_json"])
+        return job
+    finally:
+        conn.close()
+
+
+def _legacy_update(db_path: str, job_id: str, status: str) -> None:
+    """Update a job through a fresh connection."""
+    conn = _legacy_connect(db_path)
+    try:
+        conn.execute(
+            "UPDATE jobs SET status = ?, updated_at = CURRENT_TIMESTAMP, "
+            "result_json = ? WHERE id = ?",
+            (status, json.dumps(RESULT), job_id),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def make_ops(
+    mode: str, db_path: str
+) -> Tuple[Callable[[str], Awaitable[Any]], Callable[[str], Awaitable[None]]]:
+    """Return async ``(read, write)`` operations for a store implementation."""
+    if mode == "pooled":
+
+        async def pooled_write(job_id: str) -> None:
+            await db.update_job_status(job_id, "completed", result=RESULT)
+
+        return db.get_job, pooled_write
+
+    async def legacy_read(job_id: str) -> Any:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, partial(_legacy_get, db_path, job_id))
+
+    async def legacy_write(job_id: str) -> None:
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(
+            None, partial(_legacy_update, db_path, job_id, "completed")
+        )
+
+    return legacy_read, legacy_write
+
+
+async def run_load(
+    mode: str, db_path: str, jobs: List[str], args: argparse.Namespace
+) -> Dict[str, Any]:
+    """Run the polling workload and collect per-operation latencies."""
+    read, write = make_ops(mode, db_path)
+    latencies: Dict[str, List[float]] = {"read": [], "write": []}
+    errors = 0
+    deadline = time.perf_counter() + args.seconds
+    rng = random.Random(0)
+
+    async def client() -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            job_id = rng.choice(jobs)
+            kind = "write" if rng.random() < args.write_ratio else "read"
+            start = time.perf_counter()
+            try:
+                await (write(job_id) if kind == "write" else read(job_id))
+            except sqlite3.OperationalError:
+                errors += 1
+                continue
+            latencies[kind].append((time.perf_counter() - start) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.clients)))
+    elapsed = time.perf_counter() - started
+    return {"latencies": latencies, "errors": errors, "elapsed": elapsed}
+
+
+def pct(values: List[float], q: int) -> float:
+    """Return the ``q``-th percentile of ``values``."""
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else 0.0
+
+
+def main() -> None:
+    """Run the benchmark for both store implementations and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--jobs", type=int, default=1000)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    print(
+        f"{'store':>8} {'reads/s':>9} {'writes/s':>9} {'read p50':>9} "
+        f"{'read p99':>9} {'write p50':>10} {'write p99':>10} {'errors':>7}"
+    )
+    for mode in ("legacy", "pooled"):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "jobs.db")
+            os.environ["ZF_SQLITE_URL"] = f"sqlite:///{db_path}"
+            get_settings.cache_clear()
+            db._init_db_sync()
+            expires_at = datetime.utcnow() + timedelta(hours=1)
+            jobs = [f"job-{i}" for i in range(args.jobs)]
+            for job_id in jobs:
+                db._create_job_sync(job_id, "/tmp/input.pdf", expires_at)
+            if mode == "legacy":
+                # Restore the default rollback journal the old store used
+                db.close_db()
+                with sqlite3.connect(db_path) as conn:
+                    conn.execute("PRAGMA journal_mode=DELETE")
+
+            stats = asyncio.run(run_load(mode, db_path, jobs, args))
+            db.close_db()
+
+        reads, writes = stats["latencies"]["read"], stats["latencies"]["write"]
+        print(
+            f"{mode:>8} {len(reads) / stats['elapsed']:>9.0f} "
+            f"{len(writes) / stats['elapsed']:>9.0f} {pct(reads, 50):>9.2f} "
+            f"{pct(reads, 99):>9.2f} {pct(writes, 50):>10.2f} "
+            f"{pct(writes, 99):>10.2f} {stats['errors']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
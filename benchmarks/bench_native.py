@@ -0,0 +1,68 @@
+"""Compare rendering scanned pages with decoding their embedded images.
+
+Builds image-only PDFs like scanner output: every page is one bilevel CCITT,
+grayscale JPEG or color JPEG image at ``--scan-dpi``. Each is scanned by
+rendering the page at ``--dpi`` and by decoding the embedded image at its
+native resolution (``ZF_NATIVE_IMAGES``), reporting time per page and the
+share of page labels found. Run from the repository root::
+
+    python -m benchmarks.bench_native --pages 20
+"""
+
+import argparse
+import io
+import time
+
+from PIL import Image
+
+from benchmarks.bench_adaptive import _summarize
+from benchmarks.corpus import make_page
+from app.services.scanner import Scanner
+
+# PIL stores "1" images as CCITT G4 and "L" / "RGB" images as JPEG
+MODES = {"1": "CCITT", "L": "JPEG gray", "RGB": "JPEG color"}
+
+
+def make_scanned_pdf(pages: int, mode: str, scan_dpi: int) -> bytes:
+    """Build a PDF of one full-page image per page, as a scanner would."""
+    scale = scan_dpi / 100
+    images = []
+    for i in range(pages):
+        page = make_page(i + 1, text=True)
+        size = (round(page.width * scale), round(page.height * scale))
+        images.append(page.resize(size, Image.Resampling.BILINEAR).convert(mode))
+    buf = io.BytesIO()
+    images[0].save(
+        buf,
+        format="PDF",
+        resolution=scan_dpi,
+        save_all=True,
+        append_images=images[1:],
+    )
+    return buf.getvalue()
+
+
+def main() -> None:
+    """Run the benchmark for each image encoding."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--scan-dpi", type=int, default=200)
+    args = parser.parse_args()
+
+    expected = {f"PAGE-{i + 1:05d}" for i in range(args.pages)}
+    for mode, label in MODES.items():
+        pdf_bytes = make_scanned_pdf(args.pages, mode, args.scan_dpi)
+        print(f"{label} at {args.scan_dpi} DPI, {len(pdf_bytes) / 1e6:.1f} MB")
+        for name, native in (("render", False), ("native", True)):
+            scanner = Scanner(dpi=args.dpi, native_images=native)
+            start = time.perf_counter()
+            results = scanner.scan_pdf(pdf_bytes)
+            elapsed = time.perf_counter() - start
+            _summarize(name, scanner.page_stats, elapsed)
+            found = expected & {r["value"] for r in results}
+            print(f"{'':>9}  recall {len(found) / len(expected):6.1%}")
+
+
+if __name__ == "__main__":
+    main()
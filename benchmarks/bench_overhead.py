@@ -0,0 +1,134 @@
+"""Measure fixed per-request overhead and first-request latency.
+
+Scans a one-page label PDF through ``POST /v1/scan`` with the result and
+page caches disabled and compares request latency with calling the scanner
+directly; the difference is what every request pays for settings, auth,
+spooling and response handling. It also counts ``Settings`` constructions
+per request, and times the first request of a freshly started service,
+which pays for lazy imports and pool start-up unless workers are pre-warmed
+(``ZF_PREWARM_WORKERS``). Run from the repository root::
+
+    python -m benchmarks.bench_overhead --requests 200
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+from benchmarks.corpus import make_pdf
+
+COLD_START = """
+import os, sys, time
+sys.path.insert(0, "benchmarks/..")
+from benchmarks.corpus import make_pdf
+from fastapi.testclient import TestClient
+from app.main import app
+pdf = make_pdf(2)
+with TestClient(app) as client:
+    start = time.perf_counter()
+    client.post("/v1/scan", files={"file": ("a.pdf", pdf, "application/pdf")})
+    print(time.perf_counter() - start)
+"""
+
+
+def _env(tmp: str) -> dict:
+    """Return the service environment for a benchmark run."""
+    return {
+        **os.environ,
+        "ZF_SQLITE_URL": f"sqlite:///{tmp}/jobs.db",
+        "ZF_ARTIFACT_DIR": f"{tmp}/artifacts",
+        "ZF_RESULT_CACHE_ENABLED": "false",
+        "ZF_PAGE_CACHE_ENABLED": "false",
+        "ZF_LOG_LEVEL": "WARNING",
+    }
+
+
+def cold_start(workers: int, prewarm: bool) -> float:
+    """Time the first request of a fresh service process."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = _env(tmp)
+        env["ZF_WORKER_POOL_SIZE"] = str(workers)
+        env["ZF_PREWARM_WORKERS"] = "true" if prewarm else "false"
+        output = subprocess.run(
+            [sys.executable, "-c", COLD_START],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    """Run the benchmark and print latencies in milliseconds."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=2)
+    # A low DPI keeps the scan itself small next to the fixed overhead
+    parser.add_argument("--dpi", type=int, default=72)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ.update(_env(tmp.name))
+    os.environ["ZF_WORKER_POOL_SIZE"] = "1"
+    os.environ["ZF_SCAN_DPI"] = str(args.dpi)
+    from fastapi.testclient import TestClient
+
+    from app import config
+    from app.main import app
+    from app.services.scanner import Scanner
+
+    pdf = make_pdf(1)
+    scanner = Scanner(dpi=args.dpi)
+    direct: List[float] = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        scanner.scan_pdf(pdf)
+        direct.append((time.perf_counter() - start) * 1000)
+
+    constructed = 0
+    original_init = config.Settings.__init__
+
+    def counting_init(self: config.Settings, *a: object, **kw: object) -> None:
+        nonlocal constructed
+        constructed += 1
+        original_init(self, *a, **kw)
+
+    requests: List[float] = []
+    with TestClient(app) as client:
+        files = {"file": ("label.pdf", pdf, "application/pdf")}
+        client.post("/v1/scan", files=files)
+        config.Settings.__init__ = counting_init  # type: ignore[method-assign]
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            response = client.post("/v1/scan", files=files)
+            requests.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200
+        config.Settings.__init__ = original_init  # type: ignore[method-assign]
+    tmp.cleanup()
+
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        config.Settings()
+    settings_ms = (time.perf_counter() - start) * 1000 / args.requests
+
+    p50_direct = statistics.median(direct)
+    p50_request = statistics.median(requests)
+    print(f"direct scan p50       {p50_direct:8.2f} ms")
+    print(f"POST /v1/scan p50     {p50_request:8.2f} ms")
+    print(f"per-request overhead  {p50_request - p50_direct:8.2f} ms")
+    print(f"Settings() / request  {constructed / args.requests:8.1f}")
+    print(f"one Settings()        {settings_ms:8.2f} ms")
+    for prewarm in (False, True):
+        first = cold_start(args.workers, prewarm) * 1000
+        label = "prewarmed" if prewarm else "cold"
+        print(f"first request, {label:<9} {first:8.1f} ms ({args.workers} workers)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Compare serial and process-pool scanning throughput.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_parallel --pages 48 --workers 4
+"""
+
+import argparse
+import os
+import time
+
+from benchmarks.corpus import make_pdf
+from app.services.parallel import get_process_pool, shutdown_process_pool
+from app.services.scanner import Scanner
+
+
+def _time_scan(scanner: Scanner, pdf_bytes: bytes, repeat: int) -> float:
+    """Return the best wall-clock time over ``repeat`` scans."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        scanner.scan_pdf(pdf_bytes)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    """Run the benchmark and print pages/sec for both engines."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # Start the pool up front so worker spawn time is not billed to a scan
+    get_process_pool(args.workers)
+    serial = Scanner(dpi=args.dpi)
+    parallel = Scanner(dpi=args.dpi, workers=args.workers)
+
+    print(f"{'pages':>6} {'serial p/s':>11} {'parallel p/s':>13} {'speedup':>8}")
+    try:
+        for pages in args.pages:
+            pdf_bytes = make_pdf(pages)
+            assert serial.scan_pdf(pdf_bytes) == parallel.scan_pdf(pdf_bytes)
+            t_serial = _time_scan(serial, pdf_bytes, args.repeat)
+            t_parallel = _time_scan(parallel, pdf_bytes, args.repeat)
+            print(
+                f"{pages:>6} {pages / t_serial:>11.1f} "
+                f"{pages / t_parallel:>13.1f} {t_serial / t_parallel:>7.2f}x"
+            )
+    finally:
+        shutdown_process_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Compare full-page scans with a region-of-interest crop box.
+
+The corpus pages carry their label in the top-right corner, so a template
+for that corner lets the scanner render a small tile instead of the whole
+Letter page. Run from the repository root::
+
+    python -m benchmarks.bench_regions --pages 20
+"""
+
+import argparse
+import time
+from typing import Any, Dict, List
+
+from benchmarks.bench_adaptive import _summarize
+from benchmarks.corpus import make_pdf
+from app.services.regions import parse_regions
+from app.services.scanner import Scanner
+
+# Top-right 3 x 2.75 inch of a Letter page, in PDF points
+TOP_RIGHT = "396,594,612,792"
+
+
+def main() -> None:
+    """Run the benchmark on text pages with a corner label."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--regions", default=TOP_RIGHT)
+    args = parser.parse_args()
+
+    pdf_bytes = make_pdf(args.pages, text=True)
+    baseline: List[Dict[str, Any]] = []
+    for name, regions in (("full", None), ("regions", parse_regions(args.regions))):
+        scanner = Scanner(dpi=args.dpi, regions=regions)
+        start = time.perf_counter()
+        results = scanner.scan_pdf(pdf_bytes)
+        elapsed = time.perf_counter() - start
+        _summarize(name, scanner.page_stats, elapsed)
+        if not baseline:
+            baseline = results
+        elif results != baseline:
+            print(f"  result mismatch: {len(results)} vs {len(baseline)} barcodes")
+
+
+if __name__ == "__main__":
+    main()
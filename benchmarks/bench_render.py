@@ -0,0 +1,98 @@
+"""Compare the PIL color render path with zero-copy grayscale NumPy views.
+
+Each mode runs in a fresh interpreter so peak RSS is not shared between
+them. Run from the repository root::
+
+    python -m benchmarks.bench_render --pages 10 --dpi 300
+"""
+
+import argparse
+import io
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+import pypdfium2 as pdfium
+import zxingcpp
+
+from benchmarks.corpus import make_pdf
+from app.services.scanner import Scanner
+
+
+def _run_mode(mode: str, pages: int, dpi: int) -> dict:
+    """Render and decode every page in ``mode`` and report timings."""
+    doc = pdfium.PdfDocument(io.BytesIO(make_pdf(pages, text=True)))
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    render_ms = []
+    decode_ms = []
+    bitmap_bytes = 0
+    for page in doc:
+        start = time.perf_counter()
+        if mode == "pil":
+            image = page.render(scale=dpi / 72).to_pil()
+            bitmap_bytes = len(image.tobytes())
+        else:
+            image = Scanner._render(page, dpi / 72)
+            bitmap_bytes = image.nbytes
+        render_ms.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        zxingcpp.read_barcodes(image)
+        decode_ms.append((time.perf_counter() - start) * 1000)
+        del image
+    return {
+        "render_ms": statistics.median(render_ms),
+        "decode_ms": statistics.median(decode_ms),
+        "bitmap_mb": bitmap_bytes / 1e6,
+        # ru_maxrss is reported in KiB on Linux
+        "peak_rss_delta_mb": (
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+        )
+        / 1024,
+    }
+
+
+def main() -> None:
+    """Run both modes in subprocesses and print a comparison table."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--mode", choices=["pil", "numpy"])
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(_run_mode(args.mode, args.pages, args.dpi)))
+        return
+
+    print(
+        f"{'mode':>6} {'render ms':>10} {'decode ms':>10} "
+        f"{'bitmap MB':>10} {'peak RSS +MB':>13}"
+    )
+    for mode in ("pil", "numpy"):
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.bench_render",
+                "--mode",
+                mode,
+                "--pages",
+                str(args.pages),
+                "--dpi",
+                str(args.dpi),
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        row = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{mode:>6} {row['render_ms']:>10.1f} {row['decode_ms']:>10.1f} "
+            f"{row['bitmap_mb']:>10.1f} {row['peak_rss_delta_mb']:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Compare per-page decode time with one format versus all formats.
+
+Pages are rendered once at scan DPI and then decoded repeatedly with
+different zxing-cpp format masks. Run from the repository root::
+
+    python -m benchmarks.bench_symbology --pages 5
+"""
+
+import argparse
+import io
+import statistics
+import time
+from typing import List, Optional
+
+import pypdfium2 as pdfium
+import zxingcpp
+
+from benchmarks.corpus import make_pdf
+from app.services.symbology import format_mask, resolve_symbologies
+
+MASKS: List[Optional[List[str]]] = [
+    None,
+    ["QRCode"],
+    ["Code128"],
+    ["QRCode", "Code128"],
+    ["MatrixCodes"],
+    ["LinearCodes"],
+]
+
+
+def main() -> None:
+    """Run the benchmark and print the median decode time per mask."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    doc = pdfium.PdfDocument(io.BytesIO(make_pdf(args.pages, text=True)))
+    images = [page.render(scale=args.dpi / 72).to_pil() for page in doc]
+
+    print(f"{'formats':>22} {'ms/page':>9} {'found':>6}")
+    for names in MASKS:
+        formats = format_mask(resolve_symbologies(names))
+        timings = []
+        found = 0
+        for _ in range(args.repeat):
+            for image in images:
+                start = time.perf_counter()
+                found += len(zxingcpp.read_barcodes(image, formats=formats))
+                timings.append((time.perf_counter() - start) * 1000)
+        label = ",".join(names) if names else "all"
+        print(
+            f"{label:>22} {statistics.median(timings):>9.1f} "
+            f"{found // args.repeat:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Compare full-page and tiled decoding of a large-format page.
+
+Builds a 24 x 36 inch drawing sheet with QR labels scattered over it, some
+across tile seams, and scans it once per mode in a fresh process so the
+reported peak resident memory belongs to that mode alone. Run from the
+repository root::
+
+    python -m benchmarks.bench_tiles --dpi 300 --tile-mpx 24
+"""
+
+import argparse
+import io
+import json
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from benchmarks.corpus import make_barcode
+
+# Sheet size at the 100 DPI it is drawn at
+SHEET_SIZE = (2400, 3600)
+
+
+def make_sheet_pdf() -> bytes:
+    """Build a one-page drawing sheet with a grid of lines and QR labels."""
+    sheet = Image.new("RGB", SHEET_SIZE, color="white")
+    draw = ImageDraw.Draw(sheet)
+    for x in range(0, SHEET_SIZE[0], 100):
+        draw.line([(x, 0), (x, SHEET_SIZE[1])], fill="gray")
+    for y in range(0, SHEET_SIZE[1], 100):
+        draw.line([(0, y), (SHEET_SIZE[0], y)], fill="gray")
+    rng = np.random.default_rng(7)
+    for i in range(12):
+        x = int(rng.integers(0, SHEET_SIZE[0] - 150))
+        y = int(rng.integers(0, SHEET_SIZE[1] - 150))
+        sheet.paste(make_barcode(f"SHEET-{i:02d}", size=140), (x, y))
+    buf = io.BytesIO()
+    sheet.save(buf, format="PDF", resolution=100)
+    return buf.getvalue()
+
+
+def run_mode(pdf_path: str, dpi: int, tile_px: int, threads: int) -> None:
+    """Scan the sheet once and print a JSON summary."""
+    from app.services.scanner import Scanner
+
+    scanner = Scanner(dpi=dpi, tile_max_px=tile_px, tile_threads=threads)
+    start = time.perf_counter()
+    results = scanner.scan_pdf(pdf_path)
+    elapsed = time.perf_counter() - start
+    stats = scanner.page_stats[0]
+    print(
+        json.dumps(
+            {
+                "seconds": elapsed,
+                "barcodes": sorted(r["value"] for r in results),
+                "tiles": stats.get("tiles", 1),
+                "peak_mpx": stats["peak_pixels"] / 1e6,
+                "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            }
+        )
+    )
+
+
+def main() -> None:
+    """Scan the sheet in full and tiled, each in its own process."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--tile-mpx", type=float, default=24)
+    parser.add_argument("--threads", type=int, default=2)
+    parser.add_argument("--run", nargs=3, help=argparse.SUPPRESS)
+    parser.add_argument("--pdf", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        run_mode(args.pdf, *map(int, args.run))
+        return
+
+    pdf_path = "/tmp/zebrafetch-sheet.pdf"
+    with open(pdf_path, "wb") as f:
+        f.write(make_sheet_pdf())
+    baseline = None
+    modes = [("full", 0, 1), ("tiled", int(args.tile_mpx * 1e6), args.threads)]
+    for name, tile_px, threads in modes:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_tiles", "--pdf", pdf_path]
+            + ["--run", str(args.dpi), str(tile_px), str(threads)],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        summary = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{name:>6}: {summary['seconds']:6.2f} s  "
+            f"{len(summary['barcodes']):3d} barcodes  "
+            f"{summary['tiles']:3d} tiles  "
+            f"largest render {summary['peak_mpx']:6.1f} MPx  "
+            f"peak RSS {summary['max_rss_mb']:7.1f} MB"
+        )
+        if baseline is None:
+            baseline = summary["barcodes"]
+        elif summary["barcodes"] != baseline:
+            print("  result mismatch with the full-page decode")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Compare rendering born-digital labels with reading their vector bars.
+
+The corpus pages are shipping labels that draw a Code128, an EAN-13 and a
+Code39 symbol as filled rectangles with their text underneath, like label
+printer and ERP output. Each document is scanned by rendering every page
+at ``--dpi`` and by reading the bars from the page objects
+(``ZF_VECTOR_BARCODES``), reporting time per page and the share of symbols
+found. Run from the repository root::
+
+    python -m benchmarks.bench_vector --pages 50
+"""
+
+import argparse
+import time
+
+from benchmarks.bench_adaptive import _summarize
+from benchmarks.corpus import VECTOR_LABELS, make_vector_pdf
+from app.services.scanner import Scanner
+
+
+def main() -> None:
+    """Run the benchmark on vector label pages."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--dpi", type=int, default=300)
+    args = parser.parse_args()
+
+    pdf_bytes = make_vector_pdf(args.pages)
+    expected = args.pages * len(VECTOR_LABELS)
+    baseline = None
+    for name, vector in (("render", False), ("vector", True)):
+        scanner = Scanner(dpi=args.dpi, vector_barcodes=vector)
+        start = time.perf_counter()
+        results = scanner.scan_pdf(pdf_bytes)
+        elapsed = time.perf_counter() - start
+        _summarize(name, scanner.page_stats, elapsed)
+        found = {(r["page"], r["value"]) for r in results}
+        print(f"{'':>9}  recall {len(found) / expected:6.1%}")
+        if baseline is None:
+            baseline = found
+        elif found != baseline:
+            print(f"  result mismatch: {len(found ^ baseline)} differing barcodes")
+
+
+if __name__ == "__main__":
+    main()
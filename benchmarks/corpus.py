@@ -0,0 +1,239 @@
+"""Synthetic PDF generation for benchmarks."""
+
+import io
+import sys
+from pathlib import Path
+from typing import List, Set, Tuple
+
+import numpy as np
+import zxingcpp
+from PIL import Image, ImageDraw, ImageFont
+
+# Make the backend package importable when run as a script
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+# US Letter at 100 DPI, rendered by the scanner at its own DPI
+PAGE_SIZE = (850, 1100)
+
+
+def make_barcode(value: str, size: int = 200) -> Image.Image:
+    """Render a QR code for ``value`` as a PIL image."""
+    image = zxingcpp.write_barcode(
+        zxingcpp.BarcodeFormat.QRCode, value, width=size, height=size
+    )
+    return Image.fromarray(np.asarray(image))
+
+
+def add_text(page: Image.Image, lines: int = 45) -> None:
+    """Fill the body of a page with lines of filler text."""
+    draw = ImageDraw.Draw(page)
+    font = ImageFont.load_default(size=14)
+    for i in range(lines):
+        draw.text(
+            (60, 300 + i * 17),
+            f"{i:03d} Item description, quantity, weight and handling notes",
+            fill="black",
+            font=font,
+        )
+
+
+def make_page(page_no: int, text: bool = False, label: bool = True) -> Image.Image:
+    """Create a white page with one QR label in its top-right corner."""
+    page = Image.new("RGB", PAGE_SIZE, color="white")
+    if text:
+        add_text(page)
+    if label:
+        page.paste(make_barcode(f"PAGE-{page_no:05d}"), (PAGE_SIZE[0] - 260, 40))
+    return page
+
+
+def make_pdf(pages: int, text: bool = False, label_every: int = 1) -> bytes:
+    """Build a multi-page PDF with a QR label on every ``label_every`` page."""
+    images: List[Image.Image] = [
+        make_page(i + 1, text=text, label=i % label_every == 0) for i in range(pages)
+    ]
+    buf = io.BytesIO()
+    images[0].save(
+        buf, format="PDF", resolution=100, save_all=True, append_images=images[1:]
+    )
+    return buf.getvalue()
+
+
+# Label content of born-digital pages: (symbology, value) pairs
+VECTOR_LABELS = [
+    ("Code128", "SHIP-{page:05d}"),
+    ("EAN13", "{ean:012d}"),
+    ("Code39", "PO{page:05d}"),
+]
+
+
+def bar_runs(symbology: str, value: str) -> List[Tuple[int, int]]:
+    """Return the ``(start, width)`` of each bar, in modules."""
+    image = zxingcpp.write_barcode(
+        zxingcpp.barcode_format_from_str(symbology), value, quiet_zone=0
+    )
+    row = np.asarray(image)[0] < 128
+    runs = []
+    start = None
+    for x, dark in enumerate(list(row) + [False]):
+        if dark and start is None:
+            start = x
+        elif not dark and start is not None:
+            runs.append((start, x - start))
+            start = None
+    return runs
+
+
+def vector_label_ops(
+    symbology: str,
+    value: str,
+    x: float,
+    y: float,
+    module: float = 1.0,
+    height: float = 50.0,
+    text: bool = True,
+) -> str:
+    """Draw a 1D barcode as filled rectangles with its text underneath."""
+    runs = bar_runs(symbology, value)
+    ops = ["0 g"]
+    ops += [
+        f"{x + start * module:.3f} {y:.3f} {width * module:.3f} {height:.3f} re"
+        for start, width in runs
+    ]
+    ops.append("f")
+    if text:
+        ops.append(f"BT /F1 9 Tf {x:.3f} {y - 11:.3f} Td ({value}) Tj ET")
+    return "\n".join(ops)
+
+
+def write_pdf(contents: List[str], size: Tuple[int, int] = (612, 792)) -> bytes:
+    """Write a minimal PDF with one page per content stream and Helvetica."""
+    count = len(contents)
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids ["
+        + " ".join(f"{4 + 2 * i} 0 R" for i in range(count))
+        + f"] /Count {count} >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, content in enumerate(contents):
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {size[0]} {size[1]}] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>"
+        )
+        objects.append(f"<< /Length {len(content)} >>\nstream\n{content}\nendstream")
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        out.write(f"{offset:010d} 00000 n \n".encode())
+    out.write(
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref}\n%%EOF\n".encode()
+    )
+    return out.getvalue()
+
+
+def make_vector_pdf(pages: int) -> bytes:
+    """Build born-digital shipping labels with vector 1D barcodes and text."""
+    contents = []
+    for page in range(1, pages + 1):
+        ops = [
+            "BT /F1 14 Tf 40 740 Td (Shipping label) Tj ET",
+            "BT /F1 10 Tf 40 700 Td (Deliver to: Example Street 1) Tj ET",
+            # A table rule and a box, the kind of vector art labels have
+            "0 g 40 680 532 1 re f",
+            "1 w 36 36 540 720 re S",
+        ]
+        for i, (symbology, template) in enumerate(VECTOR_LABELS):
+            value = template.format(page=page, ean=400_000_000_000 + page)
+            ops.append(vector_label_ops(symbology, value, 60, 560 - i * 150))
+        contents.append("\n".join(ops))
+    return write_pdf(contents)
+
+
+# Symbologies the benchmark suite draws, with the value prefix of each symbol
+SUITE_SYMBOLOGIES = {
+    "QRCode": "QR",
+    "DataMatrix": "DM",
+    "PDF417": "PDF",
+    "Code128": "C128",
+    "Code39": "C39",
+    "EAN13": "",
+}
+
+# Symbols sit in a grid of cells on the page, picked at random per page
+GRID = (2, 6)
+
+
+def ean13(digits: str) -> str:
+    """Append the check digit to 12 EAN-13 digits."""
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits))
+    return digits + str(-total % 10)
+
+
+def symbol_value(symbology: str, page: int, index: int) -> str:
+    """Return the value of symbol ``index`` on ``page``, as a reader returns it."""
+    if symbology == "EAN13":
+        return ean13(f"{400_000_000_000 + page * 100 + index:012d}")
+    return f"{SUITE_SYMBOLOGIES[symbology]}-{page:05d}-{index:02d}"
+
+
+def symbol_image(symbology: str, value: str) -> Image.Image:
+    """Render a symbol at 5 pixels per module for 2D and 2 for 1D codes."""
+    encoded = value[:12] if symbology == "EAN13" else value
+    image = np.asarray(
+        zxingcpp.write_barcode(zxingcpp.barcode_format_from_str(symbology), encoded)
+    )
+    scale = 5 if symbology in ("QRCode", "DataMatrix") else 2
+    return Image.fromarray(image).resize(
+        (image.shape[1] * scale, image.shape[0] * scale), Image.Resampling.NEAREST
+    )
+
+
+def make_suite_pdf(
+    kind: str, pages: int, symbology: str, per_page: int = 1, seed: int = 0
+) -> Tuple[bytes, Set[Tuple[int, str]]]:
+    """Build a benchmark document and the ``(page, value)`` pairs it holds.
+
+    ``kind`` is ``"image"`` for scanned pages, one 150 DPI grayscale image
+    each, or ``"vector"`` for born-digital pages that draw 1D symbols as
+    rectangles. Symbols fill ``per_page`` of the cells of a ``GRID``; the
+    cells are picked from ``seed`` so the same arguments build the same PDF.
+    """
+    columns, rows = GRID
+    rng = np.random.default_rng(seed)
+    expected = set()
+    images: List[Image.Image] = []
+    contents: List[str] = []
+    for page in range(1, pages + 1):
+        cells = rng.choice(columns * rows, size=per_page, replace=False)
+        values = [symbol_value(symbology, page, i) for i in range(per_page)]
+        expected.update((page, value) for value in values)
+        if kind == "vector":
+            ops = ["BT /F1 14 Tf 40 760 Td (Shipping manifest) Tj ET"]
+            for cell, value in zip(cells, values):
+                x = 40 + (cell % columns) * 270
+                y = 640 - (cell // columns) * 120
+                ops.append(vector_label_ops(symbology, value, x, y))
+            contents.append("\n".join(ops))
+            continue
+        sheet = Image.new("L", (1275, 1650), color=255)
+        for cell, value in zip(cells, values):
+            x = 40 + (cell % columns) * 620
+            y = 60 + (cell // columns) * 260
+            sheet.paste(symbol_image(symbology, value), (x, y))
+        images.append(sheet)
+    if kind == "vector":
+        return write_pdf(contents), expected
+    buf = io.BytesIO()
+    images[0].save(
+        buf, format="PDF", resolution=150, save_all=True, append_images=images[1:]
+    )
+    return buf.getvalue(), expected
@@ -0,0 +1,295 @@
+"""Run the benchmark suite and compare it with a saved baseline.
+
+Every scenario is a synthetic document from ``corpus.make_suite_pdf`` (page
+count, symbology, symbols per page, scanned image or vector pages) and the
+settings it is scanned with. Each is measured through three targets:
+``Scanner.scan_pdf`` directly, ``POST /v1/scan`` and ``POST /v1/jobs`` polled
+to completion, the two endpoints in-process through ``TestClient`` with the
+result and page caches off. A target runs in its own process so its peak
+resident memory is its own; after one warm-up call it scans the document
+``--repeat`` times and reports latency percentiles, pages per second, peak
+RSS and the share of the document's symbols found. Run from the repository
+root::
+
+    python -m benchmarks.suite --save benchmarks/baseline.json
+    python -m benchmarks.suite --compare benchmarks/baseline.json
+
+``--compare`` prints the metrics that moved by more than ``--threshold``
+(any drop in recall) and exits with status 1 if one got worse.
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from importlib.metadata import version
+from typing import Any, Callable, Dict, List, NamedTuple, Set, Tuple
+
+import numpy as np
+
+from benchmarks.corpus import make_suite_pdf
+
+TARGETS = ("scanner", "scan", "jobs")
+
+# Seconds a job may take before the run is abandoned
+JOB_TIMEOUT = 300
+
+# Metrics where a higher value is an improvement; all others are costs
+HIGHER_IS_BETTER = ("pages_per_s", "recall")
+
+
+class Scenario(NamedTuple):
+    """A benchmark document and the settings it is scanned with."""
+
+    kind: str
+    pages: int
+    symbology: str
+    per_page: int = 1
+    dpi: int = 200
+    native_images: bool = True
+    vector_barcodes: bool = False
+
+    def env(self) -> Dict[str, str]:
+        """Return the ``ZF_`` settings for this scenario."""
+        return {
+            "ZF_SCAN_DPI": str(self.dpi),
+            "ZF_NATIVE_IMAGES": str(self.native_images).lower(),
+            "ZF_VECTOR_BARCODES": str(self.vector_barcodes).lower(),
+        }
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "image-qr-1p": Scenario("image", 1, "QRCode"),
+    "image-qr-10p": Scenario("image", 10, "QRCode"),
+    "image-qr-10p-dense": Scenario("image", 10, "QRCode", per_page=12),
+    "image-qr-10p-render-150dpi": Scenario(
+        "image", 10, "QRCode", dpi=150, native_images=False
+    ),
+    "image-qr-10p-render-300dpi": Scenario(
+        "image", 10, "QRCode", dpi=300, native_images=False
+    ),
+    "image-datamatrix-10p": Scenario("image", 10, "DataMatrix"),
+    "image-pdf417-10p": Scenario("image", 10, "PDF417"),
+    "image-code128-10p": Scenario("image", 10, "Code128"),
+    "image-code39-10p": Scenario("image", 10, "Code39"),
+    "image-ean13-10p": Scenario("image", 10, "EAN13"),
+    "image-code128-50p": Scenario("image", 50, "Code128"),
+    "vector-code128-10p-render": Scenario("vector", 10, "Code128"),
+    "vector-code128-10p": Scenario("vector", 10, "Code128", vector_barcodes=True),
+    "vector-ean13-10p-dense": Scenario(
+        "vector", 10, "EAN13", per_page=12, vector_barcodes=True
+    ),
+    "vector-code128-50p": Scenario("vector", 50, "Code128", vector_barcodes=True),
+}
+
+Found = Set[Tuple[int, str]]
+
+
+def _env(tmp: str, scenario: Scenario) -> Dict[str, str]:
+    """Return the service environment for one scenario."""
+    return {
+        "ZF_SQLITE_URL": f"sqlite:///{tmp}/jobs.db",
+        "ZF_ARTIFACT_DIR": f"{tmp}/artifacts",
+        "ZF_RESULT_CACHE_ENABLED": "false",
+        "ZF_PAGE_CACHE_ENABLED": "false",
+        "ZF_WORKER_POOL_SIZE": "1",
+        "ZF_LOG_LEVEL": "WARNING",
+        **scenario.env(),
+    }
+
+
+def _found(results: List[Dict[str, Any]]) -> Found:
+    """Return the ``(page, value)`` pairs of a list of scan results."""
+    return {(r["page"], r["value"]) for r in results}
+
+
+def _measure(scan: Callable[[], Found], repeat: int) -> Tuple[List[float], Found]:
+    """Time ``repeat`` calls of ``scan`` after a warm-up call."""
+    found = scan()
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        found = scan()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, found
+
+
+def _measure_scanner(pdf: bytes, repeat: int) -> Tuple[List[float], Found]:
+    """Scan with a scanner built from the settings, as the routes do."""
+    from app.config import get_settings
+    from app.dependencies.scan import build_scanner
+
+    scanner = build_scanner(get_settings())
+    return _measure(lambda: _found(scanner.scan_pdf(pdf)), repeat)
+
+
+def _measure_http(pdf: bytes, target: str, repeat: int) -> Tuple[List[float], Found]:
+    """Scan through ``POST /v1/scan`` or a job polled until it finishes."""
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    files = {"file": ("suite.pdf", pdf, "application/pdf")}
+    with TestClient(app) as client:
+
+        def scan() -> Found:
+            response = client.post("/v1/scan", files=files)
+            response.raise_for_status()
+            return _found(response.json()["results"])
+
+        def job() -> Found:
+            response = client.post("/v1/jobs", files=files)
+            response.raise_for_status()
+            job_id = response.json()["job_id"]
+            deadline = time.monotonic() + JOB_TIMEOUT
+            while time.monotonic() < deadline:
+                record = client.get(f"/v1/jobs/{job_id}").json()
+                if record["status"] not in ("pending", "running"):
+                    return _found(record["result_json"]["results"])
+                time.sleep(0.005)
+            raise TimeoutError(f"Job {job_id} still {record['status']}")
+
+        return _measure(scan if target == "scan" else job, repeat)
+
+
+def run_target(name: str, target: str, repeat: int) -> None:
+    """Measure one scenario through one target and print a JSON summary."""
+    scenario = SCENARIOS[name]
+    pdf, expected = make_suite_pdf(
+        scenario.kind, scenario.pages, scenario.symbology, scenario.per_page
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(_env(tmp, scenario))
+        if target == "scanner":
+            latencies, found = _measure_scanner(pdf, repeat)
+        else:
+            latencies, found = _measure_http(pdf, target, repeat)
+    rss_kb = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    summary = {
+        "p50_ms": round(p50, 1),
+        "p90_ms": round(p90, 1),
+        "p99_ms": round(p99, 1),
+        "pages_per_s": round(scenario.pages * repeat / sum(latencies) * 1000, 2),
+        "peak_rss_mb": round(rss_kb / 1024, 1),
+        "recall": round(len(found & expected) / len(expected), 4),
+        "unexpected": len(found - expected),
+    }
+    print(json.dumps(summary))
+
+
+def environment() -> Dict[str, Any]:
+    """Describe the machine and library versions the results belong to."""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        **{name: version(name) for name in ("pypdfium2", "zxing-cpp", "Pillow")},
+    }
+
+
+def run_suite(names: List[str], targets: List[str], repeat: int) -> Dict[str, Any]:
+    """Run each scenario and target in a fresh process and collect results."""
+    results: Dict[str, Dict[str, Any]] = {}
+    for name in names:
+        results[name] = {}
+        for target in targets:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.suite"]
+                + ["--run", name, target, "--repeat", str(repeat)],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            summary = json.loads(output.strip().splitlines()[-1])
+            results[name][target] = summary
+            print(
+                f"{name:<28} {target:<8} p50 {summary['p50_ms']:8.1f} ms  "
+                f"p90 {summary['p90_ms']:8.1f} ms  "
+                f"{summary['pages_per_s']:7.2f} pages/s  "
+                f"rss {summary['peak_rss_mb']:6.1f} MB  "
+                f"recall {summary['recall']:6.1%}",
+                flush=True,
+            )
+    return {"environment": environment(), "repeat": repeat, "results": results}
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> int:
+    """Print metrics that moved past ``threshold`` and count regressions."""
+    regressions = 0
+    for name, targets in current["results"].items():
+        for target, metrics in targets.items():
+            before = baseline["results"].get(name, {}).get(target)
+            if before is None:
+                print(f"{name:<28} {target:<8} not in baseline")
+                continue
+            for metric, value in metrics.items():
+                old = before.get(metric)
+                if not old or metric == "unexpected":
+                    continue
+                change = (value - old) / old
+                if metric in HIGHER_IS_BETTER:
+                    change = -change
+                limit = 0 if metric == "recall" else threshold
+                if abs(change) <= limit:
+                    continue
+                worse = change > 0
+                regressions += worse
+                print(
+                    f"{name:<28} {target:<8} {metric:<12} {old:>10} -> {value:<10} "
+                    f"{'WORSE' if worse else 'better'}"
+                )
+            if metrics["unexpected"] > before["unexpected"]:
+                regressions += 1
+                print(f"{name:<28} {target:<8} unexpected results: {metrics}")
+    return regressions
+
+
+def main() -> None:
+    """Run the suite, then save or compare the results."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--scenarios", nargs="+", default=["*"], help="glob patterns of scenarios"
+    )
+    parser.add_argument("--targets", nargs="+", default=TARGETS, choices=TARGETS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare with this baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--run", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        name, target = args.run
+        run_target(name, target, args.repeat)
+        return
+
+    names = [
+        name
+        for name in SCENARIOS
+        if any(fnmatch.fnmatch(name, pattern) for pattern in args.scenarios)
+    ]
+    current = run_suite(names, list(args.targets), args.repeat)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+            f.write("\n")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(current, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
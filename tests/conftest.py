@@ -1,8 +1,78 @@
 """Configure pytest to find the app module."""
 
+import io
 import sys
+import time
 from pathlib import Path
+from typing import Any, Callable, Dict, Iterator
+
+import numpy as np
+import pytest
+import zxingcpp
+from PIL import Image
 
 # Add the backend directory to Python path
 backend_dir = Path(__file__).parent.parent / "backend"
 sys.path.insert(0, str(backend_dir))
+
+QRPdfFactory = Callable[[int], bytes]
+
+
+def create_multipage_pdf_with_qr_codes(pages: int) -> bytes:
+    """Create a PDF with one real QR code per page encoding ``PAGE-<n>``."""
+    images = []
+    for page_no in range(1, pages + 1):
+        qr = zxingcpp.write_barcode(
+            zxingcpp.BarcodeFormat.QRCode, f"PAGE-{page_no}", width=120, height=120
+        )
+        page = Image.new("RGB", (300, 300), color="white")
+        page.paste(Image.fromarray(np.asarray(qr)), (20, 20))
+        images.append(page)
+    pdf_bytes = io.BytesIO()
+    images[0].save(pdf_bytes, format="PDF", save_all=True, append_images=images[1:])
+    return pdf_bytes.getvalue()
+
+
+@pytest.fixture(autouse=True)
+def fresh_settings() -> Iterator[None]:
+    """Re-read settings from the environment as patched by each test."""
+    from app.config import get_settings
+
+    get_settings.cache_clear()
+    yield
+    get_settings.cache_clear()
+
+
+@pytest.fixture
+def make_qr_pdf() -> QRPdfFactory:
+    """Return a factory for multi-page PDFs with one QR code per page."""
+    return create_multipage_pdf_with_qr_codes
+
+
+@pytest.fixture
+def client(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[object]:
+    """Create an API test client backed by a temporary job database."""
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setenv("ZF_SQLITE_URL", f"sqlite:///{tmp_path / 'jobs.db'}")
+    monkeypatch.setenv("ZF_WORKER_POOL_SIZE", "1")
+    monkeypatch.setenv("ZF_JOB_CONCURRENCY", "1")
+    monkeypatch.setenv("ZF_ARTIFACT_DIR", str(tmp_path / "artifacts"))
+
+    from app.main import app
+    from app.services.cache import reset_result_cache
+
+    reset_result_cache()
+    with TestClient(app) as test_client:
+        yield test_client
+    reset_result_cache()
+
+
+def wait_for_job(client: Any, job_id: str, timeout: float = 10.0) -> Dict[str, Any]:
+    """Poll a job until it leaves the queue and return its final record."""
+    deadline = time.monotonic() + timeout
+    while True:
+        job: Dict[str, Any] = client.get(f"/v1/jobs/{job_id}").json()
+        if job["status"] not in ("pending", "running") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.02)
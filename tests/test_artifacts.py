@@ -0,0 +1,106 @@
+"""Test the job artifact store and artifact endpoint."""
+
+import base64
+import os
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db import _cleanup_expired_jobs_sync, get_db_connection
+from app.services.artifacts import ArtifactStore, parse_byte_range
+from conftest import QRPdfFactory, wait_for_job
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, None),
+        ("bytes=0-9", (0, 9)),
+        ("bytes=90-", (90, 99)),
+        ("bytes=-10", (90, 99)),
+        ("bytes=95-200", (95, 99)),
+        ("bytes=0-1,5-6", None),
+        ("items=0-1", None),
+    ],
+)
+def test_parse_byte_range(header: str, expected: tuple) -> None:
+    """Test single byte ranges, open ends, suffixes and ignored headers."""
+    assert parse_byte_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=-0", "bytes=-"])
+def test_parse_byte_range_rejects_unsatisfiable(header: str) -> None:
+    """Test that ranges outside the file are rejected."""
+    with pytest.raises(ValueError):
+        parse_byte_range(header, 100)
+
+
+def test_externalize_leaves_records_untouched(tmp_path: Path) -> None:
+    """Test that externalized records reference files and inputs are kept."""
+    data = base64.b64encode(b"image bytes").decode()
+    records = [
+        {
+            "page": 1,
+            "results": [{"value": "A", "page_image": "page-1", "snippet": data}],
+            "page_image": {"id": "page-1", "media_type": "image/png", "data": data},
+        }
+    ]
+    externalized, paths = ArtifactStore(str(tmp_path)).externalize("job", records)
+
+    assert [os.path.basename(path) for path in paths] == [
+        "page-1.png",
+        "page-1-snippet-1.png",
+    ]
+    assert Path(paths[0]).read_bytes() == b"image bytes"
+    assert externalized[0]["page_image"]["url"] == "/v1/jobs/job/artifacts/page-1.png"
+    assert "data" not in externalized[0]["page_image"]
+    result = externalized[0]["results"][0]
+    assert result["snippet_url"] == "/v1/jobs/job/artifacts/page-1-snippet-1.png"
+    assert "snippet" not in result
+    assert "data" in records[0]["page_image"]
+    assert "snippet" in records[0]["results"][0]
+
+
+def test_job_artifacts_are_served_by_url(
+    client: TestClient, make_qr_pdf: QRPdfFactory
+) -> None:
+    """Test that job results reference page images served with range support."""
+    response = client.post(
+        "/v1/jobs",
+        params={"embed_page": "true", "embed_snippet": "true"},
+        files={"file": ("doc.pdf", make_qr_pdf(1), "application/pdf")},
+    )
+    job_id = response.json()["job_id"]
+    job = wait_for_job(client, job_id)
+    assert job["status"] == "completed"
+    assert "data" not in job["result_json"]["page_images"][0]
+    assert "snippet" not in job["result_json"]["results"][0]
+
+    url = job["result_json"]["page_images"][0]["url"]
+    full = client.get(url)
+    assert full.status_code == 200
+    assert full.headers["content-type"] == "image/png"
+    assert full.headers["accept-ranges"] == "bytes"
+    assert full.content.startswith(b"\x89PNG")
+
+    partial = client.get(url, headers={"Range": "bytes=1-3"})
+    assert partial.status_code == 206
+    assert partial.content == b"PNG"
+    size = len(full.content)
+    assert partial.headers["content-range"] == f"bytes 1-3/{size}"
+
+    unsatisfiable = client.get(url, headers={"Range": f"bytes={size}-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == f"bytes */{size}"
+
+    snippet_url = job["result_json"]["results"][0]["snippet_url"]
+    assert client.get(snippet_url).status_code == 200
+    assert client.get(f"/v1/jobs/{job_id}/artifacts/..%2Fjobs.db").status_code == 404
+
+    # Expired jobs take their artifact files and directory with them
+    with get_db_connection() as conn:
+        conn.execute("UPDATE jobs SET expires_at = '2000-01-01'")
+        conn.commit()
+    _cleanup_expired_jobs_sync()
+    assert not os.path.exists(os.path.dirname(job["artifact_paths"][0]))
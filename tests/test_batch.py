@@ -0,0 +1,109 @@
+"""Test batch scanning of many PDFs per request."""
+
+import io
+import tarfile
+import zipfile
+from typing import Dict
+
+from fastapi.testclient import TestClient
+
+from app.services.parallel import shutdown_process_pool
+from app.services.scanner import Scanner
+from conftest import QRPdfFactory, wait_for_job
+
+
+def _values(file_result: Dict) -> list:
+    """Return the decoded values of one file's results."""
+    return [result["value"] for result in file_result["results"]]
+
+
+def test_iter_documents_parallel_matches_serial(make_qr_pdf: QRPdfFactory) -> None:
+    """Test that pool-scanned batches match serial scanning and keep order."""
+    documents = [make_qr_pdf(pages) for pages in (1, 2, 1, 3)] + [b"not a pdf"]
+    serial = list(Scanner().iter_documents(documents))
+    try:
+        parallel = list(Scanner(workers=2).iter_documents(documents))
+    finally:
+        shutdown_process_pool()
+    assert parallel == serial
+    assert [len(records) for records, _ in serial[:4]] == [1, 2, 1, 3]
+    assert serial[4][0] is None and serial[4][1]
+
+
+def test_scan_batch_keys_results_by_file_name(
+    client: TestClient, make_qr_pdf: QRPdfFactory
+) -> None:
+    """Test a multipart batch, including a file that fails to scan."""
+    files = [
+        ("files", ("a.pdf", make_qr_pdf(1), "application/pdf")),
+        ("files", ("b.pdf", make_qr_pdf(2), "application/pdf")),
+        ("files", ("broken.pdf", b"%PDF-broken", "application/pdf")),
+    ]
+    response = client.post("/v1/scan/batch", params={"pages": "2"}, files=files)
+    assert response.status_code == 200
+    body = response.json()["files"]
+    assert list(body) == ["a.pdf", "b.pdf", "broken.pdf"]
+    assert _values(body["a.pdf"]) == []
+    assert _values(body["b.pdf"]) == ["PAGE-2"]
+    assert "error" in body["broken.pdf"]
+
+
+def test_scan_batch_accepts_archives(
+    client: TestClient, make_qr_pdf: QRPdfFactory
+) -> None:
+    """Test zip and gzipped tar archives of PDFs."""
+    zipped = io.BytesIO()
+    with zipfile.ZipFile(zipped, "w") as archive:
+        archive.writestr("labels/one.pdf", make_qr_pdf(1))
+        archive.writestr("labels/two.pdf", make_qr_pdf(2))
+        archive.writestr("README.txt", "not scanned")
+    tarred = io.BytesIO()
+    with tarfile.open(fileobj=tarred, mode="w:gz") as archive:
+        data = make_qr_pdf(1)
+        info = tarfile.TarInfo("three.pdf")
+        info.size = len(data)
+        archive.addfile(info, io.BytesIO(data))
+
+    files = [
+        ("files", ("labels.zip", zipped.getvalue(), "application/zip")),
+        ("files", ("more.tar.gz", tarred.getvalue(), "application/gzip")),
+    ]
+    body = client.post("/v1/scan/batch", files=files).json()["files"]
+    assert list(body) == ["labels/one.pdf", "labels/two.pdf", "three.pdf"]
+    assert _values(body["labels/two.pdf"]) == ["PAGE-1", "PAGE-2"]
+
+
+def test_scan_batch_rejects_bad_input(
+    client: TestClient, make_qr_pdf: QRPdfFactory
+) -> None:
+    """Test duplicate names and parts that are neither PDFs nor archives."""
+    pdf = make_qr_pdf(1)
+    files = [
+        ("files", ("a.pdf", pdf, "application/pdf")),
+        ("files", ("a.pdf", pdf, "application/pdf")),
+    ]
+    response = client.post("/v1/scan/batch", files=files)
+    assert response.status_code == 400
+    assert "Duplicate" in response.json()["detail"]
+
+    files = [("files", ("notes.txt", b"hello", "text/plain"))]
+    assert client.post("/v1/scan/batch", files=files).status_code == 400
+
+
+def test_batch_job_stores_results_per_file(
+    client: TestClient, make_qr_pdf: QRPdfFactory
+) -> None:
+    """Test that a batch job keeps artifacts of different files apart."""
+    files = [
+        ("files", ("a.pdf", make_qr_pdf(1), "application/pdf")),
+        ("files", ("b.pdf", make_qr_pdf(1), "application/pdf")),
+    ]
+    response = client.post("/v1/jobs/batch", params={"embed_page": "true"}, files=files)
+    assert response.status_code == 202
+    job = wait_for_job(client, response.json()["job_id"])
+    assert job["status"] == "completed"
+    body = job["result_json"]["files"]
+    assert _values(body["a.pdf"]) == _values(body["b.pdf"]) == ["PAGE-1"]
+    urls = [body[name]["page_images"][0]["url"] for name in ("a.pdf", "b.pdf")]
+    assert len(set(urls)) == 2
+    assert all(client.get(url).status_code == 200 for url in urls)
@@ -0,0 +1,131 @@
+"""Test the scan result cache."""
+
+import json
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db import _init_db_sync
+from app.services.cache import LRUCache, PageCache, ResultCache, make_cache_key
+from app.services.scanner import Scanner
+from conftest import QRPdfFactory
+
+
+def test_lru_cache_evicts_least_recently_used() -> None:
+    """Test entry-count eviction order."""
+    cache: LRUCache[int] = LRUCache(max_entries=2, max_bytes=100)
+    cache.put("a", 1, 1)
+    cache.put("b", 2, 1)
+    assert cache.get("a") == 1
+    cache.put("c", 3, 1)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_lru_cache_enforces_size_and_ttl() -> None:
+    """Test size-based eviction, oversized values and expiry."""
+    cache: LRUCache[str] = LRUCache(max_entries=10, max_bytes=10, ttl_sec=0.05)
+    cache.put("a", "x", 6)
+    cache.put("b", "y", 6)
+    assert cache.get("a") is None and cache.total_bytes == 6
+    cache.put("huge", "z", 11)
+    assert cache.get("huge") is None
+    time.sleep(0.06)
+    assert cache.get("b") is None and len(cache) == 0
+
+
+def test_cache_key_normalizes_symbologies() -> None:
+    """Test that symbology order does not change the key but pages do."""
+    opts = Scanner().options()
+    key = make_cache_key("pdf", [0, 1], ["QRCode", "Code128"], False, False, opts)
+    assert key == make_cache_key(
+        "pdf", [0, 1], ["Code128", "QRCode", "QRCode"], False, False, opts
+    )
+    assert key != make_cache_key("pdf", [1, 0], None, False, False, opts)
+    assert key != make_cache_key("pdf2", [0, 1], None, False, False, opts)
+
+
+def test_result_cache_disk_tier(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that entries survive in SQLite and the tier stays within budget."""
+    monkeypatch.setenv("ZF_SQLITE_URL", f"sqlite:///{tmp_path / 'jobs.db'}")
+    _init_db_sync()
+    records = [{"page": 1, "results": [{"value": "x" * 100}]}]
+    cache = ResultCache(10, 10_000, 60, disk_enabled=True, disk_max_bytes=300)
+    cache.put("a", records)
+    cache.memory.clear()
+    assert cache.get("a") == records
+
+    cache.put("b", records)
+    cache.put("c", records)
+    cache.memory.clear()
+    assert cache.get("a") is None
+    assert cache.get("c") == records
+
+
+def test_scan_route_serves_resubmissions_from_cache(
+    client: TestClient, make_qr_pdf: QRPdfFactory, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a resubmitted PDF never reaches the scanner."""
+    files = {"file": ("doc.pdf", make_qr_pdf(2), "application/pdf")}
+    first = client.post("/v1/scan", files=files)
+
+    def fail(*args: object, **kwargs: object) -> None:
+        raise AssertionError("scanner called on cache hit")
+
+    monkeypatch.setattr(Scanner, "iter_pages", fail)
+    second = client.post("/v1/scan", files=files)
+    assert second.json() == first.json()
+    streamed = client.post("/v1/scan", params={"stream": "true"}, files=files)
+    assert [json.loads(line)["page"] for line in streamed.text.splitlines()] == [1, 2]
+
+    job = client.post("/v1/jobs", files=files).json()
+    status = client.get(f"/v1/jobs/{job['job_id']}").json()
+    assert status["status"] == "completed"
+    assert status["result_json"]["results"] == first.json()["results"]
+
+
+def test_page_cache_reuses_overlapping_ranges(make_qr_pdf: QRPdfFactory) -> None:
+    """Test that only pages not seen before are decoded."""
+    pdf_bytes = make_qr_pdf(4)
+    page_cache = PageCache(max_entries=100, max_bytes=1_000_000)
+    scanner = Scanner(dpi=100, page_cache=page_cache)
+
+    first = scanner.scan_pdf(pdf_bytes, page_range=[0, 1, 2])
+    assert [s["page"] for s in scanner.page_stats] == [1, 2, 3]
+
+    scanner.page_stats.clear()
+    second = scanner.scan_pdf(pdf_bytes, page_range=[1, 2, 3])
+    assert [s["page"] for s in scanner.page_stats] == [4]
+    assert [r["value"] for r in second] == ["PAGE-2", "PAGE-3", "PAGE-4"]
+    assert second[:2] == first[1:]
+
+    scanner.page_stats.clear()
+    assert scanner.scan_pdf(pdf_bytes, symbologies=["Code128"]) == []
+    assert scanner.page_stats == []
+
+
+def test_page_cache_is_memory_bounded() -> None:
+    """Test that page entries are evicted once the byte budget is exceeded."""
+    page_cache = PageCache(
+        max_entries=100, max_bytes=3 * (PageCache.ENTRY_OVERHEAD + 2)
+    )
+    for page_idx in range(5):
+        page_cache.put("doc", page_idx, {}, None, [])
+    assert len(page_cache.entries) == 3
+    assert page_cache.get("doc", 0, {}) is None
+    assert page_cache.get("doc", 4, {}) == []
+
+
+def test_page_cache_entries_cover_only_searched_formats() -> None:
+    """Test that decodes for a format subset do not answer wider requests."""
+    page_cache = PageCache(max_entries=10, max_bytes=100_000)
+    page_cache.put("doc", 0, {}, ["QRCode"], [])
+    assert page_cache.get("doc", 0, {}, ["QRCode"]) == []
+    assert page_cache.get("doc", 0, {}, ["Code128"]) is None
+    assert page_cache.get("doc", 0, {}, None) is None
+    page_cache.put("doc", 0, {}, None, [])
+    assert page_cache.get("doc", 0, {}, ["Code128"]) == []
@@ -0,0 +1,163 @@
+"""Test the pooled SQLite job store."""
+
+import asyncio
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from app.db import (
+    BatchWriter,
+    ConnectionPool,
+    _claim_job_sync,
+    _create_job_sync,
+    _get_job_sync,
+    _init_db_sync,
+    _renew_job_lease_sync,
+    _update_job_sync,
+    close_db,
+    get_db_connection,
+    request_job_cancel,
+    update_job_status,
+)
+
+
+@pytest.fixture
+def job_db(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Path]:
+    """Initialize a job database in a temporary directory."""
+    db_path = tmp_path / "jobs.db"
+    monkeypatch.setenv("ZF_SQLITE_URL", f"sqlite:///{db_path}")
+    _init_db_sync()
+    yield db_path
+    close_db()
+
+
+def test_pool_reuses_connections_in_wal_mode(tmp_path: Path) -> None:
+    """Test that pooled connections are reused and use WAL journaling."""
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=2, busy_timeout_ms=100)
+    with pool.connection() as first:
+        assert first.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    with pool.connection() as second:
+        assert second is first
+    pool.close()
+
+
+def test_pool_blocks_beyond_its_size(tmp_path: Path) -> None:
+    """Test that no more than ``size`` connections are checked out at once."""
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=1, busy_timeout_ms=100)
+    acquired = threading.Event()
+
+    def borrow() -> None:
+        with pool.connection():
+            acquired.set()
+
+    with pool.connection():
+        thread = threading.Thread(target=borrow)
+        thread.start()
+        assert not acquired.wait(0.1)
+    thread.join()
+    assert acquired.is_set()
+    pool.close()
+
+
+def test_batch_writer_isolates_failing_statements(tmp_path: Path) -> None:
+    """Test that a failing statement only fails its own caller."""
+    db_path = str(tmp_path / "writer.db")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY)")
+    writer = BatchWriter(db_path, busy_timeout_ms=100, max_batch=16)
+    futures = [
+        writer.submit("INSERT INTO t (id) VALUES (?)", (i,)) for i in (1, 2, 1, 3)
+    ]
+    writer.close()
+
+    assert [future.exception() is None for future in futures] == [
+        True,
+        True,
+        False,
+        True,
+    ]
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute("SELECT id FROM t ORDER BY id").fetchall()
+    assert rows == [(1,), (2,), (3,)]
+
+
+def test_concurrent_job_updates_are_all_committed(job_db: Path) -> None:
+    """Test that updates from many threads are all visible after returning."""
+    job_ids = [f"job-{i}" for i in range(32)]
+    for job_id in job_ids:
+        _create_job_sync(job_id, "/tmp/input.pdf", datetime(2100, 1, 1))
+
+    threads = [
+        threading.Thread(
+            target=_update_job_sync, args=(job_id, "completed", {"results": []})
+        )
+        for job_id in job_ids
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for job_id in job_ids:
+        job = _get_job_sync(job_id)
+        assert job is not None
+        assert job["status"] == "completed"
+        assert job["result_json"] == {"results": []}
+    with get_db_connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_job_claims_follow_queue_order_and_leases(job_db: Path) -> None:
+    """Test exclusive claims by priority and owner, lease renewal and expiry."""
+    expires_at = datetime(2100, 1, 1)
+    for job_id, priority, owner in [
+        ("low", 0, "a"),
+        ("a1", 5, "a"),
+        ("a2", 5, "a"),
+        ("b1", 5, "b"),
+    ]:
+        _create_job_sync(job_id, f"/in/{job_id}", expires_at, {}, priority, owner)
+
+    claimed = [_claim_job_sync(None, "w1", 30) for _ in range(4)]
+    assert [job["id"] for job in claimed if job] == ["a1", "b1", "a2", "low"]
+    assert _claim_job_sync(None, "w2", 30) is None
+    assert _claim_job_sync("a1", "w2", 30) is None
+    assert _get_job_sync("a1")["status"] == "running"
+
+    # Only the lease holder renews, and hears of cancellation requests
+    assert _renew_job_lease_sync("a1", "w2", 30) is None
+    assert _renew_job_lease_sync("a1", "w1", 30, {"pages_done": 2}) is False
+    asyncio.run(request_job_cancel("a1"))
+    assert _renew_job_lease_sync("a1", "w1", 30) is True
+    assert _get_job_sync("a1")["progress_json"] == {"pages_done": 2}
+
+    # A lease that runs out lets another worker take the job over
+    _create_job_sync("dies", "/in/dies", expires_at, {"pages": None})
+    assert _claim_job_sync("dies", "w1", -1)["attempts"] == 1
+    job = _claim_job_sync(None, "w2", 30)
+    assert job["id"] == "dies" and job["attempts"] == 2
+    assert job["params_json"] == {"pages": None}
+    assert _renew_job_lease_sync("dies", "w1", 30) is None
+
+    # The worker that lost the lease cannot overwrite the new one's result
+    async def finish(worker: str, value: str) -> bool:
+        return await update_job_status(
+            "dies",
+            "completed",
+            {"value": value},
+            callback_url="https://example.com/hook",
+            worker=worker,
+        )
+
+    assert asyncio.run(finish("w1", "stale")) is False
+    assert _get_job_sync("dies")["status"] == "running"
+    assert asyncio.run(finish("w2", "fresh")) is True
+    assert asyncio.run(finish("w2", "again")) is False
+    assert _get_job_sync("dies")["result_json"] == {"value": "fresh"}
+    with get_db_connection() as conn:
+        outbox = conn.execute("SELECT payload_json FROM webhook_outbox").fetchall()
+    assert len(outbox) == 1 and "fresh" in outbox[0][0]
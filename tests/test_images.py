@@ -0,0 +1,55 @@
+"""Test page image encoding."""
+
+import base64
+import io
+
+import pytest
+from PIL import Image
+
+from app.services.cache import scan_response
+from app.services.images import ImageEncoding
+
+
+def test_encoding_keeps_size_without_max_px() -> None:
+    """Test that images are only downscaled when ``max_px`` is set."""
+    entry = ImageEncoding("png").encode(Image.new("RGB", (120, 80), "white"))
+    assert (entry["width"], entry["height"], entry["scale"]) == (120, 80, 1.0)
+    decoded = Image.open(io.BytesIO(base64.b64decode(entry["data"])))
+    assert decoded.format == "PNG"
+
+
+def test_encoding_downscales_longer_side() -> None:
+    """Test that downscaled previews keep the aspect ratio."""
+    encoding = ImageEncoding("jpg", quality=50, max_px=60)
+    entry = encoding.encode(Image.new("RGB", (120, 80), "white"))
+    assert entry["media_type"] == "image/jpeg"
+    assert (entry["width"], entry["height"], entry["scale"]) == (60, 40, 0.5)
+
+
+@pytest.mark.parametrize(
+    "kwargs", [{"format": "gif"}, {"quality": 0}, {"quality": 101}]
+)
+def test_encoding_rejects_invalid_options(kwargs: dict) -> None:
+    """Test that unsupported formats and qualities are rejected."""
+    with pytest.raises(ValueError):
+        ImageEncoding(**kwargs)
+
+
+def test_scan_response_lists_page_images_once() -> None:
+    """Test that the JSON result lists each page image once."""
+    image = {"id": "page-2", "page": 2, "data": "..."}
+    records = [
+        {"page": 1, "results": []},
+        {
+            "page": 2,
+            "results": [
+                {"value": "A", "page_image": "page-2"},
+                {"value": "B", "page_image": "page-2"},
+            ],
+            "page_image": image,
+        },
+    ]
+    response = scan_response(records)
+    assert [r["value"] for r in response["results"]] == ["A", "B"]
+    assert response["page_images"] == [image]
+    assert "page_images" not in scan_response(records[:1])
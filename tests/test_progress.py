@@ -0,0 +1,110 @@
+"""Test job progress publishing, long-polling and Server-Sent Events."""
+
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
+
+from fastapi.testclient import TestClient
+
+from app.services.progress import ProgressBroker
+from conftest import QRPdfFactory
+
+
+def test_broker_wakes_waiters_with_latest_snapshot() -> None:
+    """Test publish/wait semantics, coalescing and timeouts."""
+
+    async def scenario() -> None:
+        broker = ProgressBroker()
+        assert broker.snapshot("job") is None
+        assert await broker.wait("job", 0, 0.01) is None
+
+        broker.publish("job", status="pending")
+        waiter = asyncio.create_task(broker.wait("job", 1, 1.0))
+        await asyncio.sleep(0)
+        broker.publish("job", status="running", pages_done=1)
+        broker.publish("job", pages_done=2)
+        snapshot = await waiter
+        assert snapshot is not None
+        assert snapshot["status"] == "running"
+        # The waiter sees the newest snapshot, not each intermediate one
+        assert broker.snapshot("job") == {
+            "status": "running",
+            "pages_done": 2,
+            "version": 3,
+        }
+        assert await broker.wait("job", 3, 0.01) is None
+
+    asyncio.run(scenario())
+
+
+def test_broker_subscription_ends_when_job_finishes() -> None:
+    """Test that subscribers get heartbeats and stop at a terminal status."""
+
+    async def scenario() -> List[Optional[Dict[str, Any]]]:
+        broker = ProgressBroker(retention_sec=0)
+        broker.publish("job", status="running")
+        seen: List[Optional[Dict[str, Any]]] = []
+
+        async def consume() -> None:
+            async for snapshot in broker.subscribe("job", heartbeat=0.01):
+                seen.append(snapshot)
+
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.05)
+        broker.publish("job", status="completed")
+        await asyncio.wait_for(task, 1.0)
+        # Finished channels are pruned once their retention has passed
+        broker.publish("other", status="failed")
+        assert broker.snapshot("job") is None
+        return seen
+
+    seen = asyncio.run(scenario())
+    assert seen[0] is not None and seen[0]["status"] == "running"
+    assert None in seen
+    assert seen[-1] is not None and seen[-1]["status"] == "completed"
+
+
+def test_long_poll_returns_finished_job(
+    client: TestClient, make_qr_pdf: QRPdfFactory
+) -> None:
+    """Test that ``wait`` holds the request until the job completes."""
+    response = client.post(
+        "/v1/jobs", files={"file": ("doc.pdf", make_qr_pdf(3), "application/pdf")}
+    )
+    job_id = response.json()["job_id"]
+    job = client.get(f"/v1/jobs/{job_id}", params={"wait": 10}).json()
+    assert job["status"] == "completed"
+    assert len(job["result_json"]["results"]) == 3
+    assert job["progress"]["pages_done"] == job["progress"]["pages_total"] == 3
+    assert job["progress"]["barcodes"] == 3
+
+    assert client.get("/v1/jobs/missing", params={"wait": 10}).status_code == 404
+
+
+def test_events_stream_progress_until_completion(
+    client: TestClient, make_qr_pdf: QRPdfFactory
+) -> None:
+    """Test the SSE stream of a job and of an untracked job."""
+    response = client.post(
+        "/v1/jobs", files={"file": ("doc.pdf", make_qr_pdf(2), "application/pdf")}
+    )
+    job_id = response.json()["job_id"]
+    events = []
+    with client.stream("GET", f"/v1/jobs/{job_id}/events") as stream:
+        assert stream.headers["content-type"].startswith("text/event-stream")
+        event: Dict[str, Any] = {}
+        for line in stream.iter_lines():
+            if line.startswith("event: "):
+                event["event"] = line[len("event: ") :]
+            elif line.startswith("data: "):
+                event["data"] = json.loads(line[len("data: ") :])
+            elif not line and event:
+                events.append(event)
+                event = {}
+    assert events[-1]["event"] == "completed"
+    assert events[-1]["data"]["pages_done"] == 2
+    assert all(e["event"] == "progress" for e in events[:-1])
+    versions = [e["data"]["version"] for e in events]
+    assert versions == sorted(set(versions))
+
+    assert client.get("/v1/jobs/missing/events").status_code == 404
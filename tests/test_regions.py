@@ -0,0 +1,129 @@
+"""Test region-of-interest scanning and saved templates."""
+
+import io
+
+import numpy as np
+import pytest
+import zxingcpp
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.services.regions import (
+    MAX_REGION_PAGES,
+    page_boxes,
+    parse_regions,
+    validate_regions,
+)
+from app.services.scanner import Scanner
+from conftest import wait_for_job
+
+# Covers the top-left quarter of the 300x300 pt pages built below
+TOP_LEFT = "0,150,150,300"
+
+
+def create_two_label_pdf(pages: int = 1) -> bytes:
+    """Create 300x300 pt pages with a QR code in the top-left and bottom-right."""
+    images = []
+    for page_no in range(1, pages + 1):
+        page = Image.new("RGB", (300, 300), color="white")
+        for value, corner in (("TOP", (20, 20)), ("BOTTOM", (170, 170))):
+            qr = zxingcpp.write_barcode(
+                zxingcpp.BarcodeFormat.QRCode,
+                f"{value}-{page_no}",
+                width=110,
+                height=110,
+            )
+            page.paste(Image.fromarray(np.asarray(qr)), corner)
+        images.append(page)
+    pdf_bytes = io.BytesIO()
+    images[0].save(pdf_bytes, format="PDF", save_all=True, append_images=images[1:])
+    return pdf_bytes.getvalue()
+
+
+def test_parse_regions() -> None:
+    """Test the region syntax, page selection and validation."""
+    regions = parse_regions("1:400,650,612,792; 2-3:0,0,612,80;10,10,20,20")
+    assert regions == [
+        {"pages": [1], "box": [400.0, 650.0, 612.0, 792.0]},
+        {"pages": [2, 3], "box": [0.0, 0.0, 612.0, 80.0]},
+        {"pages": None, "box": [10.0, 10.0, 20.0, 20.0]},
+    ]
+    assert page_boxes(regions, 0) == [(400, 650, 612, 792), (10, 10, 20, 20)]
+    assert page_boxes(regions, 3) == [(10, 10, 20, 20)]
+    for spec in (
+        "",
+        "1,2,3",
+        "10,10,5,20",
+        "0:1,1,2,2",
+        "x:1,1,2,2",
+        "nan,0,10,10",
+        "0,0,inf,10",
+        "0,-inf,10,10",
+        "1-999999999:1,1,2,2",
+    ):
+        with pytest.raises(ValueError):
+            parse_regions(spec)
+    # Templates carry regions as JSON, where pages are already a list
+    for region in (
+        {"pages": None, "box": [0, 0, float("nan"), 10]},
+        {"pages": list(range(1, MAX_REGION_PAGES + 2)), "box": [0, 0, 10, 10]},
+    ):
+        with pytest.raises(ValueError):
+            validate_regions([region])
+
+
+def test_scanner_decodes_only_region() -> None:
+    """Test that a crop box renders less and keeps full-page coordinates."""
+    pdf = create_two_label_pdf()
+    full = Scanner(dpi=200)
+    full_results = full.scan_pdf(pdf)
+    assert sorted(r["value"] for r in full_results) == ["BOTTOM-1", "TOP-1"]
+
+    roi = Scanner(dpi=200, regions=parse_regions(TOP_LEFT))
+    results = roi.scan_pdf(pdf)
+    assert [r["value"] for r in results] == ["TOP-1"]
+    top = next(r for r in full_results if r["value"] == "TOP-1")
+    assert results[0]["position"] == top["position"]
+    assert roi.page_stats[0]["mode"] == "regions"
+    assert roi.page_stats[0]["render_pixels"] * 3 < full.page_stats[0]["render_pixels"]
+
+    # Embedding the page renders it whole but still keeps only boxed results
+    results = roi.scan_pdf(pdf, embed_page=True)
+    assert [r["value"] for r in results] == ["TOP-1"]
+
+
+def test_region_pages_without_box_are_scanned_whole() -> None:
+    """Test that a box for page 1 leaves page 2 to a full scan."""
+    roi = Scanner(dpi=200, regions=parse_regions(f"1:{TOP_LEFT}"))
+    values = [r["value"] for r in roi.scan_pdf(create_two_label_pdf(2))]
+    assert values[0] == "TOP-1"
+    assert sorted(values[1:]) == ["BOTTOM-2", "TOP-2"]
+
+
+def test_templates_api(client: TestClient) -> None:
+    """Test saving templates and scanning with regions or a template."""
+    files = {"file": ("doc.pdf", create_two_label_pdf(), "application/pdf")}
+    response = client.put("/v1/templates/corner", json={"regions": TOP_LEFT})
+    assert response.status_code == 200
+    assert client.get("/v1/templates").json()["templates"][0]["name"] == "corner"
+
+    response = client.post("/v1/scan", params={"template": "corner"}, files=files)
+    assert [r["value"] for r in response.json()["results"]] == ["TOP-1"]
+    response = client.post("/v1/scan", params={"regions": "150,0,300,150"}, files=files)
+    assert [r["value"] for r in response.json()["results"]] == ["BOTTOM-1"]
+    response = client.post("/v1/jobs", params={"template": "corner"}, files=files)
+    job = wait_for_job(client, response.json()["job_id"])
+    assert [r["value"] for r in job["result_json"]["results"]] == ["TOP-1"]
+
+    assert client.delete("/v1/templates/corner").status_code == 204
+    assert client.get("/v1/templates/corner").status_code == 404
+    response = client.post("/v1/scan", params={"template": "corner"}, files=files)
+    assert response.status_code == 404
+    response = client.post(
+        "/v1/scan", params={"template": "x", "regions": TOP_LEFT}, files=files
+    )
+    assert response.status_code == 400
+    response = client.put("/v1/templates/bad name", json={"regions": TOP_LEFT})
+    assert response.status_code == 400
+    response = client.put("/v1/templates/bad", json={"regions": "1,2"})
+    assert response.status_code == 400
@@ -0,0 +1,172 @@
+"""Test the HTTP routes."""
+
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.config import get_settings
+from conftest import QRPdfFactory, wait_for_job
+
+
+def test_settings_are_read_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that settings are shared until the cache is cleared."""
+    monkeypatch.setenv("ZF_SCAN_DPI", "150")
+    settings = get_settings()
+    monkeypatch.setenv("ZF_SCAN_DPI", "200")
+    assert get_settings() is settings
+    get_settings.cache_clear()
+    assert get_settings().scan_dpi == 200
+
+
+def test_scan_returns_results(client: TestClient, make_qr_pdf: QRPdfFactory) -> None:
+    """Test synchronous scanning through the API."""
+    response = client.post(
+        "/v1/scan",
+        files={"file": ("doc.pdf", make_qr_pdf(2), "application/pdf")},
+    )
+    assert response.status_code == 200
+    values = [r["value"] for r in response.json()["results"]]
+    assert values == ["PAGE-1", "PAGE-2"]
+
+
+def test_scan_and_jobs_stop_early(
+    client: TestClient, make_qr_pdf: QRPdfFactory
+) -> None:
+    """Test result predicates and ``stop_after`` on the scan and job routes."""
+    files = {"file": ("doc.pdf", make_qr_pdf(5), "application/pdf")}
+    params = {"match": "PAGE-[2-4]", "stop_after": "2"}
+    response = client.post("/v1/scan", params=params, files=files)
+    assert response.status_code == 200
+    assert [r["value"] for r in response.json()["results"]] == ["PAGE-2", "PAGE-3"]
+
+    response = client.post("/v1/jobs", params=params, files=files)
+    job = wait_for_job(client, response.json()["job_id"])
+    assert [r["page"] for r in job["result_json"]["results"]] == [2, 3]
+
+    response = client.post("/v1/scan", params={"match": "PAGE-("}, files=files)
+    assert response.status_code == 400
+    response = client.post("/v1/jobs", params={"match": r"(\d)\1"}, files=files)
+    assert response.status_code == 400
+    assert "Invalid match pattern" in response.json()["detail"]
+    response = client.post("/v1/scan", params={"stop_after": "-1"}, files=files)
+    assert response.status_code == 422
+
+
+def test_scan_stream_returns_ndjson_per_page(
+    client: TestClient, make_qr_pdf: QRPdfFactory
+) -> None:
+    """Test streaming scan results as one NDJSON line per page."""
+    response = client.post(
+        "/v1/scan",
+        params={"stream": "true", "pages": "2-3"},
+        files={"file": ("doc.pdf", make_qr_pdf(3), "application/pdf")},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["page"] for line in lines] == [2, 3]
+    assert lines[0]["results"][0]["value"] == "PAGE-2"
+
+
+def test_scan_stream_reports_invalid_pdf(client: TestClient) -> None:
+    """Test that scan errors are reported in-band when streaming."""
+    response = client.post(
+        "/v1/scan",
+        params={"stream": "true"},
+        files={"file": ("doc.pdf", b"not a pdf", "application/pdf")},
+    )
+    assert "error" in json.loads(response.text.splitlines()[-1])
+
+
+def test_scan_rejects_unknown_types(
+    client: TestClient, make_qr_pdf: QRPdfFactory
+) -> None:
+    """Test that unknown symbologies are rejected before scanning."""
+    response = client.post(
+        "/v1/scan",
+        params={"types": "QRCode,NotABarcode"},
+        files={"file": ("doc.pdf", make_qr_pdf(1), "application/pdf")},
+    )
+    assert response.status_code == 400
+    assert "NotABarcode" in response.json()["detail"]
+
+
+def test_scan_filters_with_type_aliases(
+    client: TestClient, make_qr_pdf: QRPdfFactory
+) -> None:
+    """Test that the types filter decodes only the requested formats."""
+    files = {"file": ("doc.pdf", make_qr_pdf(1), "application/pdf")}
+    response = client.post("/v1/scan", params={"types": "QR_CODE"}, files=files)
+    assert [r["value"] for r in response.json()["results"]] == ["PAGE-1"]
+    response = client.post("/v1/scan", params={"types": "Code128"}, files=files)
+    assert response.json()["results"] == []
+
+
+def test_scan_embeds_page_images_once_per_page(
+    client: TestClient, make_qr_pdf: QRPdfFactory
+) -> None:
+    """Test that results refer to page images listed once per page."""
+    response = client.post(
+        "/v1/scan",
+        params={"embed_page": "true", "pages": "1-2"},
+        files={"file": ("doc.pdf", make_qr_pdf(3), "application/pdf")},
+    )
+    body = response.json()
+    assert [r["page_image"] for r in body["results"]] == ["page-1", "page-2"]
+    assert [image["id"] for image in body["page_images"]] == ["page-1", "page-2"]
+    assert all(image["media_type"] == "image/png" for image in body["page_images"])
+
+
+def test_requests_and_scan_stages_are_measured(
+    client: TestClient, make_qr_pdf: QRPdfFactory, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test the request counter, stage histograms and job metrics."""
+
+    def sample(name: str, **labels: str) -> float:
+        return REGISTRY.get_sample_value(name, labels) or 0.0
+
+    before = {
+        "requests": sample(
+            "http_requests_total", method="POST", endpoint="/v1/scan", status="200"
+        ),
+        "renders": sample("scan_stage_seconds_count", stage="render"),
+        "uploads": sample("scan_stage_seconds_count", stage="upload"),
+        "writes": sample("scan_stage_seconds_count", stage="db_write"),
+        "barcodes": sample("scan_barcodes_total"),
+        "jobs": sample("job_duration_seconds_count"),
+    }
+    files = {"file": ("doc.pdf", make_qr_pdf(3), "application/pdf")}
+    # Pages cached by other tests would not be rendered again
+    monkeypatch.setenv("ZF_PAGE_CACHE_ENABLED", "false")
+    get_settings.cache_clear()
+    assert client.post("/v1/scan", files=files).status_code == 200
+    # A different document, so the job is not answered from the result cache
+    files = {"file": ("doc.pdf", make_qr_pdf(2), "application/pdf")}
+    response = client.post("/v1/jobs", files=files)
+    wait_for_job(client, response.json()["job_id"])
+
+    assert (
+        sample("http_requests_total", method="POST", endpoint="/v1/scan", status="200")
+        == before["requests"] + 1
+    )
+    assert sample(
+        "http_requests_total",
+        method="GET",
+        endpoint="/v1/jobs/{job_id}",
+        status="200",
+    )
+    assert sample("scan_stage_seconds_count", stage="render") >= before["renders"] + 3
+    assert sample("scan_stage_seconds_count", stage="upload") == before["uploads"] + 2
+    assert sample("scan_stage_seconds_count", stage="db_write") > before["writes"]
+    assert sample("scan_barcodes_total") >= before["barcodes"] + 3
+    # The worker records the job once its handler returns, just after the
+    # result is stored
+    deadline = time.monotonic() + 5
+    while sample("job_duration_seconds_count") == before["jobs"]:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert sample("job_duration_seconds_count") == before["jobs"] + 1
+    assert sample("active_jobs") == 0
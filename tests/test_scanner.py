@@ -1,21 +1,37 @@
 """Test the scanner service."""
 
-from app.services.scanner import Scanner
+from app.services.cancel import CancelToken, ScanBudgetExceeded, ScanCancelled
+from app.services.detect import find_barcode_regions, split_box
+from app.services.images import ImageEncoding
+from app.services.matching import ResultLimit, compile_match
+from app.services.parallel import (
+    StopFlag,
+    get_process_pool,
+    is_stopped,
+    prewarm_process_pool,
+    shutdown_process_pool,
+    split_pages,
+)
+from app.services.scanner import Scanner, _scan_chunk, warm_up
 import io
-from PIL import Image, ImageDraw
+import time
+import numpy as np
+import pypdfium2 as pdfium
+from PIL import Image
 import pytest
+import zxingcpp
+from typing import Any, Dict
+
+from conftest import QRPdfFactory
 
 
 def create_test_pdf_with_barcode() -> bytes:
-    """Create a test PDF with a QR code."""
-    # Create a blank image
+    """Create a test PDF with a QR code encoding ``TEST-QR``."""
+    qr = zxingcpp.write_barcode(
+        zxingcpp.BarcodeFormat.QRCode, "TEST-QR", width=100, height=100
+    )
     img = Image.new("RGB", (200, 200), color="white")
-    draw = ImageDraw.Draw(img)
-
-    # Draw a simple QR code pattern (just for testing)
-    draw.rectangle([50, 50, 150, 150], fill="black")
-    draw.rectangle([60, 60, 140, 140], fill="white")
-    draw.rectangle([70, 70, 130, 130], fill="black")
+    img.paste(Image.fromarray(np.asarray(qr)), (50, 50))
 
     # Save as PDF
     pdf_bytes = io.BytesIO()
@@ -39,8 +55,7 @@ def test_scan_pdf_with_barcodes(scanner: Scanner) -> None:
     """Test PDF scanning with barcodes."""
     pdf_bytes = create_test_pdf_with_barcode()
     results = scanner.scan_pdf(pdf_bytes)
-    assert results is not None
-    assert isinstance(results, list)
+    assert [(r["page"], r["value"]) for r in results] == [(1, "TEST-QR")]
 
 
 def test_scan_pdf_without_barcodes(scanner: Scanner) -> None:
@@ -72,15 +87,14 @@ def test_scan_pdf() -> None:
         embed_page=True,
         embed_snippet=True,
     )
-    assert isinstance(results, list)
-    if results:  # If a barcode was detected
-        result = results[0]
-        assert "page" in result
-        assert "type" in result
-        assert "value" in result
-        assert "position" in result
-        assert "page_image" in result
-        assert "snippet" in result
+    assert len(results) == 1
+    result = results[0]
+    assert "page" in result
+    assert "type" in result
+    assert "value" in result
+    assert "position" in result
+    assert "page_image" in result
+    assert "snippet" in result
 
 
 def test_scan_pdf_invalid_page() -> None:
@@ -104,3 +118,388 @@ def test_scan_pdf_filter_symbology() -> None:
     )
     assert isinstance(results, list)
     assert len(results) == 0
+
+
+def test_split_pages_is_contiguous_and_balanced() -> None:
+    """Test splitting a page range into runs for the process pool."""
+    runs = split_pages(list(range(10)), 3)
+    assert runs == [[0, 1, 2, 3], [4, 5, 6], [7, 8, 9]]
+    assert split_pages([4, 7], 8) == [[4], [7]]
+
+
+def test_scan_pdf_parallel_matches_serial(make_qr_pdf: QRPdfFactory) -> None:
+    """Test that the process pool engine returns results in page order."""
+    pdf_bytes = make_qr_pdf(5)
+    warm_up()
+    serial = Scanner(dpi=100).scan_pdf(pdf_bytes)
+    try:
+        prewarm_process_pool(2)
+        # Every worker is started before the first scan is submitted
+        assert len(get_process_pool(2)._processes) == 2
+        parallel = Scanner(dpi=100, workers=2).scan_pdf(pdf_bytes)
+    finally:
+        shutdown_process_pool()
+    assert [r["value"] for r in serial] == [f"PAGE-{i}" for i in range(1, 6)]
+    assert parallel == serial
+
+
+def test_result_limit_filters_and_counts() -> None:
+    """Test value patterns, one result per page and the overall limit."""
+    page = [{"value": v} for v in ("INV-7", "SHIP-1", "SHIP-2")]
+    limit = ResultLimit(stop_after=2, match=r"^SHIP-\d$")
+    assert [r["value"] for r in limit.take(page)] == ["SHIP-1", "SHIP-2"]
+    assert limit.done
+    limit = ResultLimit(stop_after=2, first_match_per_page=True, match="SHIP")
+    assert [r["value"] for r in limit.take(page)] == ["SHIP-1"]
+    assert not limit.done
+    assert [r["value"] for r in limit.take(page)] == ["SHIP-1"]
+    assert limit.done
+
+
+@pytest.mark.parametrize("pattern", [r"(\d)\1", "(?=A)B", "PAGE-(", "A" * 300])
+def test_compile_match_refuses_patterns(pattern: str) -> None:
+    """Test that backreferences, lookaround and overlong patterns are refused."""
+    with pytest.raises(ValueError):
+        compile_match(pattern)
+
+
+@pytest.mark.parametrize(
+    "pattern, miss, hit",
+    [
+        (r".*.*.*.*.*.*.*.*.*.*x", "1" * 60, "1x"),
+        (r"\d*\d*\d*\d*\d*y", "1" * 300, "1y"),
+        (r"(a+)+$", "a" * 5000 + "!", "aa"),
+        (r"[A-Z]+(?:-[0-9]+)+", "X-" * 5000, "SHIP-1-2"),
+        (r"^(ab?)+$", "ab" * 2500 + "!", "abaab"),
+    ],
+)
+def test_compile_match_runs_in_linear_time(pattern: str, miss: str, hit: str) -> None:
+    """Test that patterns which backtrack badly in ``re`` are accepted and fast."""
+    compiled = compile_match(pattern)
+    assert compiled is not None
+    start = time.perf_counter()
+    assert compiled.search(miss) is None
+    assert time.perf_counter() - start < 0.5
+    assert compiled.search(hit) is not None
+
+
+def test_scan_pdf_stops_after_enough_results(make_qr_pdf: QRPdfFactory) -> None:
+    """Test that pages after the one completing ``stop_after`` are not scanned."""
+    pdf_bytes = make_qr_pdf(6)
+    scanner = Scanner(dpi=100, stop_after=2)
+    assert [r["value"] for r in scanner.scan_pdf(pdf_bytes)] == ["PAGE-1", "PAGE-2"]
+    assert len(scanner.page_stats) == 2
+
+    scanner = Scanner(dpi=100, stop_after=1, match="PAGE-[45]")
+    records = list(scanner.iter_records(pdf_bytes))
+    assert [len(record["results"]) for record in records] == [0, 0, 0, 1]
+    assert records[-1]["results"][0]["value"] == "PAGE-4"
+    assert len(scanner.page_stats) == 4
+
+
+def test_scan_pdf_parallel_stops_pages_in_flight(make_qr_pdf: QRPdfFactory) -> None:
+    """Test that a satisfied parallel scan leaves the remaining pages alone."""
+    pdf_bytes = make_qr_pdf(12)
+    try:
+        scanner = Scanner(dpi=100, workers=2, stop_after=1)
+        assert [r["value"] for r in scanner.scan_pdf(pdf_bytes)] == ["PAGE-1"]
+        assert len(scanner.page_stats) < 12
+
+        # Runs already in a worker end at the next page once stopped
+        stop = StopFlag()
+        assert not is_stopped(stop.path)
+        stop.stop()
+        assert is_stopped(stop.path)
+        options = Scanner(dpi=100).options()
+        pages, _ = _scan_chunk(pdf_bytes, [0, 1], options, None, False, False)
+        assert len(pages) == 2
+        pages, _ = _scan_chunk(
+            pdf_bytes, [0, 1], options, None, False, False, stop.path
+        )
+        assert pages == []
+    finally:
+        shutdown_process_pool()
+
+
+def test_cancel_token_stops_scan_between_pages(make_qr_pdf: QRPdfFactory) -> None:
+    """Test cancelling a scan and running out of its page or time budget."""
+    pdf_bytes = make_qr_pdf(4)
+    token = CancelToken()
+    records = Scanner(dpi=100, cancel=token).iter_records(pdf_bytes)
+    assert next(records)["results"][0]["value"] == "PAGE-1"
+    token.cancel()
+    with pytest.raises(ScanCancelled, match="Scan cancelled"):
+        next(records)
+
+    token = CancelToken(max_pages=2)
+    scanner = Scanner(dpi=100, cancel=token)
+    with pytest.raises(ScanBudgetExceeded, match="Page budget of 2 pages"):
+        scanner.scan_pdf(pdf_bytes)
+    assert len(scanner.page_stats) == 2
+
+    with pytest.raises(ScanBudgetExceeded, match="Time budget"):
+        Scanner(dpi=100, cancel=CancelToken(timeout=1e-9)).scan_pdf(pdf_bytes)
+
+
+def test_cancel_token_stops_tiled_page() -> None:
+    """Test that a page decoded in tiles stops at the next tile."""
+
+    class CancelOnCheck(CancelToken):
+        checks = 0
+
+        def check(self) -> None:
+            self.checks += 1
+            if self.checks == 4:
+                self.cancel()
+            super().check()
+
+    token = CancelOnCheck()
+    scanner = Scanner(dpi=100, tile_max_px=400_000, cancel=token)
+    with pytest.raises(ScanCancelled):
+        scanner.scan_pdf(create_large_page_pdf())
+    assert token.checks == 4
+
+
+def test_find_barcode_regions_ignores_blank_page() -> None:
+    """Test that the preview detector finds nothing on an empty page."""
+    assert find_barcode_regions(np.full((200, 200), 255, dtype=np.uint8)) == []
+
+
+def test_find_barcode_regions_finds_bars() -> None:
+    """Test that the preview detector boxes a patch of vertical bars."""
+    gray = np.full((200, 300), 255, dtype=np.uint8)
+    gray[80:140, 100:220:2] = 0
+    ((left, top, right, bottom),) = find_barcode_regions(gray)
+    assert left <= 100 and right >= 216
+    assert top <= 80 and bottom >= 128
+
+
+def test_scan_pdf_adaptive_matches_full(make_qr_pdf: QRPdfFactory) -> None:
+    """Test that adaptive DPI finds the same barcodes as full renders."""
+    pdf_bytes = make_qr_pdf(2)
+    full = Scanner(dpi=150).scan_pdf(pdf_bytes)
+    scanner = Scanner(dpi=150, adaptive=True, preview_dpi=72)
+    adaptive = scanner.scan_pdf(pdf_bytes)
+    assert [(r["value"], r["position"]) for r in adaptive] == [
+        (r["value"], r["position"]) for r in full
+    ]
+    assert [s["mode"] for s in scanner.page_stats] == ["adaptive", "adaptive"]
+    assert all(s["render_ms"] > 0 for s in scanner.page_stats)
+
+
+def test_scan_pdf_adaptive_falls_back_without_candidates() -> None:
+    """Test that pages without preview candidates are rendered in full."""
+    img = Image.new("RGB", (200, 200), color="white")
+    pdf_bytes = io.BytesIO()
+    img.save(pdf_bytes, format="PDF")
+    scanner = Scanner(dpi=150, adaptive=True)
+    assert scanner.scan_pdf(pdf_bytes.getvalue()) == []
+    assert scanner.page_stats[0]["mode"] == "fallback"
+
+
+def create_large_page_pdf() -> bytes:
+    """Create a 15x15 inch page with QR codes, several across tile seams."""
+    page = Image.new("RGB", (1500, 1500), color="white")
+    for i, (x, y) in enumerate([(20, 20), (400, 120), (560, 560), (1300, 900)]):
+        qr = zxingcpp.write_barcode(
+            zxingcpp.BarcodeFormat.QRCode, f"TILE-{i}", width=150, height=150
+        )
+        page.paste(Image.fromarray(np.asarray(qr)), (x, y))
+    pdf_bytes = io.BytesIO()
+    page.save(pdf_bytes, format="PDF", resolution=100)
+    return pdf_bytes.getvalue()
+
+
+def test_split_box_covers_with_overlap() -> None:
+    """Test that tiles cover the box and overlap by at least the overlap."""
+    tiles = split_box((0, 0, 1000, 500), 300, 50)
+    assert sorted({(x, r) for x, _, r, _ in tiles}) == [
+        (0, 287.5),
+        (237.5, 525),
+        (475, 762.5),
+        (712.5, 1000),
+    ]
+    assert sorted({(y, b) for _, y, _, b in tiles}) == [(0, 275), (225, 500)]
+    assert split_box((0, 0, 100, 100), 300, 50) == [(0, 0, 100, 100)]
+    assert split_box((0, 0, 1000, 500), 1000, 50, 300) == [
+        (0, 0, 1000, 275),
+        (0, 225, 1000, 500),
+    ]
+
+
+@pytest.mark.parametrize("threads", [1, 2])
+def test_scan_pdf_tiled_matches_full(threads: int) -> None:
+    """Test that tiled decoding stays in budget and reports seams once."""
+    pdf_bytes = create_large_page_pdf()
+    full = Scanner(dpi=100).scan_pdf(pdf_bytes)
+    assert len(full) == 4
+    scanner = Scanner(
+        dpi=100, tile_max_px=400_000, tile_overlap_pt=144, tile_threads=threads
+    )
+    tiled = scanner.scan_pdf(pdf_bytes)
+
+    def key(result: Dict[str, Any]) -> Any:
+        return result["value"], sorted(result["position"].items())
+
+    assert sorted(map(key, tiled)) == sorted(map(key, full))
+    stats = scanner.page_stats[0]
+    assert stats["mode"] == "tiled" and stats["tiles"] == 16
+    assert 0 < stats["peak_pixels"] <= 400_000
+
+    # Snippets are cut from the tile each barcode was decoded in
+    tiled = scanner.scan_pdf(pdf_bytes, embed_snippet=True)
+    assert len(tiled) == 4 and all(r["snippet"] for r in tiled)
+
+
+def test_scan_pdf_tiled_redecodes_seams() -> None:
+    """Test that a linear barcode longer than the tile overlap is read whole."""
+    page = Image.new("L", (1500, 1500), color=255)
+    wide = zxingcpp.write_barcode(
+        zxingcpp.BarcodeFormat.Code128, "SEAM-128-WIDE", width=1000, height=120
+    )
+    page.paste(Image.fromarray(np.asarray(wide)), (250, 1150))
+    buffer = io.BytesIO()
+    page.save(buffer, format="PDF", resolution=100)
+    pdf_bytes = buffer.getvalue()
+
+    full = Scanner(dpi=100).scan_pdf(pdf_bytes)
+    assert [r["value"] for r in full] == ["SEAM-128-WIDE"]
+    scanner = Scanner(dpi=100, tile_max_px=400_000, tile_overlap_pt=144)
+    tiled = scanner.scan_pdf(pdf_bytes)
+    assert [r["value"] for r in tiled] == ["SEAM-128-WIDE"]
+    # Linear barcodes are sampled on rows spread over the rendered height, so
+    # only their vertical extent depends on the size of the render
+    position, expected = tiled[0]["position"], full[0]["position"]
+    assert (position["x"], position["width"]) == (expected["x"], expected["width"])
+    assert position["y"] == pytest.approx(expected["y"], abs=2)
+    assert position["height"] == pytest.approx(expected["height"], abs=2)
+    stats = scanner.page_stats[0]
+    assert stats["tiles"] == 16 and stats["seam_regions"] == 1
+    assert stats["peak_pixels"] <= 400_000
+
+    # Seam regions over the budget are cut into strips along the bars
+    scanner = Scanner(dpi=100, tile_max_px=160_000, tile_overlap_pt=72)
+    assert [r["value"] for r in scanner.scan_pdf(pdf_bytes)] == ["SEAM-128-WIDE"]
+    assert scanner.page_stats[0]["peak_pixels"] <= 160_000
+
+
+def create_scanned_pdf(mode: str) -> bytes:
+    """Create a 150 DPI "scan" of a page with two QR codes in image ``mode``."""
+    page = Image.new("RGB", (1275, 1650), color="white")
+    for i, (x, y) in enumerate([(100, 100), (900, 1300)]):
+        qr = zxingcpp.write_barcode(
+            zxingcpp.BarcodeFormat.QRCode, f"SCAN-{i}", width=240, height=240
+        )
+        page.paste(Image.fromarray(np.asarray(qr)), (x, y))
+    pdf_bytes = io.BytesIO()
+    page.convert(mode).save(pdf_bytes, format="PDF", resolution=150)
+    return pdf_bytes.getvalue()
+
+
+@pytest.mark.parametrize("mode", ["1", "L", "RGB"])
+def test_scan_pdf_native_image_matches_render(mode: str) -> None:
+    """Test that embedded images decode in place of a render at the same spots."""
+    pdf_bytes = create_scanned_pdf(mode)
+    rendered = Scanner(dpi=300).scan_pdf(pdf_bytes)
+    scanner = Scanner(dpi=300, native_images=True)
+    native = scanner.scan_pdf(pdf_bytes, embed_snippet=True)
+    assert scanner.page_stats[0]["mode"] == "image"
+    assert scanner.page_stats[0]["render_pixels"] == 1275 * 1650
+    assert [r["value"] for r in native] == [r["value"] for r in rendered]
+    for a, b in zip(native, rendered):
+        for key, value in a["position"].items():
+            assert abs(value - b["position"][key]) <= 2
+    assert all(r["snippet"] for r in native)
+
+
+def test_scan_pdf_native_image_falls_back_on_mixed_content() -> None:
+    """Test that pages with more than the scanned image are rendered."""
+    doc = pdfium.PdfDocument(create_scanned_pdf("L"))
+    page = doc[0]
+    rect = pdfium.raw.FPDFPageObj_CreateNewRect(10, 10, 50, 50)
+    pdfium.raw.FPDFPath_SetDrawMode(rect, pdfium.raw.FPDF_FILLMODE_ALTERNATE, 0)
+    pdfium.raw.FPDFPage_InsertObject(page.raw, rect)
+    page.gen_content()
+    pdf_bytes = io.BytesIO()
+    doc.save(pdf_bytes)
+
+    scanner = Scanner(dpi=150, native_images=True)
+    results = scanner.scan_pdf(pdf_bytes.getvalue())
+    assert [r["value"] for r in results] == ["SCAN-0", "SCAN-1"]
+    assert scanner.page_stats[0]["mode"] == "full"
+
+
+def test_render_returns_grayscale_view_without_embeds(
+    make_qr_pdf: QRPdfFactory,
+) -> None:
+    """Test that decoding renders into a one-byte-per-pixel NumPy view."""
+    doc = pdfium.PdfDocument(make_qr_pdf(1))
+    gray = Scanner._render(doc[0], 100 / 72)
+    assert isinstance(gray, np.ndarray)
+    assert gray.dtype == np.uint8 and gray.ndim == 2
+    color = Scanner._render(doc[0], 100 / 72, color=True)
+    assert isinstance(color, Image.Image)
+    assert color.size == (gray.shape[1], gray.shape[0])
+
+
+def test_scan_pdf_grayscale_matches_embedding_path(
+    make_qr_pdf: QRPdfFactory,
+) -> None:
+    """Test that grayscale decoding finds the same barcodes as color renders."""
+    scanner = Scanner(dpi=150)
+    pdf_bytes = make_qr_pdf(2)
+    plain = scanner.scan_pdf(pdf_bytes)
+    embedded = scanner.scan_pdf(pdf_bytes, embed_snippet=True)
+    assert [(r["value"], r["position"]) for r in plain] == [
+        (r["value"], r["position"]) for r in embedded
+    ]
+    assert all("snippet" in r for r in embedded)
+
+
+def create_pdf_with_qr_codes_on_one_page(count: int) -> bytes:
+    """Create a single-page PDF with ``count`` QR codes encoding ``LABEL-<n>``."""
+    page = Image.new("RGB", (300, 150 * count), color="white")
+    for i in range(count):
+        qr = zxingcpp.write_barcode(
+            zxingcpp.BarcodeFormat.QRCode, f"LABEL-{i}", width=120, height=120
+        )
+        page.paste(Image.fromarray(np.asarray(qr)), (20, 15 + 150 * i))
+    pdf_bytes = io.BytesIO()
+    page.save(pdf_bytes, format="PDF")
+    return pdf_bytes.getvalue()
+
+
+def test_iter_records_encodes_page_image_once(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that results on one page share a single encoded page image."""
+    calls = []
+    encode = ImageEncoding.encode
+
+    def counting_encode(self: ImageEncoding, image: Image.Image) -> Dict[str, Any]:
+        calls.append(image.size)
+        return encode(self, image)
+
+    monkeypatch.setattr(ImageEncoding, "encode", counting_encode)
+    scanner = Scanner(dpi=150, image_format="webp", image_max_px=200)
+    records = list(
+        scanner.iter_records(create_pdf_with_qr_codes_on_one_page(3), embed_page=True)
+    )
+    assert len(calls) == 1
+    [record] = records
+    assert len(record["results"]) == 3
+    assert {r["page_image"] for r in record["results"]} == {"page-1"}
+    page_image = record["page_image"]
+    assert page_image["id"] == "page-1"
+    assert page_image["media_type"] == "image/webp"
+    assert max(page_image["width"], page_image["height"]) == 200
+    assert page_image["scale"] == pytest.approx(200 / max(calls[0]))
+
+
+def test_iter_records_skips_page_images_without_results() -> None:
+    """Test that pages without matches carry no page image."""
+    blank = Image.new("RGB", (300, 300), color="white")
+    pdf_bytes = io.BytesIO()
+    blank.save(pdf_bytes, format="PDF")
+    records = list(Scanner(dpi=150).iter_records(pdf_bytes.getvalue(), embed_page=True))
+    assert records == [{"page": 1, "results": []}]
@@ -0,0 +1,317 @@
+"""Test the job scheduler and the asynchronous job routes."""
+
+import asyncio
+import json
+import signal
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import get_settings
+from app.db import _create_job_sync, _init_db_sync, close_db
+from app.exceptions import QueueFullError
+from app.services.scheduler import JobScheduler, QueuedJob
+from conftest import QRPdfFactory, create_multipage_pdf_with_qr_codes, wait_for_job
+
+
+def run_queued(jobs: List[QueuedJob]) -> List[str]:
+    """Queue ``jobs`` on a one-worker scheduler and return the run order."""
+    order: List[str] = []
+
+    async def scenario() -> None:
+        async def handler(job: QueuedJob) -> None:
+            order.append(job.job_id)
+
+        scheduler = JobScheduler(handler)
+        for job in jobs:
+            scheduler.submit(job, reserved=False)
+        scheduler.start(workers=1, max_queued=10)
+        while scheduler.depth or len(order) < len(jobs):
+            await asyncio.sleep(0.001)
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+    return order
+
+
+def test_scheduler_runs_higher_priorities_first() -> None:
+    """Test that priority wins over submission order."""
+    order = run_queued(
+        [
+            QueuedJob("low", priority=0),
+            QueuedJob("high", priority=5),
+            QueuedJob("mid", priority=2),
+        ]
+    )
+    assert order == ["high", "mid", "low"]
+
+
+def test_scheduler_alternates_between_owners() -> None:
+    """Test that a flooding owner does not starve others at equal priority."""
+    jobs = [QueuedJob(f"a{i}", owner="a") for i in range(3)]
+    jobs += [QueuedJob(f"b{i}", owner="b") for i in range(2)]
+    assert run_queued(jobs) == ["a0", "b0", "a1", "b1", "a2"]
+
+
+def test_scheduler_cancels_queued_jobs() -> None:
+    """Test that a cancelled job is skipped and frees its queue slot."""
+
+    async def scenario() -> List[str]:
+        order: List[str] = []
+
+        async def handler(job: QueuedJob) -> None:
+            order.append(job.job_id)
+
+        scheduler = JobScheduler(handler)
+        for job_id in ("a", "b", "c"):
+            scheduler.submit(QueuedJob(job_id), reserved=False)
+        cancelled = scheduler.cancel("b")
+        assert cancelled is not None and cancelled.job_id == "b"
+        assert scheduler.cancel("b") is None
+        assert scheduler.depth == 2
+        scheduler.start(workers=1, max_queued=10)
+        while len(order) < 2:
+            await asyncio.sleep(0.001)
+        # The worker woken for the cancelled job's slot waits for the next
+        scheduler.submit(QueuedJob("d"), reserved=False)
+        while len(order) < 3:
+            await asyncio.sleep(0.001)
+        await scheduler.stop()
+        return order
+
+    assert asyncio.run(scenario()) == ["a", "c", "d"]
+
+
+def test_scheduler_rejects_when_full() -> None:
+    """Test admission control, including slots held by reservations."""
+
+    async def handler(job: QueuedJob) -> None:
+        pass
+
+    scheduler = JobScheduler(handler)
+    scheduler.max_queued = 2
+    scheduler.reserve()
+    scheduler.submit(QueuedJob("a"))
+    scheduler.reserve()
+    with pytest.raises(QueueFullError) as excinfo:
+        scheduler.reserve()
+    assert excinfo.value.status_code == 429
+    assert int(excinfo.value.headers["Retry-After"]) >= 1
+    scheduler.release()
+    scheduler.reserve()
+
+
+def test_jobs_route_returns_before_scan_and_completes(
+    client: TestClient, make_qr_pdf: QRPdfFactory
+) -> None:
+    """Test that queued jobs are scanned in the background."""
+    response = client.post(
+        "/v1/jobs",
+        params={"priority": 3},
+        files={"file": ("doc.pdf", make_qr_pdf(2), "application/pdf")},
+    )
+    assert response.status_code == 202
+    job = wait_for_job(client, response.json()["job_id"])
+    assert job["status"] == "completed"
+    assert [r["value"] for r in job["result_json"]["results"]] == [
+        "PAGE-1",
+        "PAGE-2",
+    ]
+    assert job["priority"] == 3
+
+
+def test_jobs_route_rejects_when_queue_is_full(
+    client: TestClient, make_qr_pdf: QRPdfFactory, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a full queue answers 429 with Retry-After."""
+    from app.routes.jobs import scheduler
+
+    monkeypatch.setattr(scheduler, "max_queued", 0)
+    response = client.post(
+        "/v1/jobs", files={"file": ("doc.pdf", make_qr_pdf(1), "application/pdf")}
+    )
+    assert response.status_code == 429
+    assert response.json()["detail"] == "Job queue is full, retry later"
+    assert "retry-after" in response.headers
+
+
+def test_jobs_are_cancelled_and_budgeted(
+    client: TestClient, make_qr_pdf: QRPdfFactory, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test cancelling queued and running jobs and failing jobs over budget."""
+    monkeypatch.setenv("ZF_SCAN_DPI", "600")
+    monkeypatch.setenv("ZF_NATIVE_IMAGES", "false")
+    monkeypatch.setenv("ZF_RESULT_CACHE_ENABLED", "false")
+    files = {"file": ("doc.pdf", make_qr_pdf(40), "application/pdf")}
+    running = client.post("/v1/jobs", files=files).json()["job_id"]
+    queued = client.post("/v1/jobs", files=files).json()["job_id"]
+
+    # The second job waits behind the first on the single worker
+    response = client.delete(f"/v1/jobs/{queued}")
+    assert response.status_code == 200
+    assert client.get(f"/v1/jobs/{queued}").json()["status"] == "cancelled"
+
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        job = client.get(f"/v1/jobs/{running}").json()
+        if job.get("progress", {}).get("pages_done"):
+            break
+        time.sleep(0.01)
+    assert client.delete(f"/v1/jobs/{running}").status_code == 202
+    job = wait_for_job(client, running)
+    assert job["status"] == "cancelled"
+    assert job["progress"]["pages_done"] < 40
+    assert client.delete(f"/v1/jobs/{running}").status_code == 400
+    assert client.delete("/v1/jobs/unknown").status_code == 404
+
+    monkeypatch.setenv("ZF_SCAN_DPI", "100")
+    response = client.post("/v1/jobs", params={"max_pages": 2}, files=files)
+    job = wait_for_job(client, response.json()["job_id"])
+    assert job["status"] == "failed"
+    assert job["result_json"]["error"] == "Page budget of 2 pages exceeded"
+
+
+def test_jobs_are_private_to_their_api_key(
+    client: TestClient, make_qr_pdf: QRPdfFactory, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that another key can neither see nor cancel a job."""
+    monkeypatch.setenv("ZF_AUTH_ENABLED", "true")
+    monkeypatch.setenv("ZF_API_KEYS", '["key-a", "key-b"]')
+    get_settings.cache_clear()
+    owner, other = {"X-API-Key": "key-a"}, {"X-API-Key": "key-b"}
+    files = {"file": ("doc.pdf", make_qr_pdf(1), "application/pdf")}
+    job_id = client.post("/v1/jobs", files=files, headers=owner).json()["job_id"]
+
+    for path in (f"/v1/jobs/{job_id}", f"/v1/jobs/{job_id}/events"):
+        assert client.get(path, headers=other).status_code == 404
+        assert client.get(path, params={"wait": 1}, headers=other).status_code == 404
+    assert client.delete(f"/v1/jobs/{job_id}", headers=other).status_code == 404
+
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        job = client.get(f"/v1/jobs/{job_id}", headers=owner).json()
+        if job["status"] == "completed":
+            break
+        time.sleep(0.02)
+    assert job["status"] == "completed"
+    assert client.get(f"/v1/jobs/{job_id}", headers=other).status_code == 404
+
+
+@pytest.fixture
+def interrupted_jobs(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    """Leave one recoverable and one unrecoverable job in the job store."""
+    monkeypatch.setenv("ZF_SQLITE_URL", f"sqlite:///{tmp_path / 'jobs.db'}")
+    _init_db_sync()
+    input_path = tmp_path / "input.pdf"
+    input_path.write_bytes(create_multipage_pdf_with_qr_codes(1))
+    params = {"pages": None, "types": None, "embed_page": False, "embed_snippet": False}
+    _create_job_sync("recoverable", str(input_path), datetime(2100, 1, 1), params)
+    _create_job_sync("lost", str(tmp_path / "gone.pdf"), datetime(2100, 1, 1), params)
+    close_db()
+    yield
+
+
+def test_interrupted_jobs_are_recovered_on_startup(
+    interrupted_jobs: None, client: TestClient
+) -> None:
+    """Test that pending jobs are re-queued and lost inputs fail cleanly."""
+    recovered = wait_for_job(client, "recoverable")
+    assert recovered["status"] == "completed"
+    assert recovered["result_json"]["results"][0]["value"] == "PAGE-1"
+    lost = client.get("/v1/jobs/lost").json()
+    assert lost["status"] == "failed"
+    assert "lost" in json.dumps(lost["result_json"])
+
+
+@pytest.fixture
+def shared_queue(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Configure an API-only replica of a shared queue with fast leases."""
+    for name, value in {
+        "ZF_JOB_QUEUE": "shared",
+        "ZF_RUN_JOB_WORKERS": "false",
+        "ZF_JOB_POLL_SEC": "0.05",
+        "ZF_JOB_HEARTBEAT_SEC": "0.1",
+        "ZF_JOB_LEASE_SEC": "1",
+        "ZF_UPLOAD_DIR": str(tmp_path),
+        "ZF_RESULT_CACHE_ENABLED": "false",
+        "ZF_PREWARM_WORKERS": "false",
+        "ZF_LOG_LEVEL": "WARNING",
+    }.items():
+        monkeypatch.setenv(name, value)
+
+
+def start_worker() -> "subprocess.Popen[bytes]":
+    """Start a standalone job worker with the test's environment."""
+    backend = Path(__file__).parent.parent / "backend"
+    return subprocess.Popen([sys.executable, "-m", "app.worker"], cwd=backend)
+
+
+def wait_until_running(client: TestClient, job_id: str) -> Dict[str, Any]:
+    """Poll a job until a worker has claimed it."""
+    deadline = time.monotonic() + 30
+    while True:
+        job: Dict[str, Any] = client.get(f"/v1/jobs/{job_id}").json()
+        if job["status"] != "pending" or time.monotonic() > deadline:
+            return job
+        time.sleep(0.02)
+
+
+def test_shared_queue_runs_jobs_on_worker_processes(
+    shared_queue: None,
+    client: TestClient,
+    make_qr_pdf: QRPdfFactory,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that worker processes share the queue and take over dead workers."""
+    monkeypatch.setenv("ZF_SCAN_DPI", "600")
+    monkeypatch.setenv("ZF_NATIVE_IMAGES", "false")
+    files = {"file": ("doc.pdf", make_qr_pdf(2), "application/pdf")}
+    long_files = {"file": ("long.pdf", make_qr_pdf(20), "application/pdf")}
+
+    # The API replica only queues; queued jobs are cancelled in the store
+    first = client.post("/v1/jobs", files=files).json()["job_id"]
+    dropped = client.post("/v1/jobs", files=files).json()["job_id"]
+    assert client.delete(f"/v1/jobs/{dropped}").status_code == 200
+    job = client.get(f"/v1/jobs/{first}", params={"wait": 0.2}).json()
+    assert job["status"] == "pending"
+
+    workers = [start_worker(), start_worker()]
+    try:
+        more = [client.post("/v1/jobs", files=files).json()["job_id"] for _ in range(3)]
+        for job_id in [first, *more]:
+            job = client.get(f"/v1/jobs/{job_id}", params={"wait": 30}).json()
+            assert job["status"] == "completed"
+            assert [r["value"] for r in job["result_json"]["results"]] == [
+                "PAGE-1",
+                "PAGE-2",
+            ]
+            assert job["attempts"] == 1
+        assert client.get(f"/v1/jobs/{dropped}").json()["status"] == "cancelled"
+
+        # A job running in a worker is cancelled at its next heartbeat
+        job_id = client.post("/v1/jobs", files=long_files).json()["job_id"]
+        assert wait_until_running(client, job_id)["status"] == "running"
+        assert client.delete(f"/v1/jobs/{job_id}").status_code == 202
+        assert wait_for_job(client, job_id, 30)["status"] == "cancelled"
+
+        # The job of a worker that died is run again once its lease ends
+        job_id = client.post("/v1/jobs", files=long_files).json()["job_id"]
+        job = wait_until_running(client, job_id)
+        owner = next(w for w in workers if job["lease_owner"].endswith(f"-{w.pid}"))
+        owner.kill()
+        job = wait_for_job(client, job_id, 60)
+        assert job["status"] == "completed" and job["attempts"] == 2
+        assert len(job["result_json"]["results"]) == 20
+    finally:
+        for worker in workers:
+            if worker.poll() is None:
+                worker.send_signal(signal.SIGTERM)
+        for worker in workers:
+            worker.wait(30)
+    assert [w.returncode for w in workers].count(0) == 1
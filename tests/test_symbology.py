@@ -0,0 +1,40 @@
+"""Test the symbology registry."""
+
+import pytest
+import zxingcpp
+
+from app.exceptions import UnsupportedSymbologyError
+from app.services.symbology import format_mask, resolve_symbologies, symbology_name
+
+
+def test_resolve_symbologies_accepts_aliases() -> None:
+    """Test that spelling variants resolve to canonical zxing-cpp names."""
+    assert resolve_symbologies(["QR_CODE", "code-128", "BarcodeFormat.EAN13"]) == [
+        "Code128",
+        "EAN13",
+        "QRCode",
+    ]
+    assert resolve_symbologies(None) is None
+    assert resolve_symbologies([""]) is None
+
+
+def test_resolve_symbologies_expands_groups() -> None:
+    """Test that format groups expand to their member symbologies."""
+    matrix = resolve_symbologies(["MatrixCodes"])
+    assert matrix is not None
+    assert "QRCode" in matrix and "DataMatrix" in matrix
+    assert "Code128" not in matrix
+
+
+def test_resolve_symbologies_rejects_unknown_names() -> None:
+    """Test that unknown names are reported together."""
+    with pytest.raises(UnsupportedSymbologyError) as exc_info:
+        resolve_symbologies(["QRCode", "Foo", "Bar"])
+    assert exc_info.value.status_code == 400
+    assert exc_info.value.names == ["Foo", "Bar"]
+
+
+def test_format_mask_and_result_names() -> None:
+    """Test building decoder masks and mapping result types back."""
+    assert str(format_mask(["Code128", "QRCode"])) == "Code128|QRCode"
+    assert symbology_name(str(zxingcpp.BarcodeFormat.QRCode)) == "QRCode"
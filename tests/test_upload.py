@@ -0,0 +1,135 @@
+"""Test spooling of uploads to disk and the upload size limit."""
+
+import io
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from app.config import Settings, get_settings
+from app.dependencies.upload import _copy_to_spool, _FormSpooler, _SpoolWriter
+from app.middleware import UploadLimitMiddleware
+from app.services.cache import hash_document
+from app.services.scanner import Scanner
+from conftest import QRPdfFactory, wait_for_job
+
+
+def test_copy_to_spool_hashes_while_copying(tmp_path: Path) -> None:
+    """Test that the spool file and its hash match the upload."""
+    settings = Settings(upload_dir=str(tmp_path))
+    data = b"%PDF-1.4" + b"x" * 3_000_000
+    upload = _copy_to_spool(io.BytesIO(data), settings)
+    assert Path(upload.path).parent == tmp_path
+    assert Path(upload.path).read_bytes() == data
+    assert upload.size == len(data)
+    assert upload.sha256 == hash_document(data) == hash_document(upload.path)
+    upload.remove()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_copy_to_spool_stops_at_the_size_limit(tmp_path: Path) -> None:
+    """Test that oversized uploads are refused and their spool file removed."""
+    settings = Settings(upload_dir=str(tmp_path), max_pdf_mb=1)
+    with pytest.raises(HTTPException) as exc_info:
+        _copy_to_spool(io.BytesIO(b"x" * (2 * 1024 * 1024)), settings)
+    assert exc_info.value.status_code == 413
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_form_spooler_writes_file_parts_as_they_arrive(tmp_path: Path) -> None:
+    """Test that file parts fed in small chunks land in spool files as sent."""
+    settings = Settings(upload_dir=str(tmp_path))
+    data = b"%PDF-1.4" + bytes(range(256)) * 4000
+    body = (
+        b'--b\r\nContent-Disposition: form-data; name="note"\r\n\r\nhi\r\n'
+        b'--b\r\nContent-Disposition: form-data; name="file"; filename="d.pdf"\r\n'
+        b"Content-Type: application/pdf\r\n\r\n" + data + b"\r\n--b--\r\n"
+    )
+    spooler = _FormSpooler(b"b", "file", lambda name, _: _SpoolWriter(settings))
+    for start in range(0, len(body), 1000):
+        spooler.write(body[start : start + 1000])
+    [(name, content_type, upload)] = spooler.finish()
+    assert (name, content_type) == ("d.pdf", "application/pdf")
+    assert Path(upload.path).read_bytes() == data
+    assert upload.sha256 == hash_document(data)
+    upload.remove()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_scanner_reads_documents_from_paths(
+    tmp_path: Path, make_qr_pdf: QRPdfFactory
+) -> None:
+    """Test that scanning a file path matches scanning its bytes."""
+    pdf = make_qr_pdf(3)
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(pdf)
+    scanner = Scanner()
+    assert scanner.scan_pdf(str(path)) == scanner.scan_pdf(pdf)
+    assert scanner.scan_pdf(path, [2, 3]) == scanner.scan_pdf(pdf, [2, 3])
+
+
+def test_upload_limit_middleware_rejects_large_bodies() -> None:
+    """Test both the Content-Length check and the streamed body count."""
+    app = FastAPI()
+
+    @app.post("/echo")
+    async def echo(request: Request) -> dict:
+        return {"size": len(await request.body())}
+
+    app.add_middleware(UploadLimitMiddleware, max_bytes=100)
+    client = TestClient(app)
+
+    assert client.post("/echo", content=b"x" * 100).json() == {"size": 100}
+    assert client.post("/echo", content=b"x" * 101).status_code == 413
+
+    def chunks():  # type: ignore[no-untyped-def]
+        for _ in range(5):
+            yield b"x" * 40
+
+    assert client.post("/echo", content=chunks()).status_code == 413
+
+    for length in ("abc", "-1", "1e3", ""):
+        response = client.post(
+            "/echo", content=b"x", headers={"Content-Length": length}
+        )
+        assert response.status_code == 400
+
+
+def test_scan_routes_remove_spool_files(
+    client: TestClient,
+    make_qr_pdf: QRPdfFactory,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that spooled uploads are scanned and then deleted."""
+    spool_dir = tmp_path / "spool"
+    spool_dir.mkdir()
+    monkeypatch.setenv("ZF_UPLOAD_DIR", str(spool_dir))
+    get_settings.cache_clear()
+    files = {"file": ("doc.pdf", make_qr_pdf(2), "application/pdf")}
+
+    response = client.post("/v1/scan", files=files)
+    assert [r["value"] for r in response.json()["results"]] == ["PAGE-1", "PAGE-2"]
+    response = client.post("/v1/scan", params={"stream": "true"}, files=files)
+    assert response.status_code == 200
+
+    response = client.post("/v1/jobs", params={"pages": "2"}, files=files)
+    job = wait_for_job(client, response.json()["job_id"])
+    assert job["status"] == "completed"
+    assert list(spool_dir.iterdir()) == []
+
+    response = client.post(
+        "/v1/scan", files={"file": ("doc.txt", b"hello", "text/plain")}
+    )
+    assert response.status_code == 400
+    response = client.post("/v1/scan", files={"other": ("doc.pdf", b"%PDF")})
+    assert response.status_code == 400
+    response = client.post(
+        "/v1/jobs",
+        content=b'--b\r\nContent-Disposition: form-data; name="file"; '
+        b'filename="doc.pdf"\r\nContent-Type: application/pdf\r\n\r\n%PDF',
+        headers={"Content-Type": "multipart/form-data; boundary=b"},
+    )
+    assert response.status_code == 400
+    assert list(spool_dir.iterdir()) == []
@@ -0,0 +1,151 @@
+"""Test reading 1D barcodes from vector page content."""
+
+import io
+from typing import List, Tuple
+
+import numpy as np
+import pypdfium2 as pdfium
+import zxingcpp
+from PIL import Image
+
+from app.services.scanner import Scanner
+from app.services.vector import collect_rects, find_bar_runs
+
+
+def write_pdf(content: str) -> bytes:
+    """Write a one-page Letter PDF with a content stream and Helvetica."""
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        "/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>",
+        f"<< /Length {len(content)} >>\nstream\n{content}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f"{number} 0 obj\n{body}\nendobj\n".encode())
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    out.write("".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode())
+    out.write(
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref}\n%%EOF\n".encode()
+    )
+    return out.getvalue()
+
+
+def bar_runs(symbology: str, value: str) -> List[Tuple[int, int]]:
+    """Return the ``(start, width)`` of each bar of a symbol, in modules."""
+    image = zxingcpp.write_barcode(
+        zxingcpp.barcode_format_from_str(symbology), value, quiet_zone=0
+    )
+    dark = list(np.asarray(image)[0] < 128) + [False]
+    edges = [x for x in range(len(dark)) if dark[x] != (x > 0 and dark[x - 1])]
+    return [(start, end - start) for start, end in zip(edges[::2], edges[1::2])]
+
+
+def label(symbology: str, value: str, x: float, y: float, text: bool = True) -> str:
+    """Draw a symbol as filled rectangles with its text underneath."""
+    ops = ["0 g"]
+    ops += [
+        f"{x + start} {y} {width} 50 re" for start, width in bar_runs(symbology, value)
+    ]
+    ops.append("f")
+    if text:
+        ops.append(f"BT /F1 9 Tf {x} {y - 11} Td ({value}) Tj ET")
+    return "\n".join(ops)
+
+
+def scan(pdf_bytes: bytes, vector: bool) -> Tuple[List[dict], str]:
+    """Scan at 200 DPI and return the results and the first page's mode."""
+    scanner = Scanner(dpi=200, vector_barcodes=vector)
+    results = scanner.scan_pdf(pdf_bytes)
+    return results, scanner.page_stats[0]["mode"]
+
+
+def test_scan_pdf_vector_matches_render() -> None:
+    """Test that vector bars decode without a render at the same positions."""
+    content = "\n".join(
+        [
+            label("Code128", "SHIP-1", 60, 600),
+            label("EAN13", "400000000001", 60, 450),
+            label("Code39", "PO123", 60, 300),
+            # A table rule and a stroked box are not bars
+            "0 g 40 680 532 1 re f",
+            "1 w 36 36 540 720 re S",
+        ]
+    )
+    pdf_bytes = write_pdf(content)
+    rendered, _ = scan(pdf_bytes, vector=False)
+    results, mode = scan(pdf_bytes, vector=True)
+    assert mode == "vector"
+    assert [r["value"] for r in results] == ["SHIP-1", "4000000000013", "PO123"]
+    assert [r["value"] for r in results] == [r["value"] for r in rendered]
+    for a, b in zip(results, rendered):
+        for key, value in a["position"].items():
+            assert abs(value - b["position"][key]) <= 6
+
+
+def test_vector_reads_rotated_and_module_drawn_bars() -> None:
+    """Test vertical symbols inside a transform and one rectangle per module."""
+    rotated = "q 0 1 -1 0 300 200 cm " + label("Code128", "ROT-1", 0, 0) + " Q"
+    modules = [
+        f"{100 + start + m} 500 1 40 re f"
+        for start, width in bar_runs("Code128", "MOD-1")
+        for m in range(width)
+    ]
+    pdf_bytes = write_pdf("\n".join([rotated, "0 g", *modules]))
+    results, mode = scan(pdf_bytes, vector=True)
+    assert mode == "vector"
+    assert sorted(r["value"] for r in results) == ["MOD-1", "ROT-1"]
+
+    runs, _ = find_bar_runs(collect_rects(pdfium.PdfDocument(pdf_bytes)[0]))
+    assert sorted((len(bars), vertical) for bars, vertical in runs) == [
+        (25, False),
+        (25, True),
+    ]
+
+
+def test_vector_falls_back_when_unsure() -> None:
+    """Test that pages the geometry cannot account for are rendered."""
+    # Code39 has no check digit, so it needs matching text
+    results, mode = scan(write_pdf(label("Code39", "PO123", 60, 300, False)), True)
+    assert mode == "full" and [r["value"] for r in results] == ["PO123"]
+
+    # A QR code drawn as squares is found by the render
+    qr = np.asarray(
+        zxingcpp.write_barcode(zxingcpp.BarcodeFormat.QRCode, "QR-1", quiet_zone=0)
+    )
+    squares = [
+        f"{100 + x * 3} {600 - y * 3} 3 3 re" for y, x in zip(*np.nonzero(qr < 128))
+    ]
+    content = "\n".join(["0 g", *squares, "f", label("Code128", "SHIP-1", 60, 300)])
+    results, mode = scan(write_pdf(content), True)
+    assert mode == "full"
+    assert sorted(r["value"] for r in results) == ["QR-1", "SHIP-1"]
+
+    # Images may hold barcodes
+    pdf_bytes = io.BytesIO()
+    Image.new("RGB", (200, 200), color="white").save(pdf_bytes, format="PDF")
+    assert scan(pdf_bytes.getvalue(), True)[1] == "full"
+
+    # Nor does one drawn as polygons, or a filled curve
+    hexagons = [
+        f"{100 + x * 3} {600 - y * 3} m {103 + x * 3} {600 - y * 3} l "
+        f"{103 + x * 3} {601.5 - y * 3} l {103 + x * 3} {603 - y * 3} l "
+        f"{101.5 + x * 3} {603 - y * 3} l {100 + x * 3} {603 - y * 3} l h"
+        for y, x in zip(*np.nonzero(qr < 128))
+    ]
+    content = "\n".join(["0 g", *hexagons, "f", label("Code128", "SHIP-1", 60, 300)])
+    rendered, _ = scan(write_pdf(content), False)
+    results, mode = scan(write_pdf(content), True)
+    assert mode == "full"
+    assert sorted(r["value"] for r in results) == ["QR-1", "SHIP-1"]
+    assert results == rendered
+    curve = "0 g 300 500 m 300 520 320 540 340 540 c 340 500 l h f"
+    content = "\n".join([label("Code128", "SHIP-1", 60, 300), curve])
+    assert scan(write_pdf(content), True)[1] == "full"
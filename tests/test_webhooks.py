@@ -0,0 +1,208 @@
+"""Test webhook callbacks against a local stub HTTP server."""
+
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db import (
+    _create_job_sync,
+    _init_db_sync,
+    close_db,
+    get_db_connection,
+    update_job_status,
+)
+from app.services.webhooks import WebhookDispatcher
+from conftest import QRPdfFactory, wait_for_job
+
+
+class StubServer:
+    """HTTP server that records POSTed JSON and answers with scripted codes."""
+
+    def __init__(self, statuses: List[int]) -> None:
+        """Answer requests with ``statuses`` in turn, then with 200."""
+        self.statuses = list(statuses)
+        self.requests: List[Dict[str, Any]] = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                stub.requests.append(
+                    {"headers": dict(self.headers), "json": json.loads(body)}
+                )
+                code = stub.statuses.pop(0) if stub.statuses else 200
+                self.send_response(code)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/hook"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self) -> None:
+        """Stop the server."""
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def job_db(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Path]:
+    """Initialize a job database in a temporary directory."""
+    db_path = tmp_path / "jobs.db"
+    monkeypatch.setenv("ZF_SQLITE_URL", f"sqlite:///{db_path}")
+    _init_db_sync()
+    yield db_path
+    close_db()
+
+
+@pytest.fixture
+def local_hooks(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Allow webhooks to the stub server on the loopback address."""
+    monkeypatch.setenv("ZF_WEBHOOK_ALLOWED_HOSTS", '["127.0.0.1"]')
+
+
+def outbox() -> List[Dict[str, Any]]:
+    """Return all outbox rows."""
+    with get_db_connection() as conn:
+        rows = conn.execute("SELECT * FROM webhook_outbox ORDER BY id").fetchall()
+    return [dict(row) for row in rows]
+
+
+def deliver(
+    statuses: List[int], max_attempts: int = 3, job_id: str = "job-1"
+) -> StubServer:
+    """Complete a job with a callback and run the dispatcher until it settles."""
+    stub = StubServer(statuses)
+
+    async def scenario() -> None:
+        _create_job_sync(job_id, "", datetime(2100, 1, 1))
+        await update_job_status(
+            job_id, "completed", result={"results": []}, callback_url=stub.url
+        )
+        dispatcher = WebhookDispatcher(
+            max_attempts=max_attempts, backoff_sec=0.01, allowed_hosts=["127.0.0.1"]
+        )
+        dispatcher.start()
+        deadline = time.monotonic() + 5
+        while outbox()[-1]["status"] == "pending" and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        await dispatcher.stop()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        stub.close()
+    return stub
+
+
+def test_callback_is_retried_until_delivered(job_db: Path) -> None:
+    """Test backoff retries on server errors and the delivered payload."""
+    stub = deliver([503, 500])
+    assert len(stub.requests) == 3
+    request = stub.requests[-1]
+    assert request["json"] == {
+        "event": "job.completed",
+        "job_id": "job-1",
+        "status": "completed",
+        "result": {"results": []},
+    }
+    assert request["headers"]["X-ZebraFetch-Job"] == "job-1"
+    row = outbox()[0]
+    assert (row["status"], row["attempts"]) == ("delivered", 3)
+
+
+def test_callback_gives_up(job_db: Path) -> None:
+    """Test that client errors fail at once and retries are bounded."""
+    stub = deliver([404])
+    assert len(stub.requests) == 1
+    assert outbox()[0]["status"] == "failed"
+    assert outbox()[0]["last_error"] == "HTTP 404"
+
+    stub = deliver([503] * 5, max_attempts=2, job_id="job-2")
+    assert len(stub.requests) == 2
+    assert (outbox()[-1]["status"], outbox()[-1]["attempts"]) == ("failed", 2)
+
+
+def test_callback_to_internal_address_is_not_sent(job_db: Path) -> None:
+    """Test that a host resolving to loopback is refused at delivery time."""
+    stub = StubServer([])
+
+    async def scenario() -> None:
+        _create_job_sync("job-1", "", datetime(2100, 1, 1))
+        await update_job_status(
+            "job-1", "completed", result={"results": []}, callback_url=stub.url
+        )
+        dispatcher = WebhookDispatcher()
+        dispatcher.start()
+        deadline = time.monotonic() + 5
+        while outbox()[0]["status"] == "pending" and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        await dispatcher.stop()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        stub.close()
+    assert not stub.requests
+    assert outbox()[0]["status"] == "failed"
+    assert "non-public" in outbox()[0]["last_error"]
+
+
+def test_job_posts_result_to_callback_url(
+    local_hooks: None, client: TestClient, make_qr_pdf: QRPdfFactory
+) -> None:
+    """Test the callback of a job submitted through the API."""
+    stub = StubServer([])
+    try:
+        files = {"file": ("doc.pdf", make_qr_pdf(2), "application/pdf")}
+        response = client.post(
+            "/v1/jobs", params={"callback_url": stub.url}, files=files
+        )
+        job_id = response.json()["job_id"]
+        assert wait_for_job(client, job_id)["status"] == "completed"
+        deadline = time.monotonic() + 5
+        while not stub.requests and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        stub.close()
+    payload = stub.requests[0]["json"]
+    assert payload["job_id"] == job_id
+    assert payload["event"] == "job.completed"
+    assert [r["value"] for r in payload["result"]["results"]] == ["PAGE-1", "PAGE-2"]
+
+    response = client.post(
+        "/v1/jobs", params={"callback_url": "ftp://example.com/hook"}, files=files
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "http://127.0.0.1/hook",
+        "http://169.254.169.254/latest/meta-data/",
+        "http://10.0.0.5/hook",
+        "http://[::1]/hook",
+        "http://localhost/hook",
+    ],
+)
+def test_callback_to_internal_address_is_rejected(
+    client: TestClient, make_qr_pdf: QRPdfFactory, url: str
+) -> None:
+    """Test that jobs cannot call back to loopback, metadata or private hosts."""
+    files = {"file": ("doc.pdf", make_qr_pdf(1), "application/pdf")}
+    response = client.post("/v1/jobs", params={"callback_url": url}, files=files)
+    assert response.status_code == 400
+    assert "non-public" in response.json()["detail"]